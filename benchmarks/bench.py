@@ -0,0 +1,362 @@
+"""Benchmarks for the load, save, render and mutation paths.
+
+Generates synthetic task lists, times each operation, records its
+tracemalloc peak in a separate run and prints the results as JSON:
+
+    python benchmarks/bench.py --sizes 1000 100000 --output results.json
+    python benchmarks/bench.py --compare results.json
+
+The cold start of the command-line tool is measured in a fresh interpreter,
+as is the GUI's when a display is available. The local server's throughput
+is measured with a client sending 1000 requests at once (rpc_pipelined_1000)
+and one at a time (rpc_sequential_100), against a thread standing in for
+the Tk thread.
+
+The GUI benchmarks need a display. Without DISPLAY they start Xvfb when it
+is installed and are skipped otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo_app.core import TodoList, separator_name
+from todo_app.model import DONE, CANCELLED, SEPARATOR, TITLE, URGENT, Task, dump_tasks
+from todo_app.server import TaskServer
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def generate_tasks(size, seed=0):
+    """A reproducible mix of open, done, urgent and cancelled tasks and separators."""
+    rng = random.Random(seed)
+    tasks = []
+    for index in range(size):
+        roll = rng.random()
+        if roll < 0.02:
+            tasks.append(Task(separator_name(f"section {index}"), SEPARATOR | TITLE))
+        elif roll < 0.03:
+            tasks.append(Task(separator_name(), SEPARATOR))
+        elif roll < 0.40:
+            tasks.append(Task(f"Finished task number {index}", DONE))
+        elif roll < 0.45:
+            tasks.append(Task(f"Cancelled task number {index}", CANCELLED))
+        elif roll < 0.55:
+            tasks.append(Task(f"Urgent task number {index}", URGENT))
+        else:
+            tasks.append(Task(f"Open task number {index} with a few more words"))
+    return tasks
+
+
+def measure(function, setup=None, repeat=3):
+    """Run function `repeat` times; return the median seconds and the tracemalloc peak of one more run.
+
+    Tracing slows allocation-heavy code down several times, so the timed
+    runs are untraced and the peak comes from a separate run.
+    """
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        function(state)
+        timings.append(time.perf_counter() - start)
+    state = setup() if setup else None
+    tracemalloc.start()
+    try:
+        function(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def core_benchmarks(size, backend, work_dir, repeat):
+    path = work_dir / f'tasks_{size}.json'
+    path.write_text(dump_tasks(generate_tasks(size)), encoding='utf-8')
+    if backend != 'json':
+        TodoList.open(path, backend).close()  # import into the backend's own files once
+
+    def open_list(_=None):
+        return TodoList.open(path, backend)
+
+    todo = open_list()
+    selection = range(0, size, 10)
+
+    def save(_):
+        todo.storage.record('update', index=0, set={'done': todo[0].done})
+        todo.save()
+        todo.flush()
+
+    results = {
+        'load_tasks': measure(lambda _: open_list().close(), repeat=repeat),
+        'save_tasks': measure(save, repeat=repeat),
+        'update_title': measure(lambda _: todo.counts(), repeat=repeat),
+        'reorder_tasks': measure(lambda _: (todo.move(size - 1, 0), todo.flush()), repeat=repeat),
+        'toggle_selection': measure(lambda _: (todo.toggle_done(selection), todo.flush()), repeat=repeat),
+    }
+    todo.close()
+    return results
+
+
+def rpc_benchmarks(size, backend, work_dir, repeat):
+    path = work_dir / f'rpc_{size}.json'
+    path.write_text(dump_tasks(generate_tasks(size)), encoding='utf-8')
+    wake, stopping, flushed = threading.Event(), threading.Event(), threading.Event()
+    opened = queue.SimpleQueue()
+    flush_requested = []
+
+    def owner():
+        # Opens, serves and closes the list on one thread, as the Tk thread does;
+        # sqlite connections cannot be used from any other.
+        todo = TodoList.open(path, backend)
+        opened.put(todo)
+        try:
+            while not stopping.is_set():
+                if wake.wait(0.05):
+                    wake.clear()
+                    server.process_requests()
+                    if flush_requested:
+                        flush_requested.clear()
+                        todo.flush()
+                        flushed.set()
+        finally:
+            todo.close()
+
+    def flush():
+        flushed.clear()
+        flush_requested.append(True)
+        wake.set()
+        flushed.wait()
+
+    thread = threading.Thread(target=owner)
+    thread.start()
+    todo = opened.get()
+    socket_path = work_dir / 'todo.sock' if hasattr(socket, 'AF_UNIX') else None
+    server = TaskServer(lambda: todo, socket_path, port=0, notify=wake.set)
+    server.start()
+
+    if server.path is not None:
+        client = socket.socket(socket.AF_UNIX)
+        client.connect(str(server.path))
+    else:
+        client = socket.create_connection(('127.0.0.1', server.port))
+        client.sendall(server.token.encode() + b'\n')
+    stream = client.makefile('rwb')
+
+    def request(id):
+        return json.dumps({'jsonrpc': '2.0', 'id': id, 'method': 'add', 'params': [f"Task {id}"]}).encode() + b'\n'
+
+    def pipelined(_):
+        stream.write(b''.join(map(request, range(1000))))
+        stream.flush()
+        for _ in range(1000):
+            stream.readline()
+        flush()
+
+    def sequential(_):
+        for id in range(100):
+            stream.write(request(id))
+            stream.flush()
+            stream.readline()
+        flush()
+
+    try:
+        return {
+            'rpc_pipelined_1000': measure(pipelined, repeat=repeat),
+            'rpc_sequential_100': measure(sequential, repeat=repeat),
+        }
+    finally:
+        stream.close()
+        client.close()
+        stopping.set()
+        thread.join()
+        server.stop()
+
+
+# Starts the GUI on the list given in argv and quits once the window is drawn.
+GUI_START = """
+import sys
+import tkinter as tk
+from pathlib import Path
+from unittest.mock import patch
+from todo_app.todo_app import TodoApp
+
+with patch('todo_app.core.get_tasks_file', return_value=Path(sys.argv[1])), \\
+        patch('todo_app.core.read_config', return_value={'storage': sys.argv[2]}):
+    root = tk.Tk()
+    app = TodoApp(root)
+    root.update()
+    app.lists.close()
+    root.destroy()
+"""
+
+
+def startup_benchmarks(backend, work_dir, repeat, gui):
+    """Wall-clock time of fresh interpreters starting the CLI and, with a display, the GUI."""
+    path = work_dir / 'startup' / 'todo_app' / 'tasks.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dump_tasks(generate_tasks(10)), encoding='utf-8')
+    root = Path(__file__).resolve().parent.parent
+
+    def run_python(*args):
+        subprocess.run([sys.executable, *args], cwd=root, check=True, stdout=subprocess.DEVNULL)
+
+    results = {
+        'cli_cold_start': measure(
+            lambda _: run_python('-m', 'todo_app.cli', '--file', str(path), '--storage', backend, 'list'),
+            repeat=repeat),
+    }
+    if gui:
+        results['gui_cold_start'] = measure(lambda _: run_python('-c', GUI_START, str(path), backend), repeat=repeat)
+    return results
+
+
+def start_virtual_display():
+    """Make sure Tk has a display; returns the Xvfb process if one was started."""
+    if os.environ.get('DISPLAY') or sys.platform in ('win32', 'darwin'):
+        return None
+    if not shutil.which('Xvfb'):
+        return False
+    display = ':97'
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0', '1024x768x24'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ['DISPLAY'] = display
+    return process
+
+
+def gui_benchmarks(size, backend, work_dir, repeat):
+    import tkinter as tk
+    from todo_app.todo_app import TodoApp
+
+    path = work_dir / 'gui' / 'todo_app' / 'tasks.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dump_tasks(generate_tasks(size)), encoding='utf-8')
+
+    with patch('todo_app.core.get_tasks_file', return_value=path), \
+            patch('todo_app.core.read_config', return_value={'storage': backend}):
+        root = tk.Tk()
+        start = time.perf_counter()
+        app = TodoApp(root)
+        root.update()
+        startup = time.perf_counter() - start
+
+        def populate(_):
+            app.populate_listbox()
+            root.update_idletasks()
+
+        def toggle_one(_):
+            app.listbox.selection_clear(0, tk.END)
+            app.listbox.selection_set(size // 2)
+            app.mark_selected_tasks_done()
+            root.update_idletasks()
+
+        def select_all_and_toggle(_):
+            app.select_all_tasks()
+            app.mark_selected_tasks_done()
+            root.update_idletasks()
+
+        results = {
+            'gui_startup': (startup, 0),
+            'populate_listbox': measure(populate, repeat=repeat),
+            'update_title': measure(lambda _: app.update_title(), repeat=repeat),
+            'gui_toggle_one': measure(toggle_one, repeat=repeat),
+            'gui_select_all_toggle': measure(select_all_and_toggle, repeat=repeat),
+            'gui_select_all': measure(lambda _: (app.select_all_tasks(), root.update_idletasks()), repeat=repeat),
+            # Runs on every key release in the entry, here with every row still selected
+            'update_buttons_state': measure(lambda _: app.update_buttons_state(), repeat=repeat),
+            'toggle_dark_mode': measure(lambda _: (app.toggle_dark_mode(), root.update_idletasks()), repeat=repeat),
+        }
+        app.todo.close()
+        root.destroy()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(sizes, backend, repeat, gui):
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': backend,
+        'results': [],
+    }
+    display = start_virtual_display() if gui else False
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for size in [0] + sizes:
+                if size == 0:
+                    benchmarks = startup_benchmarks(backend, Path(tmp_dir), repeat, gui and display is not False)
+                else:
+                    benchmarks = core_benchmarks(size, backend, Path(tmp_dir), repeat)
+                    benchmarks.update(rpc_benchmarks(size, backend, Path(tmp_dir), repeat))
+                if size and gui and display is not False:
+                    benchmarks.update(gui_benchmarks(size, backend, Path(tmp_dir), repeat))
+                for operation, (seconds, peak) in benchmarks.items():
+                    report['results'].append({'size': size, 'operation': operation,
+                                              'seconds': seconds, 'peak_bytes': peak})
+                    print(f"{size:>9} {operation:<22} {seconds * 1000:10.2f} ms {peak / 1024:10.0f} KiB",
+                          file=sys.stderr)
+    finally:
+        if display:
+            display.terminate()
+    if gui and display is False:
+        print("No display and no Xvfb found, GUI benchmarks skipped", file=sys.stderr)
+    return report
+
+
+def compare(report, baseline):
+    """Print the change in time against a previous report."""
+    before = {(row['size'], row['operation']): row['seconds'] for row in baseline['results']}
+    for row in report['results']:
+        key = (row['size'], row['operation'])
+        if key in before and before[key] > 0:
+            change = (row['seconds'] - before[key]) / before[key] * 100
+            print(f"{row['size']:>9} {row['operation']:<22} {change:+8.1f}%", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="list sizes to generate, e.g. 1000 10000 1000000")
+    parser.add_argument('--backend', default='json', choices=['json', 'journal', 'sqlite', 'binary'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-gui', dest='gui', action='store_false', help="skip the Tk benchmarks")
+    parser.add_argument('--output', type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument('--compare', type=Path, help="JSON report of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.backend, args.repeat, args.gui)
+    text = json.dumps(report, indent=4)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text(encoding='utf-8')))
+
+
+if __name__ == '__main__':
+    main()
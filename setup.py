@@ -19,5 +19,9 @@ setup(
     version="0.3.0",
     description="A simple Todo application with python Tkinter GUI",
     options={"build_exe": build_exe_options},
-    executables=[Executable("todo_app/todo_app.py", base=base, icon="todo_app/app_icon.ico")],
+    executables=[
+        Executable("todo_app/todo_app.py", base=base, icon="todo_app/app_icon.ico"),
+        # Console build of the command-line tool, without a GUI base
+        Executable("todo_app/cli.py", target_name="todo", icon="todo_app/app_icon.ico"),
+    ],
 )
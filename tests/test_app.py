@@ -2,91 +2,299 @@ import unittest
 from unittest.mock import patch, MagicMock
 import tkinter as tk
 import json
+import tempfile
 from pathlib import Path
 import sys
 sys.path.append('../')
-from todo_app.todo_app import TodoApp
+from todo_app.selection import RangeSet
+from todo_app.todo_app import ROW_STYLES, TodoApp, VirtualListbox
 
 class TestTodoApp(unittest.TestCase):
 
     def setUp(self):
-        self.root = tk.Tk()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.tasks_file = Path(self.tmp_dir.name) / 'todo_app' / 'tasks.json'
+        for patcher in (patch('todo_app.core.get_tasks_file', return_value=self.tasks_file),
+                        patch('todo_app.core.read_config', return_value={})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("Tk needs a display")
         self.app = TodoApp(self.root)
 
     def tearDown(self):
+        self.app.todo.close()
         self.root.destroy()
 
-    @patch('todo_app.todo_app.Path.read_text')
-    def test_load_tasks(self, mock_read_text):
-        mock_tasks = [
-            {"name": "Task 1", "done": False, "cancelled": False, "urgent": False, "separator": False},
-            {"name": "Task 2", "done": True, "cancelled": False, "urgent": True, "separator": False},
-            {"name": "───────", "separator": True, "title": False}
-        ]
-        mock_read_text.return_value = json.dumps(mock_tasks)
-        
-        tasks = self.app.load_tasks()
-        self.assertEqual(len(tasks), 3)
-        self.assertEqual(tasks[0]['name'], "Task 1")
-        self.assertFalse(tasks[0]['done'])
-        self.assertTrue(tasks[1]['done'])
-        self.assertTrue(tasks[1]['urgent'])
-        self.assertTrue(tasks[2]['separator'])
-
-    @patch('todo_app.todo_app.Path.write_text')
-    def test_save_tasks(self, mock_write_text):
-        self.app.tasks = [
-            {"name": "Task 1", "done": False, "cancelled": False, "urgent": False, "separator": False},
-            {"name": "Task 2", "done": True, "cancelled": False, "urgent": True, "separator": False},
-            {"name": "───────", "separator": True, "title": False}
-        ]
-        self.app.save_tasks()
-        mock_write_text.assert_called_once()
-        saved_data = json.loads(mock_write_text.call_args[0][0])
-        self.assertEqual(len(saved_data), 3)
-        self.assertEqual(saved_data[0]['name'], "Task 1")
-        self.assertFalse(saved_data[0]['done'])
-        self.assertTrue(saved_data[1]['urgent'])
-        self.assertTrue(saved_data[2]['separator'])
+    def saved_tasks(self):
+        self.app.todo.flush()
+        return json.loads(self.tasks_file.read_text(encoding='utf-8'))
 
     def test_toggle_dark_mode(self):
         initial_mode = self.app.is_dark_mode
         self.app.toggle_dark_mode()
         self.assertNotEqual(initial_mode, self.app.is_dark_mode)
 
+    def test_theme_switch_does_not_rerender_rows(self):
+        self.app.todo.add("Task")
+        self.app.listbox.get_row = MagicMock()
+        self.app.toggle_dark_mode()
+        self.app.listbox.get_row.assert_not_called()
+        self.assertIs(self.app.listbox.styles, ROW_STYLES[self.app.is_dark_mode])
+
     def test_add_task(self):
         self.app.entry = MagicMock()
         self.app.entry.get.return_value = "New Task"
         self.app.add_task()
         self.assertEqual(len(self.app.tasks), 1)
-        self.assertEqual(self.app.tasks[0]['name'], "New Task")
-        self.assertFalse(self.app.tasks[0]['done'])
-
-    @patch('todo_app.todo_app.TodoApp.populate_listbox')
-    @patch('todo_app.todo_app.TodoApp.save_tasks')
-    def test_remove_selected_tasks(self, mock_save, mock_populate):
-        self.app.tasks = [
-            {"name": "Task 1", "done": False, "cancelled": False, "urgent": False, "separator": False},
-            {"name": "Task 2", "done": False, "cancelled": False, "urgent": False, "separator": False}
-        ]
-        self.app.listbox = MagicMock()
-        self.app.listbox.curselection.return_value = [0]
+        self.assertEqual(self.app.tasks[0].name, "New Task")
+        self.assertFalse(self.app.tasks[0].done)
+        self.assertEqual(self.saved_tasks()[0]['name'], "New Task")
+
+    def test_remove_selected_tasks(self):
+        self.app.todo.add("Task 1")
+        self.app.todo.add("Task 2")
+        self.app.listbox.selection_set(0)
         self.app.remove_selected_tasks()
-        self.assertEqual(len(self.app.tasks), 1)
-        self.assertEqual(self.app.tasks[0]['name'], "Task 2")
-
-    @patch('todo_app.todo_app.TodoApp.populate_listbox')
-    @patch('todo_app.todo_app.TodoApp.save_tasks')
-    def test_mark_selected_tasks_done(self, mock_save, mock_populate):
-        self.app.tasks = [
-            {"name": "Task 1", "done": False, "cancelled": False, "urgent": False, "separator": False},
-            {"name": "Task 2", "done": False, "cancelled": False, "urgent": False, "separator": False}
-        ]
-        self.app.listbox = MagicMock()
-        self.app.listbox.curselection.return_value = [0]
+        self.assertEqual([task.name for task in self.app.tasks], ["Task 2"])
+        self.assertEqual([task['name'] for task in self.saved_tasks()], ["Task 2"])
+        self.assertEqual(self.app.listbox.size(), 1)
+        self.assertTrue(self.app.todo.undo())
+        self.assertEqual([task['name'] for task in self.saved_tasks()], ["Task 1", "Task 2"])
+
+    def test_mark_selected_tasks_done(self):
+        self.app.todo.add("Task 1")
+        self.app.todo.add("Task 2")
+        self.app.listbox.selection_set(0)
         self.app.mark_selected_tasks_done()
-        self.assertTrue(self.app.tasks[0]['done'])
-        self.assertFalse(self.app.tasks[1]['done'])
+        self.assertEqual([task['done'] for task in self.saved_tasks()], [True, False])
+        self.assertIsNotNone(self.saved_tasks()[0].get('closed_at'))
+        self.assertTrue(self.app.todo.undo())
+        self.assertFalse(self.app.tasks[0].done)
+        self.assertEqual([task['done'] for task in self.saved_tasks()], [False, False])
+
+    def test_secondary_windows_built_on_first_use(self):
+        self.assertIsNone(self.app.context_menu)
+        self.assertIsNone(self.app.edit_window)
+        self.assertIsNone(self.app.about_window)
+        self.app.todo.add("Task 1")
+        self.app.populate_listbox()
+        self.app.listbox.selection_set(0)
+        self.app.edit_task()
+        edit_window = self.app.edit_window
+        self.app.edit_entry.delete("1.0", tk.END)
+        self.app.edit_entry.insert(tk.END, "Renamed")
+        self.app.save_edit_dialog()
+        self.assertEqual(self.app.tasks[0].name, "Renamed")
+        self.app.listbox.selection_set(0)
+        self.app.edit_task()
+        self.assertIs(self.app.edit_window, edit_window)
+        self.app.close_edit_dialog()
+
+    def test_filter_maps_rows_to_tasks(self):
+        for name in ("Buy milk", "Call the bank", "Buy bread"):
+            self.app.todo.add(name)
+        self.app.filter_var.set("buy")
+        self.assertEqual(self.app.listbox.size(), 2)
+        self.app.listbox.selection_set(1)
+        self.app.mark_selected_tasks_done()
+        self.assertTrue(self.app.tasks[2].done)
+        self.assertFalse(self.app.tasks[0].done)
+        self.app.reorder_tasks(1, 0)
+        self.assertEqual([task.name for task in self.app.tasks], ["Buy bread", "Buy milk", "Call the bank"])
+        self.app.filter_var.set("")
+        self.assertEqual(self.app.listbox.size(), 3)
+
+    def test_select_all_is_one_range(self):
+        for name in ("Task 1", "Task 2", "Task 3"):
+            self.app.todo.add(name)
+        self.app.select_all_tasks()
+        self.assertEqual(self.app.listbox.selection_ranges(), [(0, 3)])
+        self.assertEqual(str(self.app.buttons["✔"]['state']), 'normal')
+        self.app.todo.toggle_cancelled(self.app.selected_tasks())
+        self.app.select_all_tasks()
+        self.assertEqual(str(self.app.buttons["✔"]['state']), 'disabled')
+
+    def test_selection_counts_of_most_filtered_rows(self):
+        for name in ("Buy milk", "Buy bread", "Call the bank", "Buy eggs"):
+            self.app.todo.add(name)
+        self.app.todo.toggle_cancelled([0, 1])
+        self.app.filter_var.set("buy")
+        self.app.listbox.selection_set(0, 1)
+        self.app.update_buttons_state()
+        self.assertEqual(str(self.app.buttons["✔"]['state']), 'disabled')
+        self.app.listbox.selection_set(2)
+        self.app.update_buttons_state()
+        self.assertEqual(str(self.app.buttons["✔"]['state']), 'normal')
+
+    def test_undo_leaves_text_fields_alone(self):
+        self.app.todo.add("Task")
+        self.app.create_edit_dialog()
+        with patch.object(self.root, 'focus_get', return_value=self.app.edit_entry):
+            self.app.undo()
+        self.assertEqual(len(self.app.tasks), 1)
+        with patch.object(self.root, 'focus_get', return_value=self.app.listbox):
+            self.app.undo()
+        self.assertEqual(len(self.app.tasks), 0)
+
+    def test_startup_timings(self):
+        phases = [phase for phase, _ in self.app.startup_timings]
+        self.assertEqual(phases, ['load_config', 'load_tasks', 'setup_ui', 'setup_bindings'])
+
+class FakeListboxTcl:
+    """Just enough of Tcl's listbox command for VirtualListbox, so it can be tested without a display."""
+
+    def __init__(self):
+        self.rows = []  # [text, {option: value}]
+        self.selected = set()
+        self.active = 0
+        self.calls = []
+        self.rows_written = 0  # rows inserted or deleted
+
+    def index(self, index):
+        return len(self.rows) - 1 if index == tk.END else int(index)
+
+    def call(self, *args):
+        if len(args) == 1:
+            args = args[0]
+        if None in args:
+            args = args[:args.index(None)]
+        if args[0] == 'event':
+            return ''
+        command, args = args[1], args[2:]
+        self.calls.append(command)
+        if command == 'insert':
+            index = len(self.rows) if args[0] == tk.END else int(args[0])
+            self.rows[index:index] = [[text, {}] for text in args[1:]]
+            self.rows_written += len(args) - 1
+            self.shift(index, len(args) - 1)
+        elif command == 'delete':
+            first = self.index(args[0])
+            last = self.index(args[1]) if len(args) > 1 else first
+            del self.rows[first:last + 1]
+            self.rows_written += last - first + 1
+            self.selected = {index for index in self.selected if not first <= index <= last}
+            self.shift(last + 1, first - last - 1)
+            self.active = max(0, min(self.active, len(self.rows) - 1))
+        elif command == 'itemconfigure':
+            options = args[1:]
+            self.rows[self.index(args[0])][1].update(zip(options[::2], options[1::2]))
+        elif command == 'selection':
+            first = self.index(args[1])
+            last = self.index(args[2]) if len(args) > 2 else first
+            indices = range(max(first, 0), min(last, len(self.rows) - 1) + 1)
+            if args[0] == 'set':
+                self.selected.update(indices)
+            else:
+                self.selected.difference_update(indices)
+        elif command == 'curselection':
+            return tuple(sorted(self.selected))
+        elif command == 'activate':
+            self.active = max(0, min(self.index(args[0]), len(self.rows) - 1))
+        elif command == 'index':
+            return self.active if args[0] == tk.ACTIVE else self.index(args[0])
+        return ''
+
+    def shift(self, start, count):
+        self.selected = {index + count if index >= start else index for index in self.selected}
+        if self.active >= start:
+            self.active += count
+
+    def createcommand(self, name, function):
+        pass
+
+    def splitlist(self, value):
+        return value
+
+    getint = int
+
+
+class TestVirtualListbox(unittest.TestCase):
+
+    def setUp(self):
+        self.tcl = FakeListboxTcl()
+        self.names = [f"Task {i}" for i in range(1000)]
+
+        def init(listbox, master, **kwargs):
+            listbox.tk, listbox._w, listbox._tclCommands = self.tcl, '.listbox', None
+        with patch.object(tk.Listbox, '__init__', init):
+            self.listbox = VirtualListbox(None, get_row=lambda index: (self.names[index], 'normal'), height=10)
+        self.listbox.styles = {'normal': ('', ''), 'done': ('green', 'white')}
+        self.listbox.refresh(len(self.names))
+
+    def shown(self):
+        return [text for text, _ in self.tcl.rows]
+
+    def test_renders_only_the_window(self):
+        self.assertEqual(self.shown(), self.names[:15])
+        self.listbox.see(500)
+        start = self.listbox.window_start
+        self.assertEqual(self.shown(), self.names[start:start + len(self.tcl.rows)])
+        self.assertLessEqual(len(self.tcl.rows), 10 + 2 * VirtualListbox.OVERSCAN)
+        self.assertTrue(start <= 500 < start + len(self.tcl.rows))
+
+    def test_redraws_only_changed_rows(self):
+        self.tcl.rows_written = 0
+        self.names[3] = "Renamed"
+        self.listbox.refresh()
+        self.assertEqual(self.shown(), self.names[:15])
+        self.assertEqual(self.tcl.rows_written, 2)
+
+        self.tcl.rows_written = 0
+        self.names.insert(8, self.names.pop(2))
+        self.listbox.refresh()
+        self.assertEqual(self.shown(), self.names[:15])
+        self.assertEqual(self.tcl.rows_written, 2)
+
+    def test_restyles_only_rows_whose_style_changed(self):
+        self.listbox.get_row = lambda index: (self.names[index], 'done' if index % 2 else 'normal')
+        self.listbox.refresh()
+        self.tcl.calls.clear()
+        self.listbox.set_styles({'normal': ('', ''), 'done': ('black', 'white')})
+        self.assertEqual(self.tcl.calls.count('itemconfigure'), 7)
+        self.assertEqual(self.tcl.rows[1][1], {'-bg': 'black', '-fg': 'white'})
+
+    def test_selection_uses_whole_list_indices(self):
+        self.tcl.calls.clear()
+        self.listbox.selection_replace(RangeSet([(0, 1000)]))
+        self.assertLessEqual(self.tcl.calls.count('selection'), 2)
+        self.assertEqual(self.listbox.selection_count(), 1000)
+        self.assertEqual(self.tcl.selected, set(range(15)))
+
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(600, 605)
+        self.listbox.see(600)
+        start = self.listbox.window_start
+        self.assertEqual({start + index for index in self.tcl.selected}, set(range(600, 606)))
+        # A click handled by Tk's own bindings only touches the rendered rows
+        self.tcl.selected = {0}
+        self.assertEqual(self.listbox.curselection(), (start,))
+        self.assertTrue(self.listbox.selection_includes(start))
+
+    def test_arrow_keys_move_past_the_window(self):
+        for _ in range(30):
+            self.listbox.on_move_key(MagicMock(keysym='Down'))
+        self.assertEqual(self.listbox.curselection(), (30,))
+        self.assertEqual(self.tcl.rows[self.tcl.active][0], "Task 30")
+        self.listbox.on_move_key(MagicMock(keysym='Next'))
+        self.assertEqual(self.listbox.curselection(), (40,))
+
+    def test_diff_rows(self):
+        old_rows = [("⬜ Task 1", ""), ("⬜ Task 2", ""), ("⬜ Task 3", "")]
+        new_rows = [("⬜ Task 1", ""), ("✔ Task 2", ""), ("⬜ Task 3", "")]
+        self.assertEqual(VirtualListbox.diff_rows(old_rows, new_rows), (1, 2, 2))
+        self.assertEqual(VirtualListbox.diff_rows(old_rows, old_rows[:2]), (2, 3, 2))
+        self.assertEqual(VirtualListbox.diff_rows([], old_rows), (0, 0, 3))
+
+    def test_find_move(self):
+        rows = [("⬜ Task 1", 'normal'), ("✔ Task 2", 'done'), ("⬜ Task 3", 'urgent')]
+        self.assertEqual(VirtualListbox.find_move(rows, rows[1:] + rows[:1]), (0, 2))
+        self.assertEqual(VirtualListbox.find_move(rows, rows[2:] + rows[:2]), (2, 0))
+        self.assertIsNone(VirtualListbox.find_move(rows, rows[::-1]))
+        self.assertIsNone(VirtualListbox.find_move(rows, rows[:2]))
 
 if __name__ == "__main__":
     unittest.main()
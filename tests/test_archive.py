@@ -0,0 +1,39 @@
+import unittest
+import gzip
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.archive import Archive
+from todo_app.model import CANCELLED, DONE, Task
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.archive = Archive(Path(self.tmp_dir.name) / 'tasks.json')
+
+    def test_empty(self):
+        self.assertEqual(self.archive.search(), [])
+
+    def test_appends_compressed_members(self):
+        self.archive.append([Task("Buy milk", DONE, 10), Task("Call bank", CANCELLED, 20)], 100)
+        self.archive.append([Task("Buy bread", DONE, 30)], 200)
+        self.assertEqual(self.archive.path.name, 'tasks.archive.gz')
+        with gzip.open(self.archive.path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        found = self.archive.search("BUY")
+        self.assertEqual([(number, task.name, archived_at) for number, task, archived_at in found],
+                         [(0, "Buy milk", 100), (2, "Buy bread", 200)])
+        self.assertEqual(found[0][1], Task("Buy milk", DONE, 10))
+        self.assertEqual(len(self.archive.search(limit=1)), 1)
+
+    def test_restored_entries_are_hidden(self):
+        self.archive.append([Task("Buy milk", DONE, 10), Task("Call bank", CANCELLED, 20)], 100)
+        self.archive.mark_restored([0])
+        self.archive.append([Task("Buy bread", DONE, 30)], 200)
+        self.assertEqual([number for number, _, _ in self.archive.search()], [1, 2])
+
+if __name__ == "__main__":
+    unittest.main()
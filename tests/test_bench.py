@@ -0,0 +1,24 @@
+import unittest
+import contextlib
+import io
+import json
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+import bench
+
+class TestBench(unittest.TestCase):
+
+    def test_runs_on_every_backend(self):
+        for backend in ('json', 'journal', 'sqlite', 'binary'):
+            with self.subTest(backend=backend):
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+                    bench.main(['--sizes', '10', '--backend', backend, '--no-gui', '--repeat', '1'])
+                # Errors printed while saving would break the JSON report
+                report = json.loads(out.getvalue())
+                operations = {row['operation'] for row in report['results']}
+                self.assertIn('rpc_pipelined_1000', operations)
+
+if __name__ == "__main__":
+    unittest.main()
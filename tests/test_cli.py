@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+import io
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app import cli
+from todo_app.core import TodoList
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = Path(self.tmp_dir.name) / 'todo_app' / 'tasks.json'
+        self.path.parent.mkdir()
+        self.path.write_text(json.dumps([{"name": "Existing"}]), encoding='utf-8')
+        for target, value in (('todo_app.core.get_tasks_file', self.path), ('todo_app.core.read_config', {})):
+            patcher = patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_cli(self, *args, stdin=''):
+        out = io.StringIO()
+        with patch('sys.stdin', io.StringIO(stdin)), patch('sys.stdout', out):
+            status = cli.main(list(args))
+        return status, out.getvalue()
+
+    def saved_names(self):
+        return [task['name'] for task in json.loads(self.path.read_text(encoding='utf-8'))]
+
+    def test_add_list_and_done(self):
+        self.assertEqual(self.run_cli('add', '--', 'Buy milk', '---Later')[0], 0)
+        self.assertEqual(self.run_cli('done', '2')[0], 0)
+        status, out = self.run_cli('list')
+        self.assertEqual(out.splitlines()[:2], ["    1  [ ] Existing", "    2  [x] Buy milk"])
+        self.assertIn("LATER", out.splitlines()[2])
+        self.assertEqual(self.run_cli('list', '--open')[1].count('Buy milk'), 0)
+
+    def test_import_writes_once(self):
+        lines = ''.join(f"Task {i}\n" for i in range(100)) + "\n"
+        save = TodoList.save
+        with patch.object(TodoList, 'save', autospec=True, side_effect=save) as saves:
+            self.assertEqual(self.run_cli('import', stdin=lines)[0], 0)
+        self.assertEqual(saves.call_count, 1)
+        self.assertEqual(len(self.saved_names()), 101)
+
+    def test_export_and_import_files(self):
+        self.run_cli('add', '--', 'Urgent', '---Later')
+        csv_path = self.path.parent / 'tasks.csv'
+        self.assertEqual(self.run_cli('export', str(csv_path))[0], 0)
+        self.assertEqual(self.run_cli('--list', 'Copy', 'import', str(csv_path))[0], 0)
+        self.assertEqual(self.run_cli('--list', 'Copy', 'list')[1], self.run_cli('list')[1])
+        self.assertIn("- [ ] Existing", self.run_cli('export', '--format', 'markdown')[1])
+
+    def test_read_only_commands_write_nothing(self):
+        self.run_cli('--list', 'Other', 'add', 'Task')
+        files = {path: path.stat().st_mtime_ns for path in self.path.parent.rglob('*')}
+        with patch('todo_app.lists.write_atomic') as write_atomic, patch('todo_app.storage.write_atomic') as write:
+            self.assertEqual(self.run_cli('list')[0], 0)
+            self.assertEqual(self.run_cli('--list', 'Other', 'export')[0], 0)
+        write_atomic.assert_not_called()
+        write.assert_not_called()
+        self.assertEqual({path: path.stat().st_mtime_ns for path in self.path.parent.rglob('*')}, files)
+
+    def test_unreadable_list(self):
+        with patch('todo_app.core.TodoList.open', side_effect=PermissionError("Permission denied")), \
+                patch('sys.stderr', io.StringIO()) as err:
+            self.assertEqual(self.run_cli('--file', str(self.path), 'list')[0], 1)
+        self.assertIn("Permission denied", err.getvalue())
+
+    def test_invalid_number(self):
+        with patch('sys.stderr', io.StringIO()) as err:
+            self.assertEqual(self.run_cli('done', '5')[0], 1)
+        self.assertIn("No task number 5", err.getvalue())
+
+    def test_named_list(self):
+        self.run_cli('--list', 'Work', 'add', 'Report')
+        self.assertTrue((self.path.parent / 'lists' / 'Work.json').is_file())
+        self.assertEqual(self.saved_names(), ["Existing"])
+
+    def test_does_not_import_tkinter(self):
+        code = "import sys, todo_app.cli; print('tkinter' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent.parent)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+import unittest
+from unittest.mock import patch
+import json
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.core import TodoList, parse_task, separator_name, separator_title
+from todo_app.model import SEPARATOR, TITLE
+
+class TestTodoList(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+        self.path.write_text(json.dumps([
+            {"name": "Task 1", "done": False, "cancelled": False, "urgent": False, "separator": False},
+            {"name": "Task 2", "done": True, "cancelled": False, "urgent": True, "separator": False},
+            {"name": "───────", "separator": True, "title": False}
+        ]), encoding='utf-8')
+        self.todo = TodoList.open(self.path, 'json')
+
+    def tearDown(self):
+        self.todo.close()
+        self.tmp_dir.cleanup()
+
+    def saved_tasks(self):
+        self.todo.flush()
+        return json.loads(self.path.read_text(encoding='utf-8'))
+
+    def test_load_tasks(self):
+        self.assertEqual(len(self.todo), 3)
+        self.assertEqual(self.todo[0].name, "Task 1")
+        self.assertFalse(self.todo[0].done)
+        self.assertTrue(self.todo[1].done)
+        self.assertTrue(self.todo[1].urgent)
+        self.assertTrue(self.todo[2].separator)
+
+    def test_open_uses_configured_backend(self):
+        with patch('todo_app.core.read_config', return_value={'storage': 'sqlite'}):
+            todo = TodoList.open(self.path)
+        self.assertEqual(type(todo.storage).__name__, 'SqliteStorage')
+        self.assertEqual(len(todo), 3)
+        todo.close()
+
+    def test_save_tasks(self):
+        self.todo.add("Task 3")
+        saved_data = self.saved_tasks()
+        self.assertEqual(len(saved_data), 4)
+        self.assertEqual(saved_data[3], {"name": "Task 3", "done": False, "cancelled": False, "urgent": False,
+                                         "separator": False, "title": False})
+        self.assertTrue(saved_data[1]['urgent'])
+        self.assertTrue(saved_data[2]['separator'])
+
+    def test_empty_selection_writes_nothing(self):
+        for backend in ('journal', 'sqlite'):
+            with self.subTest(backend=backend):
+                todo = TodoList.open(self.path, backend)
+                with patch.object(todo.storage, 'rewrite') as rewrite, \
+                        patch.object(todo.storage, 'write' if backend == 'sqlite' else 'compact') as write:
+                    todo.toggle_done([])
+                    todo.remove([])
+                rewrite.assert_not_called()
+                write.assert_not_called()
+                todo.toggle_done([0])
+                todo.save(full=True)
+                tasks = todo.tasks.snapshot()
+                todo.close()
+                reopened = TodoList.open(self.path, backend)
+                self.assertEqual(reopened.tasks.snapshot(), tasks)
+                reopened.close()
+
+    def test_add_ignores_blank_text(self):
+        self.assertIsNone(self.todo.add("   "))
+        self.assertEqual(len(self.todo), 3)
+
+    def test_remove(self):
+        self.todo.remove([0, 2])
+        self.assertEqual([task.name for task in self.todo.tasks], ["Task 2"])
+        self.assertEqual(len(self.saved_tasks()), 1)
+
+    def test_toggle_done_clears_urgent(self):
+        self.todo.toggle_urgent([0])
+        self.todo.toggle_done([0, 1])
+        self.assertTrue(self.todo[0].done)
+        self.assertFalse(self.todo[0].urgent)
+        self.assertFalse(self.todo[1].done)
+        self.assertTrue(self.todo[1].urgent)
+
+    def test_toggle_cancelled_clears_urgent(self):
+        self.todo.toggle_cancelled([1])
+        self.assertTrue(self.todo[1].cancelled)
+        self.assertFalse(self.todo[1].urgent)
+        self.assertEqual(self.todo.counts()['total'], 1)
+
+    def test_move(self):
+        self.todo.move(0, 2)
+        self.assertEqual([task['name'] for task in self.saved_tasks()], ["Task 2", "───────", "Task 1"])
+
+    def test_index_of_follows_moves(self):
+        uid = self.todo[0].uid
+        self.todo.move(0, 2)
+        self.todo.rename(2, "Renamed")
+        self.assertEqual(self.todo.index_of(uid), 2)
+        self.todo.remove([2])
+        self.assertIsNone(self.todo.index_of(uid))
+
+    def test_unchanged_edits_are_not_recorded(self):
+        self.todo.set_separator_title(2, "Later")
+        undo_steps = len(self.todo.history.undo_stack)
+        with patch.object(self.todo.storage, 'save') as save:
+            self.todo.move(1, 1)
+            self.todo.rename(0, " Task 1 ")
+            self.todo.set_separator_title(2, "later")
+            self.todo.tasks.move(0, 0)
+        save.assert_not_called()
+        self.assertFalse(self.todo.unsaved)
+        self.assertEqual(len(self.todo.history.undo_stack), undo_steps)
+        self.assertEqual(self.todo.tasks.undo_log, [])
+
+    def test_batch_saves_and_notifies_once(self):
+        changes = []
+        self.todo.change_listeners.append(lambda: changes.append(len(self.todo)))
+        with patch.object(self.todo.storage, 'save', wraps=self.todo.storage.save) as save:
+            with self.todo.batch():
+                self.todo.add("Task 3")
+                with self.todo.batch():
+                    self.todo.toggle_done([0])
+                self.todo.remove([1])
+                self.assertEqual(changes, [])
+            self.assertEqual(save.call_count, 1)
+        self.assertEqual(changes, [3])
+        self.assertEqual([task['name'] for task in self.saved_tasks()], ["Task 1", "───────", "Task 3"])
+
+    def test_unbatched_edits_notify_each_time(self):
+        changes = []
+        self.todo.change_listeners.append(lambda: changes.append(len(self.todo)))
+        self.todo.add("Task 3")
+        self.todo.remove([3])
+        self.assertEqual(changes, [4, 3])
+
+    def test_undo_redo(self):
+        original = self.todo.tasks.snapshot()
+        self.todo.toggle_done([0, 1])
+        self.todo.rename(0, "Renamed")
+        self.todo.move(0, 2)
+        self.todo.remove([0, 2])
+        self.todo.add("Task 3")
+        after = self.todo.tasks.snapshot()
+        while self.todo.undo():
+            pass
+        self.assertEqual(self.todo.tasks.snapshot(), original)
+        self.assertEqual(self.saved_tasks(), [task.to_dict() for task in original])
+        while self.todo.redo():
+            pass
+        self.assertEqual(self.todo.tasks.snapshot(), after)
+        self.todo.tasks.check_counts()
+
+    def test_undo_batch_is_one_step(self):
+        with self.todo.batch():
+            self.todo.toggle_done([0])
+            self.todo.remove([1, 2])
+        changes = []
+        self.todo.change_listeners.append(lambda: changes.append(len(self.todo)))
+        self.assertTrue(self.todo.undo())
+        self.assertEqual(changes, [3])
+        self.assertFalse(self.todo[0].done)
+        self.assertFalse(self.todo.undo())
+
+    def test_new_edit_clears_redo(self):
+        self.todo.add("Task 3")
+        self.todo.undo()
+        self.todo.add("Task 4")
+        self.assertFalse(self.todo.redo())
+        self.assertEqual(self.todo[3].name, "Task 4")
+
+    def test_toggles_track_closed_at(self):
+        self.todo.toggle_done([0])
+        closed_at = self.todo[0].closed_at
+        self.assertIsNotNone(closed_at)
+        self.todo.toggle_cancelled([0])
+        self.assertEqual(self.todo[0].closed_at, closed_at)
+        self.todo.toggle_done([0])
+        self.todo.toggle_cancelled([0])
+        self.assertIsNone(self.todo[0].closed_at)
+        self.assertEqual(self.saved_tasks()[0].get('closed_at'), None)
+
+    def test_archive_closed(self):
+        self.assertEqual(self.todo.archive_closed(100, now=1000), 0)
+        self.assertEqual(self.todo[1].closed_at, 1000)
+        self.assertEqual(self.todo.archive_closed(100, now=1100), 1)
+        self.assertEqual([task.name for task in self.todo.tasks], ["Task 1", "───────"])
+        self.assertEqual(len(self.saved_tasks()), 2)
+        self.assertFalse(self.todo.undo())
+
+        entries = self.todo.search_archive("task 2")
+        self.assertEqual([(task.name, archived_at) for _, task, archived_at in entries], [("Task 2", 1100)])
+        self.todo.restore_archived(entries)
+        self.assertEqual(self.todo[2].name, "Task 2")
+        self.assertTrue(self.todo[2].done)
+        self.assertEqual(self.todo.search_archive(), [])
+        self.assertEqual(self.todo.archive_closed(100, now=1200), 0)
+
+class TestProgressiveLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+        self.path.write_text(json.dumps([{"name": f"Task {i}", "done": i < 4} for i in range(10)]), encoding='utf-8')
+        self.todo = TodoList.open(self.path, 'json', progressive=True)
+
+    def tearDown(self):
+        self.todo.close()
+        self.tmp_dir.cleanup()
+
+    def test_loads_in_batches(self):
+        self.assertEqual(len(self.todo), 0)
+        self.assertTrue(self.todo.load_next(3))
+        self.assertEqual(len(self.todo), 3)
+        self.assertEqual(self.todo.counts()['done'], 3)
+        while self.todo.load_next(3):
+            pass
+        self.assertFalse(self.todo.loading)
+        self.assertEqual(self.todo.counts(), {'total': 10, 'done': 4, 'cancelled': 0, 'urgent': 0, 'separator': 0})
+
+    def test_mutation_finishes_loading(self):
+        self.todo.load_next(3)
+        self.todo.add("Task 10")
+        self.assertFalse(self.todo.loading)
+        self.assertEqual(self.todo[10].name, "Task 10")
+        self.todo.flush()
+        self.assertEqual(len(json.loads(self.path.read_text(encoding='utf-8'))), 11)
+
+class TestSeparators(unittest.TestCase):
+
+    def test_parse_task(self):
+        self.assertEqual(parse_task("  Task 1 ").name, "Task 1")
+        self.assertEqual(parse_task("---").flags, SEPARATOR)
+        titled = parse_task("---groceries")
+        self.assertEqual(titled.flags, SEPARATOR | TITLE)
+        self.assertEqual(separator_title(titled), "GROCERIES")
+
+    def test_separator_name(self):
+        self.assertEqual(separator_name(), '─' * 40)
+        self.assertEqual(separator_name("todo"), f"{'─' * 2} TODO {'─' * 30}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import io
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.core import TodoList, separator_name
+from todo_app.formats import FORMATS, export_file, import_file, read_markdown, read_todotxt
+from todo_app.model import CANCELLED, DONE, SEPARATOR, TITLE, URGENT, Task
+from todo_app.storage import JsonStorage
+
+class TestFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = [
+            Task("Open task"),
+            Task("Done task", DONE),
+            Task("Urgent task", URGENT),
+            Task("Cancelled task", CANCELLED),
+            Task("Done, cancelled and urgent", DONE | CANCELLED | URGENT),
+            Task(separator_name("later"), SEPARATOR | TITLE),
+            Task('Spaces  inside, commas, "quotes" and ünïcode ✓'),
+            Task(separator_name(), SEPARATOR),
+        ]
+
+    def round_trip(self, fmt, tasks):
+        read, write = FORMATS[fmt]
+        out = io.StringIO(newline='')
+        write(tasks, out)
+        return list(read(io.StringIO(out.getvalue(), newline='')))
+
+    def test_round_trips_flags_and_separators(self):
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                self.assertEqual(self.round_trip(fmt, self.tasks), self.tasks)
+
+    def test_round_trips_names_that_look_like_markup(self):
+        names = ["x marks the spot", "(A) plan", "2024-01-01 release", "cancel status:cancelled", "raise pri:B",
+                 "---not a separator", "**bold**", "~~x~~", " padded ", "\\x", "ends with \\", "x"]
+        tasks = [Task(name, flags) for name in names for flags in (0, DONE, URGENT, CANCELLED, DONE | URGENT)]
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                self.assertEqual(self.round_trip(fmt, tasks), tasks)
+
+    def test_skips_lines_with_only_marks(self):
+        lines = "x\n(A)\nx 2024-01-01\nx \n- [x] \\\nTask\n"
+        self.assertEqual([task.name for task in read_todotxt(io.StringIO(lines))], ["- [x] \\", "Task"])
+        self.assertEqual(list(read_markdown(io.StringIO("- [x] \\\n- [ ] ~~  ~~\n"))), [])
+
+    def test_line_breaks_become_spaces(self):
+        tasks = [Task("Two\nlines"), Task("Windows\r\nbreak", DONE), Task(separator_name("a\rb"), SEPARATOR | TITLE)]
+        for fmt in ('todotxt', 'markdown'):
+            with self.subTest(fmt=fmt):
+                self.assertEqual([task.name for task in self.round_trip(fmt, tasks)],
+                                 ["Two lines", "Windows break", separator_name("a b")])
+
+    def test_closed_at(self):
+        tasks = [Task("Done task", DONE, 1700000000)]
+        self.assertEqual(self.round_trip('csv', tasks), tasks)
+        closed_at = self.round_trip('todotxt', tasks)[0].closed_at
+        self.assertLessEqual(abs(closed_at - 1700000000), 86400)
+
+    def test_reads_todotxt_from_other_tools(self):
+        lines = "(B) 2024-01-02 Call mom +family @phone\nx 2024-02-01 2024-01-15 Pay rent\n\n"
+        self.assertEqual([(task.name, task.flags) for task in read_todotxt(io.StringIO(lines))],
+                         [("Call mom +family @phone", URGENT), ("Pay rent", DONE)])
+
+class TestImportExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dir = Path(self.tmp_dir.name)
+
+    def test_import_saves_once_and_undoes_in_one_step(self):
+        source = TodoList(JsonStorage(self.dir / 'source.json'))
+        source.import_tasks(Task(f"Task {i}", i % 4) for i in range(2500))
+        export_file(source, self.dir / 'tasks.md')
+        source.close()
+
+        storage = JsonStorage(self.dir / 'tasks.json')
+        todo = TodoList(storage)
+        self.addCleanup(todo.close)
+        self.assertEqual(import_file(todo, self.dir / 'tasks.md'), 2500)
+        self.assertEqual(storage.writer.submitted, 1)
+        self.assertEqual(list(todo.tasks), list(source.tasks))
+        todo.undo()
+        self.assertEqual(len(todo), 0)
+
+    def test_unknown_extension(self):
+        todo = TodoList(JsonStorage(self.dir / 'tasks.json'))
+        self.addCleanup(todo.close)
+        with self.assertRaises(ValueError):
+            export_file(todo, self.dir / 'tasks.doc')
+
+if __name__ == "__main__":
+    unittest.main()
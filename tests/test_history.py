@@ -0,0 +1,28 @@
+import unittest
+import sys
+sys.path.append('../')
+from todo_app.history import History, estimate_size
+from todo_app.model import Task
+
+class TestHistory(unittest.TestCase):
+
+    def test_oldest_steps_are_evicted(self):
+        step = [('update', 0, 1, None, None)]
+        history = History(limit=estimate_size(list(step)) * 3)
+        for _ in range(5):
+            history.record(list(step))
+        self.assertEqual(len(history.undo_stack), 3)
+        self.assertLessEqual(history.size, history.limit)
+
+    def test_size_follows_stacks(self):
+        history = History()
+        history.record([('restore', [(0, Task("A long task name " * 10))])])
+        history.record([('move', 0, 1)])
+        ops = history.pop(history.undo_stack)
+        history.push(history.redo_stack, ops)
+        history.record([('remove', [0])])
+        self.assertFalse(history.can_redo)
+        self.assertEqual(history.size, sum(size for _, size in history.undo_stack))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+import json
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.lists import DEFAULT_LIST, TaskLists, check_list_name
+
+class TestTaskLists(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.base_dir = Path(self.tmp_dir.name)
+        (self.base_dir / 'tasks.json').write_text(json.dumps([{"name": "Task 1", "done": True}]), encoding='utf-8')
+        self.lists = TaskLists(self.base_dir, 'json', undo_limit=1 << 20, max_open=2)
+        self.addCleanup(self.lists.close)
+
+    def test_default_list_is_tasks_json(self):
+        todo = self.lists.open(DEFAULT_LIST)
+        self.assertEqual(todo[0].name, "Task 1")
+        self.assertEqual(self.lists.names(), [DEFAULT_LIST])
+
+    def test_named_lists(self):
+        self.lists.open("Work").add("Report")
+        self.lists.open("home").add("Dishes")
+        self.assertEqual(self.lists.names(), [DEFAULT_LIST, "home", "Work"])
+        self.lists.close()
+        self.assertTrue((self.base_dir / 'lists' / 'Work.json').is_file())
+        self.assertEqual(TaskLists(self.base_dir, 'json', undo_limit=0).names(), [DEFAULT_LIST, "home", "Work"])
+
+    def test_least_recently_used_list_is_closed(self):
+        work = self.lists.open("Work")
+        work.add("Report")
+        self.lists.open("Home")
+        self.lists.open("Work")
+        self.lists.open(DEFAULT_LIST)
+        self.assertEqual(list(self.lists.open_lists), ["Work", DEFAULT_LIST])
+        self.lists.open("Shopping")
+        self.assertNotIn("Work", self.lists.open_lists)
+        self.assertEqual(json.loads((self.base_dir / 'lists' / 'Work.json').read_text(encoding='utf-8'))[0]['name'],
+                         "Report")
+        self.assertEqual(self.lists.open("Work")[0].name, "Report")
+
+    def test_counts_without_loading(self):
+        work = self.lists.open("Work")
+        work.add("Report")
+        work.toggle_done([0])
+        work.add("Slides")
+        self.lists.close()
+        with patch('todo_app.lists.TaskLists.scan_counts') as scan:
+            counts = self.lists.counts("Work")
+        scan.assert_not_called()
+        self.assertEqual((counts['done'], counts['total']), (1, 2))
+        self.assertEqual(self.lists.counts(DEFAULT_LIST)['done'], 1)
+
+    def test_stale_counts_are_recomputed(self):
+        self.assertEqual(self.lists.counts(DEFAULT_LIST)['total'], 1)
+        (self.base_dir / 'tasks.json').write_text(json.dumps([{"name": "Task 1"}, {"name": "Task 2"}]),
+                                                  encoding='utf-8')
+        self.assertEqual(self.lists.counts(DEFAULT_LIST)['total'], 2)
+
+    def test_check_list_name(self):
+        self.assertEqual(check_list_name(" Work "), "Work")
+        for name in ("", "../etc", ".counts", "a/b"):
+            with self.assertRaises(ValueError):
+                check_list_name(name)
+
+if __name__ == "__main__":
+    unittest.main()
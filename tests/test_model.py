@@ -0,0 +1,65 @@
+import unittest
+import json
+import sys
+sys.path.append('../')
+from todo_app.model import CANCELLED, DONE, SEPARATOR, TITLE, URGENT, Task, TaskStore, dump_tasks
+
+class TestTask(unittest.TestCase):
+
+    def test_dict_round_trip(self):
+        data = {"name": "Task 1", "done": True, "cancelled": False, "urgent": True, "separator": False, "title": False}
+        task = Task.from_dict(data)
+        self.assertEqual(task.flags, DONE | URGENT)
+        self.assertEqual(task.to_dict(), data)
+
+    def test_replace(self):
+        task = Task("Task 1", DONE | URGENT)
+        changed = task.replace(name="Task 2", urgent=False)
+        self.assertEqual(changed, Task("Task 2", DONE))
+        self.assertEqual(task, Task("Task 1", DONE | URGENT))
+
+    def test_dump_tasks_matches_json(self):
+        tasks = [Task("Task 1"), Task("Tâsk \"2\"", DONE, 1700000000), Task('─' * 40, SEPARATOR | TITLE)]
+        self.assertEqual(dump_tasks(tasks), json.dumps([task.to_dict() for task in tasks], indent=4))
+        self.assertEqual(dump_tasks([]), json.dumps([], indent=4))
+
+class TestTaskStore(unittest.TestCase):
+
+    def test_changes_are_reported(self):
+        store = TaskStore([Task("Task 1"), Task("Task 2")])
+        records = []
+        store.listeners.append(lambda op, **fields: records.append((op, fields)))
+        store.append(Task("Task 3"))
+        store.update(0, done=True)
+        store.move(2, 0)
+        store.remove([1])
+        self.assertEqual([task.name for task in store], ["Task 3", "Task 2"])
+        self.assertEqual([op for op, _ in records], ['add', 'update', 'move', 'remove'])
+        self.assertEqual(records[1][1], {'index': 0, 'set': {'done': True}})
+
+    def test_counters_follow_changes(self):
+        store = TaskStore([Task("Task 1"), Task("Task 2", DONE), Task('─' * 40, SEPARATOR), Task("Task 3", CANCELLED)])
+        self.assertEqual(store.counts(), {'total': 2, 'done': 1, 'cancelled': 1, 'urgent': 0, 'separator': 1})
+        store.update(0, done=True, urgent=True)
+        store.append(Task("Task 4", URGENT))
+        store.remove([1, 3])
+        store.check_counts()
+        self.assertEqual(store.counts(), {'total': 2, 'done': 1, 'cancelled': 0, 'urgent': 2, 'separator': 1})
+
+    def test_remove_many(self):
+        store = TaskStore(Task(f"Task {i}", DONE if i % 2 else 0) for i in range(10))
+        records = []
+        store.listeners.append(lambda op, **fields: records.append(fields))
+        store.remove([9, 0, 4, 5, 4])
+        self.assertEqual([task.name for task in store], [f"Task {i}" for i in (1, 2, 3, 6, 7, 8)])
+        self.assertEqual(records, [{'indices': [0, 4, 5, 9]}])
+        store.check_counts()
+
+    def test_check_counts_detects_drift(self):
+        store = TaskStore([Task("Task 1")])
+        store.tasks.append(Task("Task 2"))
+        with self.assertRaises(AssertionError):
+            store.check_counts()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.profiling import Profiler
+
+class Widget:
+
+    def redraw(self, seconds):
+        self.clock.advance(seconds)
+
+    def on_click(self, seconds):
+        self.redraw(seconds)
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.log = Path(self.tmp_dir.name) / 'profile.log'
+        self.profiler = Profiler(self.log, capture_dir=self.tmp_dir.name)
+        self.widget = Widget()
+        self.widget.clock = FakeClock()
+        patcher = patch('todo_app.profiling.time.perf_counter', self.widget.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_percentiles_per_call_site(self):
+        self.profiler.instrument(self.widget, ['redraw'])
+        self.profiler.instrument(self.widget, ['on_click'], capture=True)
+        for ms in range(1, 101):
+            self.widget.on_click(ms / 1000)
+        rows = {row[0]: row[1:] for row in self.profiler.summary()}
+        count, p50, p95, longest = rows['redraw']
+        self.assertEqual(count, 100)
+        self.assertAlmostEqual(p50, 0.051)
+        self.assertAlmostEqual(p95, 0.096)
+        self.assertAlmostEqual(longest, 0.1)
+        self.assertEqual(rows['on_click'][0], 100)
+        self.assertNotIn('redraw', vars(Widget()))
+
+        self.profiler.write_report()
+        self.assertIn("redraw", self.log.read_text(encoding='utf-8'))
+
+    def test_captures_first_slow_interaction(self):
+        self.profiler.instrument(self.widget, ['redraw'])
+        self.profiler.instrument(self.widget, ['on_click'], capture=True)
+        self.profiler.capture_next(50)
+        self.widget.redraw(0.2)  # not an interaction
+        self.widget.on_click(0.01)
+        self.assertEqual(self.profiler.captures, [])
+        self.widget.on_click(0.06)
+        self.widget.on_click(0.07)
+        self.assertEqual(len(self.profiler.captures), 1)
+        self.assertIn("profile-on_click-", self.profiler.captures[0].name)
+        self.assertTrue(self.profiler.captures[0].is_file())
+        self.assertIn("capture: on_click 60.0 ms", self.log.read_text(encoding='utf-8'))
+
+    def test_disabled_by_default(self):
+        with patch.dict('os.environ', {'TODO_APP_PROFILE': ''}):
+            self.assertIsNone(Profiler.from_config({}, self.tmp_dir.name))
+            profiler = Profiler.from_config({'profile': True}, self.tmp_dir.name)
+        self.assertEqual(profiler.log_target, Path(self.tmp_dir.name) / 'profile.log')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+sys.path.append('../')
+from todo_app.model import DONE, Task, TaskStore
+from todo_app.search import SearchIndex
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TaskStore([Task("Buy milk"), Task("Call the bank"), Task("Buy bread"), Task("Bank holiday")])
+        self.index = SearchIndex(self.store)
+
+    def test_find(self):
+        self.assertEqual(self.index.find("buy"), [0, 2])
+        self.assertEqual(self.index.find("BANK"), [1, 3])
+        self.assertEqual(self.index.find("y m"), [0])
+        self.assertEqual(self.index.find("b"), [0, 1, 2, 3])
+        self.assertEqual(self.index.find("nothing"), [])
+
+    def test_narrowing_query(self):
+        self.assertEqual(self.index.find("bu"), [0, 2])
+        self.assertEqual(self.index.find("buy b"), [2])
+        self.assertEqual(self.index.find("bu"), [0, 2])
+
+    def test_follows_changes(self):
+        self.index.find("buy")
+        self.store.update(1, name="Buy stamps")
+        self.store.update(0, done=True)
+        self.assertEqual(self.index.find("buy"), [0, 1, 2])
+        self.store.move(2, 0)
+        self.store.remove([1])
+        self.store.insert(0, Task("Buy eggs", DONE))
+        self.assertEqual(self.index.find("buy"), [0, 1, 2])
+        self.assertEqual([self.store[i].name for i in self.index.find("buy")], ["Buy eggs", "Buy bread", "Buy stamps"])
+        self.assertEqual(self.index.find("milk"), [])
+        self.assertEqual(len(self.index.names), 4)
+        self.assertEqual(self.index.grams["buy"], {self.store[i].uid for i in (0, 1, 2)})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import random
+import sys
+sys.path.append('../')
+from todo_app.selection import RangeSet
+
+class TestRangeSet(unittest.TestCase):
+
+    def test_merges_touching_ranges(self):
+        ranges = RangeSet([(0, 2), (5, 7)])
+        ranges.add(2, 5)
+        self.assertEqual(ranges.ranges(), [(0, 7)])
+        self.assertEqual(len(ranges), 7)
+        ranges.remove(3, 4)
+        self.assertEqual(ranges.ranges(), [(0, 3), (4, 7)])
+        self.assertEqual(ranges, RangeSet.from_indices([0, 1, 2, 4, 5, 6]))
+        self.assertNotIn(3, ranges)
+        self.assertIn(6, ranges)
+
+    def test_window(self):
+        ranges = RangeSet([(0, 3), (10, 20), (30, 40)])
+        self.assertEqual(list(ranges.window(2, 15)), [(2, 3), (10, 15)])
+        self.assertEqual(list(ranges.window(20, 30)), [])
+
+    def test_matches_a_set(self):
+        rng = random.Random(1)
+        ranges, indices = RangeSet(), set()
+        for _ in range(2000):
+            start = rng.randrange(200)
+            stop = start + rng.randrange(20)
+            if rng.random() < 0.6:
+                ranges.add(start, stop)
+                indices.update(range(start, stop))
+            else:
+                ranges.remove(start, stop)
+                indices.difference_update(range(start, stop))
+            self.assertEqual(list(ranges), sorted(indices))
+            self.assertEqual(len(ranges), len(indices))
+        self.assertEqual(ranges, RangeSet.from_indices(sorted(indices)))
+        self.assertEqual([index for index in range(220) if index in ranges], sorted(indices))
+
+if __name__ == "__main__":
+    unittest.main()
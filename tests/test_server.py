@@ -0,0 +1,169 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.core import TodoList
+from todo_app.server import (INVALID_PARAMS, METHOD_NOT_FOUND, SERVER_ERROR, UNAUTHORIZED, UNIX_PATH_MAX, TaskServer,
+                             rpc_add)
+
+class TestTaskServer(unittest.TestCase):
+    """Runs the server against a TodoList, with a thread standing in for the Tk thread."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        path = Path(self.tmp_dir.name) / 'tasks.json'
+        path.write_text(json.dumps([{"name": "Existing"}]), encoding='utf-8')
+        self.todo = TodoList.open(path)
+        self.addCleanup(self.todo.close)
+
+        wake = threading.Event()
+        socket_path = Path(self.tmp_dir.name) / 'todo.sock' if hasattr(socket, 'AF_UNIX') else None
+        self.server = TaskServer(lambda: self.todo, socket_path, port=0, notify=wake.set)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.batches = []
+
+        def owner():
+            while not self.stopping:
+                if wake.wait(0.05):
+                    wake.clear()
+                    count = self.server.process_requests()
+                    if count:
+                        self.batches.append(count)
+        self.stopping = False
+        thread = threading.Thread(target=owner)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(setattr, self, 'stopping', True)
+
+    def connect(self):
+        if self.server.path is not None:
+            client = socket.socket(socket.AF_UNIX)
+            client.connect(str(self.server.path))
+        else:
+            client = socket.create_connection(('127.0.0.1', self.server.port))
+            client.sendall(self.server.token.encode() + b'\n')
+        self.addCleanup(client.close)
+        return client.makefile('rwb')
+
+    def processed(self, count):
+        """Batch sizes, once the owner thread has recorded count requests; replies go out before it does."""
+        deadline = time.monotonic() + 5
+        while sum(self.batches) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.batches
+
+    def send(self, stream, messages):
+        stream.write(b''.join(json.dumps(message).encode() + b'\n' for message in messages))
+        stream.flush()
+
+    def call(self, method, **params):
+        stream = self.connect()
+        self.send(stream, [{'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}])
+        return json.loads(stream.readline())
+
+    def test_add_update_move_and_list(self):
+        self.assertEqual(self.call('add', texts=["First", "Second"])['result'], [1, 2])
+        self.assertTrue(self.call('update', index=2, done=True, name="Renamed")['result']['done'])
+        self.call('move', index=2, to=0)
+        listed = self.call('list')['result']
+        self.assertEqual([task['name'] for task in listed], ["Renamed", "Existing", "First"])
+        self.assertEqual([task['name'] for task in self.call('list', open_only=True)['result']],
+                         ["Existing", "First"])
+        self.assertEqual(self.call('counts')['result'], self.todo.counts())
+
+    def test_errors(self):
+        self.assertEqual(self.call('rename')['error']['code'], METHOD_NOT_FOUND)
+        self.assertEqual(self.call('add', colour="red")['error']['code'], INVALID_PARAMS)
+        self.assertEqual(self.call('update', index=5, done=True)['error']['code'], SERVER_ERROR)
+        self.assertEqual(len(self.todo), 1)
+
+    def test_burst_is_saved_once(self):
+        stream = self.connect()
+        save = TodoList.save
+        with patch.object(TodoList, 'save', autospec=True, side_effect=save) as saves:
+            # A JSON-RPC batch reaches the owner thread in one go.
+            self.send(stream, [[{'jsonrpc': '2.0', 'id': i, 'method': 'add', 'params': [f"Task {i}"]}
+                                for i in range(50)]])
+            replies = json.loads(stream.readline())
+        self.assertEqual(sorted(reply['id'] for reply in replies), list(range(50)))
+        self.assertEqual(saves.call_count, 1)
+        self.assertEqual(self.processed(50), [50])
+        self.assertEqual(len(self.todo), 51)
+
+    def test_pipelined_requests(self):
+        stream = self.connect()
+        self.send(stream, [{'jsonrpc': '2.0', 'id': i, 'method': 'add', 'params': {'text': f"Task {i}"}}
+                           for i in range(200)])
+        replies = [json.loads(stream.readline()) for _ in range(200)]
+        self.assertEqual(sorted(reply['id'] for reply in replies), list(range(200)))
+        self.assertEqual(sum(self.processed(200)), 200)
+        self.assertEqual(len(self.todo), 201)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs Unix sockets")
+    def test_second_server_does_not_take_over_the_socket(self):
+        other = TaskServer(lambda: self.todo, self.server.path)
+        with self.assertRaises(OSError):
+            other.start()
+        self.assertTrue(os.path.exists(self.server.path))
+        self.assertEqual(self.call('counts')['result'], self.todo.counts())
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs Unix sockets")
+    def test_socket_is_private(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.server.path).st_mode), 0o600)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs Unix sockets")
+    def test_socket_path_too_long(self):
+        path = Path(self.tmp_dir.name) / ('x' * UNIX_PATH_MAX)
+        with self.assertRaisesRegex(OSError, "rpc_port"):
+            TaskServer(lambda: self.todo, path).start()
+
+    def test_port_needs_the_token(self):
+        token_path = Path(self.tmp_dir.name) / 'todo.token'
+        server = TaskServer(lambda: self.todo, port=0, token_path=token_path)
+        server.start()
+        self.addCleanup(server.stop)
+        self.assertEqual(token_path.read_text(encoding='utf-8').strip(), server.token)
+        if os.name == 'posix':
+            self.assertEqual(stat.S_IMODE(token_path.stat().st_mode), 0o600)
+        request = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'counts'}).encode() + b'\n'
+
+        with socket.create_connection(('127.0.0.1', server.port)) as client:
+            client.sendall(request)
+            stream = client.makefile('rb')
+            self.assertEqual(json.loads(stream.readline())['error']['code'], UNAUTHORIZED)
+            self.assertEqual(stream.readline(), b'')
+        self.assertEqual(server.process_requests(), 0)
+
+        with socket.create_connection(('127.0.0.1', server.port)) as client:
+            client.sendall(token_path.read_bytes() + request)
+            deadline = time.monotonic() + 5
+            while not server.process_requests() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(json.loads(client.makefile('rb').readline())['result'], self.todo.counts())
+        server.stop()
+        self.assertFalse(token_path.exists())
+
+class TestMethods(unittest.TestCase):
+
+    def test_add_while_loading(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'tasks.json'
+            path.write_text(json.dumps([{"name": f"Task {i}"} for i in range(10)]), encoding='utf-8')
+            todo = TodoList.open(path, 'json', progressive=True)
+            todo.load_next(3)
+            self.assertEqual(rpc_add(todo, "New", index=8), [8])
+            self.assertEqual(todo[8].name, "New")
+            todo.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+import unittest
+import io
+import json
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.binfile import BinaryTaskFile, dump_binary
+from todo_app.model import DONE, Task, TaskStore, dump_tasks
+from todo_app.storage import BinaryStorage, JournalStorage, JsonStorage, SqliteStorage, TaskWriter, apply_record, iter_json_array, write_atomic
+
+class TestTaskWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write_atomic(self):
+        write_atomic(self.path, '[]')
+        self.assertEqual(self.path.read_text(encoding='utf-8'), '[]')
+        self.assertFalse(self.path.with_name('tasks.json.tmp').exists())
+
+    def test_coalesces_bursts(self):
+        writer = TaskWriter(self.path, delay=60)
+        for i in range(10):
+            writer.submit([Task(f"Task {i}")])
+        writer.close()
+        self.assertEqual(writer.writes, 1)
+        self.assertEqual(writer.writes_avoided, 9)
+        self.assertEqual(json.loads(self.path.read_text(encoding='utf-8')), [Task("Task 9").to_dict()])
+
+class TestJsonStorage(unittest.TestCase):
+
+    def test_iter_json_array(self):
+        items = [{"name": f"Task {i}", "done": i % 2 == 0} for i in range(50)]
+        text = json.dumps(items, indent=4)
+        self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size=7)), items)
+        self.assertEqual(list(iter_json_array(io.StringIO('[]'))), [])
+
+    def test_iter_tasks_matches_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'tasks.json'
+            path.write_text(json.dumps([{"name": "Task 1"}, {"name": "───", "separator": True}]), encoding='utf-8')
+            storage = JsonStorage(path)
+            self.assertEqual(list(storage.iter_tasks()), storage.load())
+            storage.close()
+
+class TestJournalStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+        self.path.write_text(json.dumps([{"name": "Task 1"}, {"name": "Task 2"}]), encoding='utf-8')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_replays_journal(self):
+        storage = JournalStorage(self.path)
+        tasks = storage.load()
+        tasks.append(Task("Task 3"))
+        storage.record('add', index=2, task={"name": "Task 3"})
+        storage.save(tasks)
+        tasks[0] = tasks[0].replace(done=True)
+        storage.record('update', index=0, set={'done': True})
+        storage.save(tasks)
+        tasks.insert(0, tasks.pop(2))
+        storage.record('move', index=2, to=0)
+        storage.save(tasks)
+        storage.journal.close()
+
+        self.assertEqual(len(json.loads(self.path.read_text(encoding='utf-8'))), 2)
+        reloaded = JournalStorage(self.path)
+        self.assertEqual(reloaded.load(), [Task("Task 3"), Task("Task 1").replace(done=True), Task("Task 2")])
+        reloaded.close()
+
+    def test_ignores_corrupt_header(self):
+        for header in ('{"snaps', '[]'):
+            with self.subTest(header=header):
+                self.path.with_suffix('.journal').write_text(header + '\n{"op": "remove", "indices": [0]}\n',
+                                                             encoding='utf-8')
+                storage = JournalStorage(self.path)
+                self.assertEqual(storage.load(), [Task("Task 1"), Task("Task 2")])
+                storage.close()
+
+    def test_compaction_folds_journal(self):
+        storage = JournalStorage(self.path, compact_after=1)
+        tasks = storage.load()
+        for index in (1, 0):
+            del tasks[index]
+            storage.record('remove', indices=[index])
+            storage.save(tasks)
+        storage.close()
+
+        self.assertEqual(json.loads(self.path.read_text(encoding='utf-8')), [])
+        self.assertEqual(len(storage.journal_path.read_text(encoding='utf-8').splitlines()), 1)
+
+class TestSqliteStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+        self.tasks = [
+            {"name": "Task 1", "done": False, "cancelled": False, "urgent": False, "separator": False, "title": False},
+            {"name": "Task 2", "done": True, "cancelled": False, "urgent": False, "separator": False, "title": False},
+            {"name": "───────", "done": False, "cancelled": False, "urgent": False, "separator": True, "title": False},
+            {"name": "Task 3", "done": False, "cancelled": True, "urgent": False, "separator": False, "title": False}
+        ]
+        self.path.write_text(json.dumps(self.tasks), encoding='utf-8')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_migrates_tasks_json(self):
+        storage = SqliteStorage(self.path)
+        self.assertEqual(storage.load(), [Task.from_dict(task) for task in self.tasks])
+        self.assertEqual(storage.counts(), {'total': 2, 'done': 1, 'cancelled': 1, 'urgent': 0, 'separator': 1})
+        storage.close()
+
+    def test_applies_records_in_one_transaction(self):
+        storage = SqliteStorage(self.path)
+        storage.load()
+        records = [
+            {'op': 'add', 'index': 1, 'task': {"name": "Task 4", "urgent": True}},
+            {'op': 'remove', 'indices': [0, 3]},
+            {'op': 'update', 'index': 0, 'set': {'done': True, 'urgent': False, 'closed_at': 1700000000}},
+            {'op': 'move', 'index': 2, 'to': 0}
+        ]
+        for record in records:
+            apply_record(self.tasks, json.loads(json.dumps(record)))
+            storage.record(**record)
+        storage.save(self.tasks)
+        storage.close()
+
+        reloaded = SqliteStorage(self.path)
+        tasks = [Task.from_dict(task) for task in self.tasks]
+        self.assertEqual(reloaded.load(), tasks)
+        self.assertEqual(reloaded.counts(), TaskStore(tasks).counts())
+        reloaded.close()
+
+    def test_move_writes_one_row(self):
+        storage = SqliteStorage(self.path)
+        storage.load()
+        changes = storage.conn.total_changes
+        storage.record('move', index=3, to=0)
+        storage.save(None)
+        self.assertEqual(storage.conn.total_changes - changes, 1)
+        self.assertEqual([task.name for task in storage.load()], ["Task 3", "Task 1", "Task 2", "───────"])
+        storage.close()
+
+    def test_rebalances_when_ranks_run_out(self):
+        storage = SqliteStorage(self.path)
+        store = TaskStore(storage.load())
+        store.listeners.append(storage.record)
+        for i in range(50):
+            store.insert(1, Task(f"New {i}"))
+            store.move(len(store) - 1, 1)
+        storage.save(store.snapshot())
+        self.assertGreater(storage.rebalances, 0)
+        self.assertEqual(storage.load(), store.snapshot())
+        storage.close()
+
+class TestBinaryStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+        self.tasks = [Task("Task 1"), Task("Tâche ✓ 2", DONE, 1700000000), Task("───────", 8),
+                      Task("", 2 | 4, 0), Task("Task 5", 16)]
+        self.path.write_text(dump_tasks(self.tasks), encoding='utf-8')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_json_round_trip_is_lossless(self):
+        text = self.path.read_text(encoding='utf-8')
+        storage = BinaryStorage(self.path)
+        tasks = storage.load()
+        self.assertEqual(tasks, self.tasks)
+        self.path.unlink()
+        storage.export_json(tasks)
+        storage.close()
+        self.assertEqual(self.path.read_text(encoding='utf-8'), text)
+
+    def test_names_are_decoded_lazily(self):
+        storage = BinaryStorage(self.path)
+        self.assertEqual(storage.counts(), TaskStore(self.tasks).counts())
+        tasks = storage.load()
+        self.assertEqual(sum(task.source is None for task in tasks), 0)
+        self.assertEqual(tasks[1].name, "Tâche ✓ 2")
+        self.assertEqual(sum(task.source is None for task in tasks), 1)
+        storage.close()
+
+    def test_save_unmaps_before_writing(self):
+        storage = BinaryStorage(self.path)
+        tasks = storage.load()
+        storage.save(tasks[::-1])
+        self.assertIsNone(storage.source)
+        storage.close()
+        reloaded = BinaryStorage(self.path)
+        self.assertEqual(reloaded.load(), self.tasks[::-1])
+        reloaded.close()
+
+    def test_rejects_truncated_files(self):
+        data = dump_binary(self.tasks)
+        bin_path = self.path.with_suffix('.bin')
+        bin_path.write_bytes(data[:-3])
+        with self.assertRaises(ValueError):
+            BinaryTaskFile(bin_path)
+        bin_path.write_bytes(data)
+        source = BinaryTaskFile(bin_path)
+        self.assertEqual(list(source.tasks()), self.tasks)
+        source.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import json
+import tempfile
+import time
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.core import TodoList
+from todo_app.model import DONE, Task, TaskStore
+from todo_app.sync import apply_changes, merge_tasks
+
+def names(tasks):
+    return [task.name for task in tasks]
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.base = [Task(f"Task {i}") for i in range(10)]
+
+    def test_disjoint_edits_are_both_kept(self):
+        ours = self.base[:2] + [Task("Ours")] + self.base[2:]
+        theirs = self.base[:8] + [self.base[8].replace(done=True)] + self.base[9:]
+        merged = merge_tasks(self.base, ours, theirs)
+        self.assertEqual(names(merged), names(ours))
+        self.assertTrue(merged[9].done)
+
+    def test_one_sided_changes(self):
+        theirs = self.base[3:]
+        self.assertEqual(merge_tasks(self.base, list(self.base), theirs), theirs)
+        self.assertEqual(merge_tasks(self.base, theirs, list(self.base)), theirs)
+
+    def test_conflicting_edits_keep_both_sides(self):
+        ours = self.base[:5] + [self.base[5].replace(name="Ours")] + self.base[6:]
+        theirs = self.base[:5] + [self.base[5].replace(name="Theirs"), Task("New")] + self.base[6:]
+        merged = merge_tasks(self.base, ours, theirs)
+        self.assertEqual(names(merged[5:8]), ["Ours", "Theirs", "New"])
+        self.assertEqual(len(merged), 12)
+
+    def test_apply_changes_only_touches_differences(self):
+        store = TaskStore(self.base)
+        records = []
+        store.listeners.append(lambda op, **fields: records.append(op))
+        target = self.base[:3] + [self.base[3].replace(done=True)] + self.base[5:] + [Task("Last")]
+        self.assertTrue(apply_changes(store, target))
+        self.assertEqual(list(store), target)
+        self.assertEqual(store.counts(), TaskStore(target).counts())
+        self.assertEqual(sorted(records), ['add', 'remove', 'update'])
+        self.assertFalse(apply_changes(store, target))
+
+class TestExternalChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = Path(self.tmp_dir.name) / 'tasks.json'
+        self.path.write_text(json.dumps([{"name": f"Task {i}"} for i in range(5)]), encoding='utf-8')
+
+    def open(self, backend='json'):
+        todo = TodoList.open(self.path, backend, undo_limit=1 << 20)
+        self.addCleanup(todo.close)
+        return todo
+
+    def check_external_save_is_merged(self, backend):
+        first, second = self.open(backend), self.open(backend)
+        first.watch(interval=0.01)
+        notified = []
+        first.change_listeners.append(lambda: notified.append(True))
+        second.toggle_done([0])
+        second.flush()
+        deadline = time.monotonic() + 5
+        while not first.merge_external_changes() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(first[0].done)
+        self.assertEqual(notified, [True])
+
+    def test_external_save_is_merged(self):
+        self.check_external_save_is_merged('json')
+
+    def test_external_binary_save_is_merged(self):
+        self.check_external_save_is_merged('binary')
+
+    def test_conflicting_save_is_not_overwritten(self):
+        first, second = self.open(), self.open()
+        first.watch(interval=60)
+        second.add("From second")
+        second.flush()
+        first.add("From first")
+        first.flush()
+        self.assertEqual(first.storage.writer.conflicts, 1)
+        first.close()
+        saved = [Task.from_dict(data) for data in json.loads(self.path.read_text(encoding='utf-8'))]
+        self.assertEqual(names(saved)[5:], ["From first", "From second"])
+        self.assertEqual(sum(task.flags & DONE for task in saved), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,18 @@
-from todo_app import TodoApp
+from .core import TodoList
+from .lists import TaskLists
 
-__all__ = ['TodoApp']
+__all__ = ['TodoApp', 'TodoList', 'TaskLists']
 
 __version__ = '0.2.0'
 __author__ = 'Jens Lettkemann'
 __email__ = 'jltk@pm.me'
 __license__ = 'GPLv3+'
 __description__ = 'A simple Todo application with a graphical user interface.'
+
+
+def __getattr__(name):
+    # The GUI is imported on first use, so the package works without tkinter.
+    if name == 'TodoApp':
+        from .todo_app import TodoApp
+        return TodoApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
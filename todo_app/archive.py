@@ -0,0 +1,68 @@
+"""Append-only, gzip-compressed cold storage for closed tasks."""
+import gzip
+import json
+import os
+from pathlib import Path
+
+try:
+    from .model import Task
+except ImportError:
+    from model import Task
+
+
+class Archive:
+    """Archived tasks of one list, in <list>.archive.gz next to its file.
+
+    Every archiving run appends one gzip member with a JSON line per task,
+    so the file is never rewritten. Entries are numbered in the order they
+    were written. Restoring an entry appends a {"restored": number} line
+    instead of removing it. Nothing is read until the archive is searched.
+    """
+
+    def __init__(self, list_path):
+        self.path = Path(list_path).with_suffix('.archive.gz')
+
+    def append(self, tasks, archived_at):
+        lines = ''.join(json.dumps({**task.to_dict(), 'archived_at': archived_at}) + '\n' for task in tasks)
+        self.write(lines)
+
+    def mark_restored(self, numbers):
+        self.write(''.join(json.dumps({'restored': number}) + '\n' for number in numbers))
+
+    def write(self, lines):
+        """Append lines as one gzip member in a single write."""
+        if not lines:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(gzip.compress(lines.encode('utf-8')))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def iter_lines(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                yield from f
+        except FileNotFoundError:
+            return
+        except (EOFError, OSError) as e:
+            print(f"Error reading archive: {e}")
+
+    def search(self, query='', limit=None):
+        """Entries whose name contains query, ignoring case, as (number, Task, archived_at), oldest first."""
+        query = query.casefold()
+        matches = {}
+        number = 0
+        for line in self.iter_lines():
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'restored' in data:
+                matches.pop(data['restored'], None)
+                continue
+            if query in data['name'].casefold():
+                matches[number] = data
+            number += 1
+        found = [(number, Task.from_dict(data), data.get('archived_at')) for number, data in matches.items()]
+        return found if limit is None else found[-limit:]
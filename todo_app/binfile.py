@@ -0,0 +1,123 @@
+"""Compact binary task file read through mmap.
+
+Layout, in native byte order (the header says which):
+
+    header     magic b'TODO', version (u8), byte order (u8, 1 = little),
+               reserved (u16), task count n (u64)            16 bytes
+    closed_at  n x i64, CLOSED_NONE where a task is open
+    offsets    (n + 1) x u64 into the names blob
+    flags      n x u8, the Task.flags bits
+    names      UTF-8 names back to back
+
+Flags and closed_at are plain arrays, so counting statuses never touches a
+name. Names are decoded one at a time by LazyTask when they are first
+read, which for the GUI means when their row scrolls into view.
+"""
+from array import array
+from itertools import accumulate
+import mmap
+import struct
+import sys
+
+try:
+    from .model import FLAGS, Task, _uids
+except ImportError:
+    from model import FLAGS, Task, _uids
+
+MAGIC = b'TODO'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHQ')
+CLOSED_NONE = -1 << 63
+NATIVE_ORDER = 1 if sys.byteorder == 'little' else 0
+
+
+def dump_binary(tasks):
+    """Serialize tasks to the binary layout; the inverse of BinaryTaskFile."""
+    names = [task.name.encode('utf-8') for task in tasks]
+    closed_at = array('q', (CLOSED_NONE if task.closed_at is None else task.closed_at for task in tasks))
+    offsets = array('Q', [0])
+    offsets.extend(accumulate(map(len, names)))
+    return b''.join([HEADER.pack(MAGIC, VERSION, NATIVE_ORDER, 0, len(names)), closed_at.tobytes(),
+                     offsets.tobytes(), bytes(task.flags for task in tasks), *names])
+
+
+class BinaryTaskFile:
+    """Read-only view of a binary task file."""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.file.close()
+            raise ValueError(f"{path} is not a task file") from None
+        magic, version, order, _, count = HEADER.unpack_from(self.map) if len(self.map) >= HEADER.size \
+            else (None, None, None, None, 0)
+        if magic != MAGIC or version != VERSION or len(self.map) < HEADER.size + 17 * count + 8:
+            self.map.close()
+            self.file.close()
+            raise ValueError(f"{path} is not a task file")
+        self.count = count
+        start = HEADER.size
+        self.view = memoryview(self.map)
+        self.closed_at = self.view[start:start + 8 * count].cast('q')
+        start += 8 * count
+        self.offsets = self.view[start:start + 8 * (count + 1)].cast('Q')
+        start += 8 * (count + 1)
+        self.flags = self.view[start:start + count]
+        self.names_start = start + count
+        if order != NATIVE_ORDER:
+            self.closed_at, self.offsets = array('q', self.closed_at), array('Q', self.offsets)
+            self.closed_at.byteswap()
+            self.offsets.byteswap()
+        if self.names_start + self.offsets[count] > len(self.map):
+            self.close()
+            raise ValueError(f"{path} is not a task file")
+
+    def name(self, number):
+        start = self.names_start
+        return str(self.map[start + self.offsets[number]:start + self.offsets[number + 1]], 'utf-8')
+
+    def flag_counts(self):
+        flags = bytes(self.flags)
+        return [flags.count(value) for value in range(1 << len(FLAGS))]
+
+    def tasks(self):
+        """One LazyTask per entry; only the flags and closed_at are read here."""
+        for number, (flags, stamp) in enumerate(zip(self.flags.tolist(), self.closed_at.tolist())):
+            yield LazyTask(self, number, flags, None if stamp == CLOSED_NONE else stamp)
+
+    def close(self):
+        for view in ('closed_at', 'offsets', 'flags', 'view'):
+            value = getattr(self, view, None)
+            if isinstance(value, memoryview):
+                value.release()
+        self.map.close()
+        self.file.close()
+
+
+class LazyTask(Task):
+    """Task whose name stays in the mapped file until it is first read."""
+
+    __slots__ = ('source', 'number')
+
+    def __init__(self, source, number, flags, closed_at):
+        Task.name.__set__(self, None)
+        self.flags = flags
+        self.closed_at = closed_at
+        self.uid = next(_uids)
+        self.source = source
+        self.number = number
+
+    @property
+    def name(self):
+        name = Task.name.__get__(self)
+        if name is None:
+            name = self.source.name(self.number)
+            Task.name.__set__(self, name)
+            self.source = None
+        return name
+
+    @name.setter
+    def name(self, value):
+        Task.name.__set__(self, value)
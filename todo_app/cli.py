@@ -0,0 +1,145 @@
+"""Command-line access to the task lists, for scripts, pipelines and cron jobs.
+
+    todo add "Buy milk" "Call the plumber"
+    todo add -- "---Next week"
+    todo list --open
+    todo done 3 5
+    grep -h TODO *.py | todo --list Code import
+    todo import tasks.csv
+    todo export --format markdown > tasks.md
+
+It works on the same files as the GUI and never imports tkinter, so it
+needs no display and starts in a fraction of the GUI's time.
+"""
+import argparse
+import sys
+
+try:
+    from . import core, formats, lists
+except ImportError:
+    import core
+    import formats
+    import lists
+
+
+def status_mark(task):
+    if task.cancelled:
+        return '[-]'
+    if task.done:
+        return '[x]'
+    return '[!]' if task.urgent else '[ ]'
+
+
+def format_task(number, task):
+    if task.separator:
+        return f"{'':>5}  {task.name}"
+    return f"{number:>5}  {status_mark(task)} {task.name}"
+
+
+def add_tasks(todo, texts):
+    """Add every non-blank text with a single write; returns the number added."""
+    return todo.import_tasks(task for task in map(core.parse_task, texts) if task is not None)
+
+
+def import_tasks(todo, path=None, fmt=None):
+    """Import a file, or stdin, in one of formats.FORMATS; plain lines of entry text without a format."""
+    if path is None:
+        if fmt is None:
+            return add_tasks(todo, sys.stdin)
+        return todo.import_tasks(formats.FORMATS[fmt][0](sys.stdin))
+    return formats.import_file(todo, path, fmt)
+
+
+def export_tasks(todo, path=None, fmt=None):
+    if path is None:
+        todo.finish_loading()
+        formats.FORMATS[fmt or 'todotxt'][1](todo.tasks.snapshot(), sys.stdout)
+    else:
+        formats.export_file(todo, path, fmt)
+
+
+def list_tasks(todo, only_open=False):
+    for index, task in enumerate(todo):
+        if not (only_open and (task.done or task.cancelled)):
+            print(format_task(index + 1, task))
+
+
+def complete_tasks(todo, numbers):
+    """Mark the tasks with the given 1-based numbers done; those already done stay done."""
+    indices = []
+    for number in numbers:
+        if not 1 <= number <= len(todo):
+            raise ValueError(f"No task number {number}")
+        task = todo[number - 1]
+        if not task.separator and not task.done:
+            indices.append(number - 1)
+    if indices:
+        todo.toggle_done(sorted(set(indices)))
+    return len(indices)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='todo', description="Manage the To-Do App's task lists.")
+    parser.add_argument('--list', default=lists.DEFAULT_LIST, help="name of the list (default: %(default)s)")
+    parser.add_argument('--file', help="use this tasks file instead of the app's lists")
+    parser.add_argument('--storage', help="storage backend, overriding the 'storage' setting")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="add tasks; '---title' adds a separator")
+    add.add_argument('tasks', nargs='+')
+    show = commands.add_parser('list', help="print the tasks with their numbers")
+    show.add_argument('--open', action='store_true', help="leave out done and cancelled tasks")
+    done = commands.add_parser('done', help="mark tasks done by number")
+    done.add_argument('numbers', type=int, nargs='+')
+    for name, description in (('import', "add the tasks in a file, or one per line of stdin, with a single write"),
+                              ('export', "write the list to a file, or to stdout as todo.txt")):
+        command = commands.add_parser(name, help=description)
+        # Not 'file', which would overwrite the --file option
+        command.add_argument('path', nargs='?', metavar='FILE', help="a .txt (todo.txt), .md or .csv file")
+        command.add_argument('--format', choices=sorted(formats.FORMATS), help="file format, if not by extension")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    task_lists = None
+    try:
+        if args.file:
+            todo = core.TodoList.open(args.file, args.storage)
+        else:
+            config = core.read_config()
+            if args.storage:
+                config['storage'] = args.storage
+            task_lists = lists.TaskLists.from_config(config)
+            todo = task_lists.open(args.list)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    changes = []
+    todo.change_listeners.append(lambda: changes.append(True))
+    try:
+        if args.command == 'add':
+            add_tasks(todo, args.tasks)
+        elif args.command == 'list':
+            list_tasks(todo, args.open)
+        elif args.command == 'done':
+            complete_tasks(todo, args.numbers)
+        elif args.command == 'import':
+            import_tasks(todo, args.path, args.format)
+        elif args.command == 'export':
+            export_tasks(todo, args.path, args.format)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        # Commands that changed nothing, such as list and export, leave the files alone
+        if task_lists is not None and changes:
+            task_lists.close()
+        else:
+            todo.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
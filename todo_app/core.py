@@ -0,0 +1,459 @@
+"""Task list logic without any GUI dependency.
+
+Everything here works without tkinter, so it can be used from scripts,
+batch jobs and tests on machines without a display.
+"""
+from contextlib import contextmanager
+from itertools import islice
+import json
+from pathlib import Path
+import sys
+import time
+
+try:
+    from .archive import Archive
+    from .history import History
+    from .model import SEPARATOR, TITLE, Task, TaskStore
+    from .search import SearchIndex
+    from .storage import open_storage
+    from .sync import ChangeWatcher, apply_changes, merge_tasks
+except ImportError:
+    from archive import Archive
+    from history import History
+    from model import SEPARATOR, TITLE, Task, TaskStore
+    from search import SearchIndex
+    from storage import open_storage
+    from sync import ChangeWatcher, apply_changes, merge_tasks
+
+
+def get_base_dir():
+    return Path(sys.executable).parent if getattr(sys, 'frozen', False) else Path(__file__).parent
+
+
+def get_tasks_file():
+    return get_base_dir() / 'todo_app' / 'tasks.json'
+
+
+def get_config_file():
+    return get_base_dir() / 'todo_app' / 'config.json'
+
+
+def read_config():
+    config_file = get_config_file()
+    if config_file.is_file():
+        return json.loads(config_file.read_text(encoding='utf-8'))
+    return {}
+
+
+def get_undo_limit(config):
+    """Undo history budget in bytes from the 'undo_memory_kb' setting."""
+    return config.get('undo_memory_kb', History.DEFAULT_LIMIT >> 10) << 10
+
+
+def separator_name(title=''):
+    """Display name of a separator, with the title in capitals when given."""
+    title = title.strip().upper()
+    if title:
+        return f"{'─' * 2} {title} {'─' * 30}"
+    return '─' * 40
+
+
+def separator_title(task):
+    return task.name[2:-30].strip() if task.title else ''
+
+
+def closed_at_change(task, closed, now):
+    """The closed_at update for a task that is (still) done or cancelled when closed is true."""
+    if not closed:
+        closed_at = None
+    elif task.closed_at is not None and (task.done or task.cancelled):
+        closed_at = task.closed_at
+    else:
+        closed_at = now
+    return {} if closed_at == task.closed_at else {'closed_at': closed_at}
+
+
+def parse_task(text):
+    """Turn entry text into a Task; '---' and '---title' add separators."""
+    text = text.strip()
+    if not text:
+        return None
+    if text.startswith('---'):
+        title = text[3:].strip()
+        return Task(separator_name(title), SEPARATOR | TITLE if title else SEPARATOR)
+    return Task(text)
+
+
+class TodoList:
+    """A task list together with the storage backend it is persisted in.
+
+    Every mutation is saved right away; the storage backend decides how
+    much of that actually hits the disk.
+
+    With progressive=True only the storage is opened and the tasks are read
+    in batches through load_next(), so a GUI can show the first rows before
+    the whole file is parsed. Mutating or saving a partly loaded list first
+    loads the rest, so indices and saved files always cover the whole list.
+
+    Edits made inside a batch() are saved together when the batch ends. The
+    change listeners, e.g. a view that re-renders, are called with no
+    arguments once per save.
+
+    Each saved change, a whole batch included, is one step for undo() and
+    redo().
+
+    After watch(), changes other instances save to the same file are picked
+    up by a background thread and merged in by merge_external_changes().
+    """
+
+    def __init__(self, storage, progressive=False, undo_limit=History.DEFAULT_LIMIT):
+        self.storage = storage
+        self.tasks = TaskStore()
+        self.tasks.listeners.append(storage.record)
+        self.tasks.listeners.append(self.on_record)
+        self.tasks.undo_log = []
+        # Whether the store has changed since the last save
+        self.unsaved = False
+        self.history = History(undo_limit)
+        self.search = None
+        self.watcher = None
+        self.archive = Archive(storage.path)
+        self.replaying = None
+        self.change_listeners = []
+        self.batch_depth = 0
+        self.batch_changed = False
+        self.loader = storage.iter_tasks() if progressive else None
+        if not progressive:
+            self.tasks.load(storage.load())
+
+    @classmethod
+    def open(cls, path=None, backend=None, progressive=False, undo_limit=None):
+        """Open the task list; backend and undo_limit default to the 'storage' and 'undo_memory_kb' settings."""
+        config = read_config() if backend is None or undo_limit is None else {}
+        if backend is None:
+            backend = config.get('storage', 'json')
+        if undo_limit is None:
+            undo_limit = get_undo_limit(config)
+        return cls(open_storage(path or get_tasks_file(), backend), progressive, undo_limit)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, index):
+        return self.tasks[index]
+
+    # Loading
+
+    @property
+    def loading(self):
+        return self.loader is not None
+
+    def load_next(self, count=5000):
+        """Load up to count more tasks; returns whether there is more to load."""
+        if self.loader is None:
+            return False
+        batch = list(islice(self.loader, count))
+        self.tasks.load(batch)
+        if len(batch) < count:
+            self.loader = None
+        return self.loader is not None
+
+    def finish_loading(self):
+        while self.load_next():
+            pass
+
+    # Mutations
+
+    @contextmanager
+    def batch(self):
+        """Save the edits made inside the block, and notify the listeners, once at the end."""
+        self.finish_loading()
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0 and self.batch_changed:
+                self.batch_changed = False
+                self.changed()
+
+    def on_record(self, op, **fields):
+        self.unsaved = True
+
+    def changed(self):
+        if self.batch_depth:
+            self.batch_changed = True
+            return
+        if not self.unsaved:
+            return  # e.g. a toggle with nothing selected
+        self.commit_history()
+        self.save()
+        for listener in self.change_listeners:
+            listener()
+
+    def commit_history(self):
+        ops = self.tasks.undo_log
+        if not ops:
+            return
+        self.tasks.undo_log = []
+        if self.replaying == 'undo':
+            self.history.push(self.history.redo_stack, ops)
+        elif self.replaying == 'redo':
+            self.history.push(self.history.undo_stack, ops)
+        else:
+            self.history.record(ops)
+
+    def undo(self):
+        """Revert the last change; returns False when there is nothing to undo."""
+        return self.replay('undo', self.history.undo_stack)
+
+    def redo(self):
+        return self.replay('redo', self.history.redo_stack)
+
+    def replay(self, direction, stack):
+        ops = self.history.pop(stack)
+        if ops is None:
+            return False
+        self.replaying = direction
+        try:
+            with self.batch():
+                self.tasks.revert(ops)
+                self.batch_changed = True
+        finally:
+            self.replaying = None
+        return True
+
+    def add(self, text, index=None):
+        """Add a task or separator from entry text; returns its index, or None for blank text."""
+        self.finish_loading()
+        task = parse_task(text)
+        if task is None:
+            return None
+        index = len(self.tasks) if index is None else index
+        self.tasks.insert(index, task)
+        self.changed()
+        return index
+
+    def import_tasks(self, tasks, batch_size=1000):
+        """Append tasks from any iterable, batch_size at a time, with one save at the end.
+
+        Returns the number of tasks added. The whole import is one undo step.
+        """
+        tasks, added = iter(tasks), 0
+        with self.batch():
+            for chunk in iter(lambda: list(islice(tasks, batch_size)), []):
+                self.tasks.extend(chunk)
+                added += len(chunk)
+            if added:
+                self.batch_changed = True
+        return added
+
+    def insert_separator(self, index):
+        self.finish_loading()
+        self.tasks.insert(index, Task(separator_name(), SEPARATOR))
+        self.changed()
+
+    def remove(self, indices):
+        self.finish_loading()
+        self.tasks.remove(indices)
+        self.changed()
+
+    def toggle_done(self, indices):
+        """Flip done; finishing a task also clears its urgent mark."""
+        self.finish_loading()
+        now = int(time.time())
+        for index in indices:
+            task = self.tasks[index]
+            self.tasks.update(index, done=not task.done, urgent=task.urgent and task.done,
+                              **closed_at_change(task, not task.done or task.cancelled, now))
+        self.changed()
+
+    def toggle_cancelled(self, indices):
+        """Flip cancelled; cancelling a task also clears its urgent mark."""
+        self.finish_loading()
+        now = int(time.time())
+        for index in indices:
+            task = self.tasks[index]
+            self.tasks.update(index, cancelled=not task.cancelled, urgent=task.urgent and task.cancelled,
+                              **closed_at_change(task, task.done or not task.cancelled, now))
+        self.changed()
+
+    def toggle_urgent(self, indices):
+        self.finish_loading()
+        for index in indices:
+            self.tasks.update(index, urgent=not self.tasks[index].urgent)
+        self.changed()
+
+    def rename(self, index, name):
+        self.finish_loading()
+        name = name.strip()
+        if name and name != self.tasks[index].name:
+            self.tasks.update(index, name=name)
+            self.changed()
+
+    def set_separator_title(self, index, title):
+        self.finish_loading()
+        name, titled = separator_name(title), bool(title.strip())
+        task = self.tasks[index]
+        if name == task.name and titled == task.title:
+            return
+        self.tasks.update(index, name=name, title=titled)
+        self.changed()
+
+    def move(self, start_index, end_index):
+        self.finish_loading()
+        if start_index == end_index:
+            return
+        self.tasks.move(start_index, end_index)
+        self.changed()
+
+    # Archive
+
+    @contextmanager
+    def untracked(self):
+        """Batch edits that cannot be undone; the undo history is dropped if anything changed."""
+        self.finish_loading()
+        undo_log, self.tasks.undo_log = self.tasks.undo_log, None
+        try:
+            with self.batch():
+                yield self
+                changed = self.batch_changed
+        finally:
+            self.tasks.undo_log = undo_log
+        if changed:
+            self.history.clear()
+
+    def archive_closed(self, max_age, now=None):
+        """Move tasks done or cancelled more than max_age seconds ago to the archive.
+
+        Closed tasks saved before closed_at existed are stamped with the
+        current time, so their age counts from now. Returns the number of
+        tasks archived.
+        """
+        now = int(time.time()) if now is None else now
+        with self.untracked():
+            old, stamped = [], False
+            for index, task in enumerate(self.tasks):
+                if task.separator or not (task.done or task.cancelled):
+                    continue
+                if task.closed_at is None:
+                    self.tasks.update(index, closed_at=now)
+                    stamped = True
+                elif task.closed_at <= now - max_age:
+                    old.append(index)
+            if old:
+                # Archived before removal: a crash in between duplicates tasks rather than losing them.
+                self.archive.append([self.tasks[index] for index in old], now)
+                self.tasks.remove(old)
+            self.batch_changed = stamped or bool(old)
+        return len(old)
+
+    def search_archive(self, query='', limit=500):
+        """The newest archive entries matching query, as (number, task, archived_at)."""
+        return self.archive.search(query, limit)
+
+    def restore_archived(self, entries):
+        """Append archive entries from search_archive() to the end of the list again."""
+        now = int(time.time())
+        with self.untracked():
+            for _, task, _ in entries:
+                # A fresh closed_at keeps the task from going straight back to the archive.
+                self.tasks.append(task.replace(closed_at=now) if task.closed_at is not None else task)
+            self.batch_changed = bool(entries)
+        self.archive.mark_restored([number for number, _, _ in entries])
+
+    # Search
+
+    def find(self, query):
+        """Indices of the tasks whose name contains query, ignoring case.
+
+        The search index is built on the first call and kept up to date
+        from then on.
+        """
+        self.finish_loading()
+        if self.search is None or self.search.store is not self.tasks:
+            self.search = SearchIndex(self.tasks)
+        return self.search.find(query)
+
+    def index_of(self, uid):
+        """Current index of the task with this uid, or None once it is gone."""
+        self.finish_loading()
+        return next((index for index, task in enumerate(self.tasks) if task.uid == uid), None)
+
+    # External changes
+
+    def watch(self, interval=1.0):
+        """Start watching the file for other writers; returns False if the backend cannot be watched."""
+        if self.watcher is None and hasattr(self.storage, 'read_snapshot'):
+            self.watcher = ChangeWatcher(self.storage, interval)
+        return self.watcher is not None
+
+    def merge_external_changes(self):
+        """Merge the newest change the watcher found, if any; returns whether the list changed.
+
+        Nothing is read from disk here, so this is cheap enough to call
+        from a timer on the GUI thread.
+        """
+        if self.watcher is None or self.loading:
+            return False
+        found = self.watcher.latest()
+        return found is not None and self.merge_external(*found)
+
+    def sync_external(self):
+        """Read and merge what another process saved, right now."""
+        if self.loading or not hasattr(self.storage, 'read_snapshot'):
+            return False
+        found = self.storage.read_snapshot()
+        return found is not None and self.merge_external(*found)
+
+    def merge_external(self, stamp, theirs):
+        """Merge tasks another process saved with the edits made here since the last save.
+
+        The store is edited in place, so only the affected tasks change.
+        The merge is not an undo step, and the undo history is dropped
+        because its indices may no longer hold.
+        """
+        base = self.storage.writer.adopt(stamp, theirs)
+        merged = merge_tasks(base, self.tasks.snapshot(), theirs)
+        undo_log, self.tasks.undo_log = self.tasks.undo_log, None
+        try:
+            changed = apply_changes(self.tasks, merged)
+        finally:
+            self.tasks.undo_log = undo_log
+        if merged != theirs:
+            self.save()
+        if changed:
+            self.history.clear()
+            for listener in self.change_listeners:
+                listener()
+        return changed
+
+    # Persistence and statistics
+
+    def save(self, full=False):
+        """Write the recorded changes; with full, rewrite the whole list in backends that write changes only."""
+        self.finish_loading()
+        self.unsaved = False
+        try:
+            if full and hasattr(self.storage, 'rewrite'):
+                self.storage.rewrite(self.tasks.snapshot())
+            else:
+                self.storage.save(self.tasks.snapshot())
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+
+    def flush(self):
+        self.storage.flush()
+
+    def close(self):
+        if self.watcher is not None:
+            # A save skipped because of an external change is merged and written now.
+            self.flush()
+            self.sync_external()
+            self.watcher.stop()
+            self.watcher = None
+        self.storage.close()
+
+    def counts(self):
+        return self.tasks.counts()
+
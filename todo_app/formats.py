@@ -0,0 +1,264 @@
+"""Import and export of task lists as todo.txt, Markdown checklists and CSV.
+
+Writers take any iterable of tasks and write one line per task as they go.
+Readers are generators over the lines of a file. Nothing holds the whole
+document in memory, so a list of any size can be moved in or out.
+
+All three formats keep the done, cancelled and urgent marks and the
+separators with their titles. CSV also keeps closed_at exactly. todo.txt
+keeps it as the completion date of done tasks, and Markdown drops it.
+
+    todo.txt   x 2024-05-01 Done task     (A) Urgent task
+               Cancelled task status:cancelled
+               ---TITLE                   ---
+    Markdown   - [x] Done task            - [ ] **Urgent task**
+               - [ ] ~~Cancelled task~~
+               ## TITLE                   ---
+
+Names that would be read back as markup get a backslash in front, such as
+\\x marks the spot or \\**bold**, so every name survives a round trip. Line
+breaks are the exception: todo.txt and Markdown write them as spaces.
+"""
+import csv
+from pathlib import Path
+import re
+import time
+
+try:
+    from .core import parse_task, separator_title
+    from .model import CANCELLED, DONE, FLAGS, URGENT, Task
+except ImportError:
+    from core import parse_task, separator_title
+    from model import CANCELLED, DONE, FLAGS, URGENT, Task
+
+DATE = re.compile(r'\d{4}-\d{2}-\d{2}$')
+PRIORITY = re.compile(r'\([A-Z]\)$')
+LINE_BREAK = re.compile(r'\r\n|[\r\n]')
+
+
+def one_line(text):
+    """text with its line breaks turned into spaces, since both line formats hold one entry per line."""
+    return LINE_BREAK.sub(' ', text)
+
+
+def separator_line(task):
+    """The entry markup, '---' or '---TITLE', that recreates a separator."""
+    return '---' + one_line(separator_title(task))
+
+
+# todo.txt
+
+def is_todotxt_prefix(word):
+    """Whether word, at the start of a name, would be read as a mark, date or separator."""
+    return word == 'x' or PRIORITY.match(word) or DATE.match(word) or word.startswith('---')
+
+
+def is_todotxt_tag(word):
+    """Whether word, at the end of a name, would be read as a status tag."""
+    return word == 'status:cancelled' or word.startswith('pri:')
+
+
+def escape_todotxt(name):
+    words = one_line(name).split(' ')
+    if is_todotxt_prefix(words[0].lstrip('\\')):
+        words[0] = '\\' + words[0]
+    if len(words) > 1 and is_todotxt_tag(words[-1].lstrip('\\')):
+        words[-1] = '\\' + words[-1]
+    return ' '.join(words)
+
+
+def unescape_todotxt(words):
+    if words[0].startswith('\\') and is_todotxt_prefix(words[0].lstrip('\\')):
+        words[0] = words[0][1:]
+    if len(words) > 1 and words[-1].startswith('\\') and is_todotxt_tag(words[-1].lstrip('\\')):
+        words[-1] = words[-1][1:]
+    return ' '.join(words)
+
+
+def todotxt_line(task):
+    if task.separator:
+        return separator_line(task)
+    words = []
+    if task.done:
+        words.append('x')
+        if task.closed_at is not None:
+            words.append(time.strftime('%Y-%m-%d', time.localtime(task.closed_at)))
+    elif task.urgent:
+        words.append('(A)')
+    words.append(escape_todotxt(task.name))
+    if task.done and task.urgent:
+        words.append('pri:A')
+    if task.cancelled:
+        words.append('status:cancelled')
+    return ' '.join(words)
+
+
+def parse_todotxt(line):
+    line = line.rstrip('\r\n')
+    if not line.strip():
+        return None
+    if line.startswith('---'):
+        return parse_task(line)
+    words = line.split(' ')
+    flags, closed_at = 0, None
+    if words[0] == 'x':
+        flags |= DONE
+        words.pop(0)
+        if words and DATE.match(words[0]):
+            closed_at = int(time.mktime(time.strptime(words.pop(0), '%Y-%m-%d')))
+    elif PRIORITY.match(words[0]):
+        flags |= URGENT
+        words.pop(0)
+    if len(words) > 1 and DATE.match(words[0]):
+        words.pop(0)  # creation date, which the app does not keep
+    while len(words) > 1:
+        if words[-1] == 'status:cancelled':
+            flags |= CANCELLED
+        elif words[-1].startswith('pri:'):
+            flags |= URGENT
+        else:
+            break
+        words.pop()
+    if not ''.join(words).strip():
+        return None  # nothing but marks, e.g. a bare "x"
+    return Task(unescape_todotxt(words), flags, closed_at)
+
+
+def write_todotxt(tasks, f):
+    for task in tasks:
+        f.write(todotxt_line(task) + '\n')
+
+
+def read_todotxt(f):
+    for line in f:
+        task = parse_todotxt(line)
+        if task is not None:
+            yield task
+
+
+# Markdown
+
+LIST_ITEM = re.compile(r'\s*[-*+]\s+(?:\[([ xX])\]\s+)?(.*?)\s*$')
+HEADING = re.compile(r'#{1,6}\s+(.*?)(?:\s+#+)?\s*$')
+RULE = re.compile(r'\s*(?:(?:-\s*){3,}|(?:\*\s*){3,}|(?:_\s*){3,})$')
+
+
+def escape_markdown(name):
+    # The reader strips the whitespace around an item and unwraps ** and ~~.
+    name = one_line(name)
+    if name[:1].isspace() or name.startswith(('**', '~~', '\\')):
+        name = '\\' + name
+    if name[-1:].isspace() or name.endswith('\\'):
+        name += '\\'
+    return name
+
+
+def unescape_markdown(name):
+    if name.startswith('\\'):
+        name = name[1:]
+    if name.endswith('\\'):
+        name = name[:-1]
+    return name
+
+
+def markdown_line(task):
+    if task.separator:
+        title = separator_title(task)
+        # Blank lines keep a rule from turning the item above into a heading.
+        return f"\n## {one_line(title)}\n" if title else "\n---\n"
+    name = escape_markdown(task.name)
+    if task.urgent:
+        name = f"**{name}**"
+    if task.cancelled:
+        name = f"~~{name}~~"
+    return f"- [{'x' if task.done else ' '}] {name}"
+
+
+def unwrap(text, marker):
+    if len(text) > 2 * len(marker) and text.startswith(marker) and text.endswith(marker):
+        return text[len(marker):-len(marker)], True
+    return text, False
+
+
+def parse_markdown(line):
+    if RULE.match(line):
+        return parse_task('---')
+    match = HEADING.match(line)
+    if match:
+        return parse_task('---' + match.group(1))
+    match = LIST_ITEM.match(line)
+    if not match or not match.group(2):
+        return None
+    name, cancelled = unwrap(match.group(2), '~~')
+    name, urgent = unwrap(name, '**')
+    flags = (DONE if match.group(1) in ('x', 'X') else 0) | (CANCELLED if cancelled else 0) | (URGENT if urgent else 0)
+    name = unescape_markdown(name)
+    return Task(name, flags) if name.strip() else None
+
+
+def write_markdown(tasks, f):
+    for task in tasks:
+        f.write(markdown_line(task) + '\n')
+
+
+def read_markdown(f):
+    for line in f:
+        task = parse_markdown(line)
+        if task is not None:
+            yield task
+
+
+# CSV
+
+CSV_FIELDS = ['name', *FLAGS, 'closed_at']
+TRUE_VALUES = {'1', 'true', 'yes', 'x'}
+
+
+def write_csv(tasks, f):
+    writer = csv.writer(f)
+    writer.writerow(CSV_FIELDS)
+    for task in tasks:
+        writer.writerow([task.name, *(int(bool(task.flags & bit)) for bit in FLAGS.values()),
+                         '' if task.closed_at is None else task.closed_at])
+
+
+def read_csv(f):
+    for row in csv.DictReader(f):
+        if not row.get('name'):
+            continue
+        data = {'name': row['name'], **{field: (row.get(field) or '').strip().lower() in TRUE_VALUES
+                                        for field in FLAGS}}
+        if (row.get('closed_at') or '').strip():
+            data['closed_at'] = int(row['closed_at'])
+        yield Task.from_dict(data)
+
+
+FORMATS = {
+    'todotxt': (read_todotxt, write_todotxt),
+    'markdown': (read_markdown, write_markdown),
+    'csv': (read_csv, write_csv),
+}
+
+SUFFIXES = {'.txt': 'todotxt', '.md': 'markdown', '.markdown': 'markdown', '.csv': 'csv'}
+
+
+def guess_format(path):
+    path = Path(path)
+    try:
+        return SUFFIXES[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown file type: {path.name}") from None
+
+
+def import_file(todo, path, fmt=None):
+    """Append the tasks in path to todo with a single save; returns how many were added."""
+    read = FORMATS[fmt or guess_format(path)][0]
+    with open(path, encoding='utf-8', newline='') as f:
+        return todo.import_tasks(read(f))
+
+
+def export_file(todo, path, fmt=None):
+    write = FORMATS[fmt or guess_format(path)][1]
+    todo.finish_loading()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        write(todo.tasks.snapshot(), f)
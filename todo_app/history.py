@@ -0,0 +1,77 @@
+"""Undo and redo history made of inverse edits.
+
+TaskStore logs, for every change, the operation that reverts it (see
+TaskStore.revert): ('remove', indices), ('restore', [(index, task), ...]),
+('update', index, flags, name, closed_at) and ('move', index, to). One
+user action is the list of those operations, so undoing a toggle of k
+tasks keeps k indices and flag values rather than a copy of the whole
+list.
+"""
+from collections import deque
+import sys
+
+# Rough per-item costs in bytes, close enough to keep the history in budget.
+_OP_SIZE = 72
+_INDEX_SIZE = 28
+_TASK_SIZE = 56
+
+
+def estimate_size(ops):
+    """Approximate memory held by a list of inverse operations."""
+    size = sys.getsizeof(ops)
+    for op in ops:
+        size += _OP_SIZE
+        kind = op[0]
+        if kind == 'remove':
+            size += _INDEX_SIZE * len(op[1])
+        elif kind == 'restore':
+            size += sum(_INDEX_SIZE + _TASK_SIZE + sys.getsizeof(task.name) for _, task in op[1])
+        elif kind == 'update' and op[3] is not None:
+            size += sys.getsizeof(op[3])
+    return size
+
+
+class History:
+    """Undo and redo stacks, with the oldest entries dropped beyond limit bytes."""
+
+    DEFAULT_LIMIT = 4 << 20
+
+    def __init__(self, limit=DEFAULT_LIMIT):
+        self.limit = limit
+        self.undo_stack = deque()
+        self.redo_stack = deque()
+        self.size = 0
+
+    def push(self, stack, ops):
+        size = estimate_size(ops)
+        stack.append((ops, size))
+        self.size += size
+        while self.size > self.limit:
+            oldest = self.undo_stack or self.redo_stack
+            self.size -= oldest.popleft()[1]
+
+    def pop(self, stack):
+        if not stack:
+            return None
+        ops, size = stack.pop()
+        self.size -= size
+        return ops
+
+    def record(self, ops):
+        """Add a new edit; this discards whatever could be redone."""
+        self.size -= sum(size for _, size in self.redo_stack)
+        self.redo_stack.clear()
+        self.push(self.undo_stack, ops)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
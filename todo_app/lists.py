@@ -0,0 +1,142 @@
+"""Named task lists kept side by side in the storage directory."""
+from collections import OrderedDict
+import json
+from pathlib import Path
+
+try:
+    from . import core
+    from .model import TaskStore, status_counts
+    from .storage import open_storage, write_atomic
+except ImportError:
+    import core
+    from model import TaskStore, status_counts
+    from storage import open_storage, write_atomic
+
+DEFAULT_LIST = 'To-Do'
+
+# Every file a storage backend may keep a list in, see storage.py
+DATA_SUFFIXES = ('.json', '.journal', '.db', '.bin')
+
+INVALID_NAME_CHARS = set('/\\:*?"<>|')
+
+
+def check_list_name(name):
+    name = name.strip()
+    if not name or name.startswith('.') or INVALID_NAME_CHARS & set(name):
+        raise ValueError(f"Invalid list name: {name!r}")
+    return name
+
+
+def data_stamp(path):
+    """Modification times and sizes of a list's files, to tell whether cached counts still hold."""
+    stamp = []
+    for suffix in DATA_SUFFIXES:
+        try:
+            stat = path.with_suffix(suffix).stat()
+        except FileNotFoundError:
+            continue
+        stamp.append([suffix, stat.st_mtime_ns, stat.st_size])
+    return stamp
+
+
+class TaskLists:
+    """Named task lists, each opened only when it is first used.
+
+    The default list is the original tasks.json; every other list is stored
+    as lists/<name>.json (or .journal/.db/.bin, depending on the backend). At
+    most max_open lists stay in memory: opening another one closes the
+    least recently used, which writes it to disk first.
+
+    The counts of lists that are not open come from lists/.counts.json,
+    which is refreshed whenever a list is closed. An entry whose files have
+    changed since is recomputed by streaming the list without keeping it.
+    """
+
+    def __init__(self, base_dir, backend='json', undo_limit=None, max_open=3):
+        self.base_dir = Path(base_dir)
+        self.lists_dir = self.base_dir / 'lists'
+        self.counts_path = self.lists_dir / '.counts.json'
+        self.backend = backend
+        self.undo_limit = undo_limit
+        self.max_open = max(1, max_open)
+        self.open_lists = OrderedDict()
+        try:
+            self.cached_counts = json.loads(self.counts_path.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, FileNotFoundError):
+            self.cached_counts = {}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(core.get_tasks_file().parent, config.get('storage', 'json'), core.get_undo_limit(config),
+                   config.get('max_open_lists', 3))
+
+    def path(self, name):
+        if name == DEFAULT_LIST:
+            return self.base_dir / 'tasks.json'
+        return self.lists_dir / f"{check_list_name(name)}.json"
+
+    def names(self):
+        """All list names, the default list first."""
+        names = set(self.open_lists)
+        if self.lists_dir.is_dir():
+            names.update(path.stem for path in self.lists_dir.iterdir()
+                         if path.suffix in DATA_SUFFIXES and not path.name.startswith('.'))
+        names.discard(DEFAULT_LIST)
+        return [DEFAULT_LIST] + sorted(names, key=str.casefold)
+
+    def open(self, name, progressive=False):
+        """Return the TodoList for name, loading it if it is not in memory."""
+        todo = self.open_lists.get(name)
+        if todo is None:
+            todo = core.TodoList.open(self.path(name), self.backend, progressive, self.undo_limit)
+            self.open_lists[name] = todo
+        self.open_lists.move_to_end(name)
+        if len(self.open_lists) > self.max_open:
+            while len(self.open_lists) > self.max_open:
+                self.evict(next(iter(self.open_lists)))
+            self.save_counts()
+        return todo
+
+    def evict(self, name):
+        """Close a list; its counts are remembered once its files are final."""
+        todo = self.open_lists.pop(name)
+        counts = None if todo.loading else todo.counts()
+        todo.close()
+        if counts is not None:
+            self.cached_counts[name] = {'counts': counts, 'stamp': data_stamp(self.path(name))}
+
+    def counts(self, name):
+        """Status counts of a list, without loading it when it is not open."""
+        todo = self.open_lists.get(name)
+        if todo is not None and not todo.loading:
+            return todo.counts()
+        path = self.path(name)
+        stamp = data_stamp(path)
+        cached = self.cached_counts.get(name)
+        if cached is not None and cached['stamp'] == stamp:
+            return cached['counts']
+        counts = self.scan_counts(path)
+        self.cached_counts[name] = {'counts': counts, 'stamp': data_stamp(path)}
+        self.save_counts()
+        return counts
+
+    def scan_counts(self, path):
+        storage = open_storage(path, self.backend)
+        try:
+            if hasattr(storage, 'counts'):
+                return storage.counts()
+            return status_counts(TaskStore.count_flags(storage.iter_tasks()))
+        finally:
+            storage.close()
+
+    def save_counts(self):
+        try:
+            self.lists_dir.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.counts_path, json.dumps(self.cached_counts, indent=4))
+        except Exception as e:
+            print(f"Error saving list counts: {e}")
+
+    def close(self):
+        while self.open_lists:
+            self.evict(next(iter(self.open_lists)))
+        self.save_counts()
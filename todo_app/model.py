@@ -0,0 +1,281 @@
+from itertools import count
+import json
+import os
+
+DONE = 1
+CANCELLED = 2
+URGENT = 4
+SEPARATOR = 8
+TITLE = 16
+
+FLAGS = {'done': DONE, 'cancelled': CANCELLED, 'urgent': URGENT, 'separator': SEPARATOR, 'title': TITLE}
+
+
+def _flag(bit):
+    return property(lambda self: bool(self.flags & bit))
+
+
+_uids = count()
+
+
+class Task:
+    """A single list entry; the status booleans are packed into one int.
+
+    closed_at is when the task was last marked done or cancelled, in whole
+    seconds since the epoch, and None while it is open.
+
+    uid identifies the entry for the lifetime of the process and is kept by
+    replace(), so indexes can follow a task through edits and moves. It is
+    not saved.
+    """
+
+    __slots__ = ('name', 'flags', 'closed_at', 'uid')
+
+    def __init__(self, name, flags=0, closed_at=None, uid=None):
+        self.name = name
+        self.flags = flags
+        self.closed_at = closed_at
+        self.uid = next(_uids) if uid is None else uid
+
+    done = _flag(DONE)
+    cancelled = _flag(CANCELLED)
+    urgent = _flag(URGENT)
+    separator = _flag(SEPARATOR)
+    title = _flag(TITLE)
+
+    @classmethod
+    def from_dict(cls, data):
+        flags = 0
+        for field, bit in FLAGS.items():
+            if data.get(field, False):
+                flags |= bit
+        return cls(data['name'], flags, data.get('closed_at'))
+
+    def to_dict(self):
+        data = {'name': self.name, **{field: bool(self.flags & bit) for field, bit in FLAGS.items()}}
+        if self.closed_at is not None:
+            data['closed_at'] = self.closed_at
+        return data
+
+    def replace(self, name=None, **changes):
+        """Return a copy with the given name, closed_at and/or status fields changed."""
+        closed_at = changes.pop('closed_at', self.closed_at)
+        flags = self.flags
+        for field, value in changes.items():
+            flags = flags | FLAGS[field] if value else flags & ~FLAGS[field]
+        return Task(self.name if name is None else name, flags, closed_at, self.uid)
+
+    def __eq__(self, other):
+        return isinstance(other, Task) and \
+            (self.name, self.flags, self.closed_at) == (other.name, other.flags, other.closed_at)
+
+    def __repr__(self):
+        return f"Task({self.name!r}, {self.flags})"
+
+
+_encode_string = json.JSONEncoder().encode
+
+# The status fields of a record only depend on the flags, so they are
+# prepared once per flag combination.
+_RECORD_FLAGS = [
+    ''.join(f',\n        "{field}": {"true" if flags & bit else "false"}' for field, bit in FLAGS.items())
+    for flags in range(1 << len(FLAGS))
+]
+
+
+def _record_end(closed_at):
+    return '\n    }' if closed_at is None else f',\n        "closed_at": {closed_at}\n    }}'
+
+
+def dump_tasks(tasks):
+    """Serialize tasks exactly like json.dumps([task.to_dict() ...], indent=4)."""
+    if not tasks:
+        return '[]'
+    return '[\n' + ',\n'.join(
+        '    {\n        "name": ' + _encode_string(task.name) + _RECORD_FLAGS[task.flags] + _record_end(task.closed_at)
+        for task in tasks) + '\n]'
+
+
+def count_matching(flag_counts, include=0, exclude=0):
+    """Number of tasks with all bits of include and none of exclude set."""
+    return sum(count for flags, count in enumerate(flag_counts)
+               if flags & include == include and not flags & exclude)
+
+
+def status_counts(flag_counts):
+    """Counts for the status display; total and done leave out separators and cancelled tasks."""
+    return {'total': count_matching(flag_counts, exclude=SEPARATOR | CANCELLED),
+            'done': count_matching(flag_counts, DONE, exclude=SEPARATOR | CANCELLED),
+            'cancelled': count_matching(flag_counts, CANCELLED, exclude=SEPARATOR),
+            'urgent': count_matching(flag_counts, URGENT),
+            'separator': count_matching(flag_counts, SEPARATOR)}
+
+
+class TaskStore:
+    """Ordered collection of tasks.
+
+    All changes go through the methods below. Task objects are never changed
+    in place, so snapshot() is a cheap list copy that a writer thread can
+    serialize while the list keeps changing. Every change is also reported to
+    the listeners as a storage record (see storage.apply_record).
+
+    The store keeps a count of tasks per flag combination. Any status count
+    is a sum over at most 32 buckets, however long the list is.
+
+    When undo_log is a list, every change also appends the operation that
+    reverts it, in the form revert() takes (see history.py).
+    """
+
+    debug = bool(os.environ.get('TODO_APP_DEBUG'))
+
+    def __init__(self, tasks=()):
+        self.tasks = list(tasks)
+        self.listeners = []
+        self.undo_log = None
+        self.flag_counts = self.count_flags(self.tasks)
+
+    @classmethod
+    def from_dicts(cls, dicts):
+        return cls(Task.from_dict(data) for data in dicts)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, index):
+        return self.tasks[index]
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+    @staticmethod
+    def count_flags(tasks):
+        flag_counts = [0] * (1 << len(FLAGS))
+        for task in tasks:
+            flag_counts[task.flags] += 1
+        return flag_counts
+
+    def count(self, include=0, exclude=0):
+        return count_matching(self.flag_counts, include, exclude)
+
+    def counts(self):
+        if self.debug:
+            self.check_counts()
+        return status_counts(self.flag_counts)
+
+    def check_counts(self):
+        """Compare the running counters with a full recount."""
+        expected = self.count_flags(self.tasks)
+        if self.flag_counts != expected:
+            raise AssertionError(f"Task counters out of sync: {self.flag_counts} != {expected}")
+
+    def load(self, tasks):
+        """Append tasks read from storage; unlike insert() this is not reported to the listeners."""
+        tasks = list(tasks)
+        self.tasks.extend(tasks)
+        for task in tasks:
+            self.flag_counts[task.flags] += 1
+
+    def notify(self, op, **fields):
+        for listener in self.listeners:
+            listener(op, **fields)
+
+    def insert(self, index, task):
+        index = min(index, len(self.tasks))
+        self.tasks.insert(index, task)
+        self.flag_counts[task.flags] += 1
+        if self.undo_log is not None:
+            self.undo_log.append(('remove', [index]))
+        self.notify('add', index=index, task=task.to_dict())
+
+    def append(self, task):
+        self.insert(len(self.tasks), task)
+
+    def extend(self, tasks):
+        """Append several tasks; they are undone together by a single remove."""
+        start = len(self.tasks)
+        self.tasks.extend(tasks)
+        for task in tasks:
+            self.flag_counts[task.flags] += 1
+        if self.undo_log is not None:
+            self.undo_log.append(('remove', list(range(start, len(self.tasks)))))
+        for index, task in enumerate(tasks, start):
+            self.notify('add', index=index, task=task.to_dict())
+
+    def remove(self, indices):
+        """Remove the tasks at indices in one pass over the list."""
+        indices = sorted(set(indices))
+        if not indices:
+            return
+        kept, start = [], 0
+        for index in indices:
+            self.flag_counts[self.tasks[index].flags] -= 1
+            kept.extend(self.tasks[start:index])
+            start = index + 1
+        kept.extend(self.tasks[start:])
+        if self.undo_log is not None:
+            self.undo_log.append(('restore', [(index, self.tasks[index]) for index in indices]))
+        self.tasks = kept
+        self.notify('remove', indices=indices)
+
+    def restore(self, pairs):
+        """Put removed tasks back; pairs are (index, task) in ascending index order."""
+        merged, start = [], 0
+        for index, task in pairs:
+            end = start + index - len(merged)
+            merged.extend(self.tasks[start:end])
+            merged.append(task)
+            self.flag_counts[task.flags] += 1
+            start = end
+        merged.extend(self.tasks[start:])
+        self.tasks = merged
+        if self.undo_log is not None:
+            self.undo_log.append(('remove', [index for index, _ in pairs]))
+        for index, task in pairs:
+            self.notify('add', index=index, task=task.to_dict())
+
+    def update(self, index, **changes):
+        task = self.tasks[index]
+        self.tasks[index] = task.replace(**changes)
+        self.flag_counts[task.flags] -= 1
+        self.flag_counts[self.tasks[index].flags] += 1
+        if self.undo_log is not None:
+            self.undo_log.append(('update', index, task.flags, task.name if 'name' in changes else None,
+                                  task.closed_at))
+        self.notify('update', index=index, set=changes)
+
+    def move(self, start_index, end_index):
+        if start_index == end_index:
+            return
+        self.tasks.insert(end_index, self.tasks.pop(start_index))
+        if self.undo_log is not None:
+            self.undo_log.append(('move', end_index, start_index))
+        self.notify('move', index=start_index, to=end_index)
+
+    def revert(self, ops):
+        """Apply logged inverse operations, last first."""
+        for op in reversed(ops):
+            kind = op[0]
+            if kind == 'remove':
+                self.remove(op[1])
+            elif kind == 'restore':
+                self.restore(op[1])
+            elif kind == 'update':
+                _, index, flags, name, closed_at = op
+                current = self.tasks[index]
+                changes = {field: bool(flags & bit) for field, bit in FLAGS.items() if (flags ^ current.flags) & bit}
+                if name is not None:
+                    changes['name'] = name
+                if closed_at != current.closed_at:
+                    changes['closed_at'] = closed_at
+                if changes:
+                    self.update(index, **changes)
+            elif kind == 'move':
+                self.move(op[1], op[2])
+            else:
+                raise ValueError(f"Unknown undo operation: {kind}")
+
+    def snapshot(self):
+        return list(self.tasks)
+
+    def dumps(self):
+        return dump_tasks(self.tasks)
@@ -0,0 +1,162 @@
+"""Opt-in timing of the app's hot paths, for when it "feels slow".
+
+Enabled by TODO_APP_PROFILE (1 for stderr, otherwise a file to append to)
+or the "profile" setting (true for todo_app/profile.log, or a file). The
+app then wraps the methods it names with Profiler.instrument(); when
+profiling is off nothing is wrapped and nothing is timed.
+
+The report has the count and the p50, p95 and max time of each call site.
+Setting "profile_capture_ms" also runs interactions under cProfile until
+one takes at least that long, and saves that one's profile as a .prof file
+next to the log.
+"""
+from collections import deque
+import functools
+import io
+import os
+from pathlib import Path
+import sys
+import time
+
+# Samples kept per call site for the percentiles; count and max cover every call.
+SAMPLES = 10000
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ordered, non-empty list."""
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def write_log(target, text):
+    """Write text to stderr for a target of 1 or '1', and append it to the file target otherwise."""
+    try:
+        if str(target) == '1':
+            print(text, file=sys.stderr)
+        else:
+            with open(target, 'a', encoding='utf-8') as f:
+                f.write(text + "\n")
+    except Exception as e:
+        print(f"Error writing profile: {e}")
+
+
+class CallStats:
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+
+class Profiler:
+    """Times calls per call site and captures cProfile profiles of slow interactions."""
+
+    def __init__(self, log_target='1', capture_ms=None, capture_dir=None):
+        self.log_target = log_target
+        self.capture_dir = Path(capture_dir) if capture_dir is not None else Path.cwd()
+        self.capture_ms = capture_ms
+        self.stats = {}
+        self.captures = []
+        # Nesting of instrumented calls; only the outermost one is an interaction.
+        self.depth = 0
+
+    @classmethod
+    def from_config(cls, config, log_dir):
+        """A Profiler if the environment or config asks for one, else None."""
+        target = os.environ.get('TODO_APP_PROFILE') or config.get('profile')
+        if not target:
+            return None
+        if target is True:
+            target = Path(log_dir) / 'profile.log'
+        capture_dir = Path(log_dir) if str(target) == '1' else Path(target).parent
+        return cls(target, config.get('profile_capture_ms'), capture_dir)
+
+    def record(self, name, seconds):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = CallStats()
+        stats.add(seconds)
+
+    def wrap(self, name, function, capture=False):
+        """function, timed as name; with capture, its outermost calls can be profiled."""
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if capture and self.capture_ms is not None and self.depth == 0:
+                return self.run_captured(name, function, args, kwargs)
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def instrument(self, obj, names, prefix='', capture=False):
+        """Replace the named methods on obj, not on its class, with timed ones."""
+        for name in names:
+            if name not in vars(obj):
+                setattr(obj, name, self.wrap(prefix + name, getattr(obj, name), capture))
+
+    def capture_next(self, min_ms=0):
+        """Profile the next interaction taking at least min_ms."""
+        self.capture_ms = min_ms
+
+    def run_captured(self, name, function, args, kwargs):
+        import cProfile
+        profile = cProfile.Profile()
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            self.depth -= 1
+            seconds = time.perf_counter() - start
+            self.record(name, seconds)
+            if self.capture_ms is not None and seconds * 1000 >= self.capture_ms:
+                self.capture_ms = None
+                self.save_capture(name, seconds, profile)
+
+    def save_capture(self, name, seconds, profile):
+        """Dump the profile to a .prof file and log its most expensive functions."""
+        import pstats
+        path = self.capture_dir / f"profile-{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        try:
+            profile.dump_stats(path)
+        except OSError as e:
+            print(f"Error saving profile: {e}")
+            path = None
+        else:
+            self.captures.append(path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(15)
+        write_log(self.log_target, f"capture: {name} {seconds * 1000:.1f} ms, saved to {path}\n{out.getvalue()}")
+
+    def summary(self):
+        """(name, count, p50, p95, max) per call site, in seconds, the most total time first."""
+        rows = []
+        for name, stats in sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True):
+            ordered = sorted(stats.samples)
+            rows.append((name, stats.count, percentile(ordered, 0.5), percentile(ordered, 0.95), stats.max))
+        return rows
+
+    def report(self):
+        lines = [f"profile: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+                 f"{'call site':<36} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+        for name, count, p50, p95, longest in self.summary():
+            lines.append(f"{name:<36} {count:>7} {p50 * 1000:>9.2f} {p95 * 1000:>9.2f} {longest * 1000:>9.2f}")
+        return "\n".join(lines)
+
+    def write_report(self):
+        if self.stats:
+            write_log(self.log_target, self.report())
+
+    def reset(self):
+        self.stats.clear()
@@ -0,0 +1,93 @@
+"""Substring search over task names backed by a trigram index."""
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Case-insensitive substring search over the names in a TaskStore.
+
+    Names are kept per Task.uid, so entries survive moves and status
+    changes. The trigram postings are filled in on demand: the first query
+    that needs a trigram scans the names once, and from then on the posting
+    is kept up to date. A query only checks the tasks of its smallest known
+    posting, and a query that extends the previous one only checks the
+    previous matches. Queries shorter than three characters check every
+    name.
+
+    The index follows the store through its listeners: added and renamed
+    tasks are indexed right away, removed ones are dropped the next time
+    the uid-to-position map is rebuilt after a structural change.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.names = {task.uid: task.name.casefold() for task in store}
+        self.grams = {}
+        self.positions = None
+        self.last_query = None
+        self.last_matches = None
+        store.listeners.append(self.on_record)
+
+    def add(self, task):
+        name = task.name.casefold()
+        self.names[task.uid] = name
+        for gram in trigrams(name):
+            uids = self.grams.get(gram)
+            if uids is not None:
+                uids.add(task.uid)
+
+    def discard(self, uid):
+        name = self.names.pop(uid, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            uids = self.grams.get(gram)
+            if uids is not None:
+                uids.discard(uid)
+
+    def posting(self, gram):
+        uids = self.grams.get(gram)
+        if uids is None:
+            uids = self.grams[gram] = {uid for uid, name in self.names.items() if gram in name}
+        return uids
+
+    def on_record(self, op, **fields):
+        self.last_query = None
+        if op == 'add':
+            self.add(self.store[fields['index']])
+            self.positions = None
+        elif op == 'update':
+            if 'name' in fields['set']:
+                task = self.store[fields['index']]
+                self.discard(task.uid)
+                self.add(task)
+        else:
+            self.positions = None
+
+    def update_positions(self):
+        if self.positions is not None:
+            return
+        self.positions = {task.uid: index for index, task in enumerate(self.store)}
+        for uid in self.names.keys() - self.positions.keys():
+            self.discard(uid)
+
+    def candidates(self, query):
+        if self.last_query is not None and self.last_query in query:
+            return self.last_matches
+        grams = trigrams(query)
+        if not grams:
+            return self.names.keys()
+        known = [self.grams[gram] for gram in grams if gram in self.grams]
+        return min(known, key=len) if known else self.posting(min(grams))
+
+    def find(self, query):
+        """Indices of the tasks whose name contains query, in list order."""
+        query = query.casefold()
+        self.update_positions()
+        names = self.names
+        matches = [uid for uid in self.candidates(query) if query in names[uid]]
+        self.last_query, self.last_matches = query, matches
+        positions = self.positions
+        return sorted(positions[uid] for uid in matches)
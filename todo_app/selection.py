@@ -0,0 +1,115 @@
+"""Sets of row indices kept as sorted ranges, for selections of any size.
+
+Selecting every row of a long list is one range rather than one entry per
+row, so selecting, clearing, testing membership and walking the selection
+cost a bisect or a step per range, however many rows the ranges cover.
+"""
+from bisect import bisect_left, bisect_right
+
+
+class RangeSet:
+    """Integers stored as sorted, disjoint half-open ranges [start, stop).
+
+    Ranges that touch are merged, so a given set of integers always has the
+    same ranges and two RangeSets can be compared range by range.
+    """
+
+    def __init__(self, ranges=()):
+        self.starts = []
+        self.stops = []
+        self.size = 0
+        for start, stop in ranges:
+            self.add(start, stop)
+
+    @classmethod
+    def from_indices(cls, indices):
+        """A RangeSet of an ascending iterable of indices."""
+        ranges = cls()
+        start = stop = None
+        for index in indices:
+            if index != stop:
+                if start is not None:
+                    ranges.add(start, stop)
+                start = index
+            stop = index + 1
+        if start is not None:
+            ranges.add(start, stop)
+        return ranges
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, index):
+        i = bisect_right(self.starts, index) - 1
+        return i >= 0 and index < self.stops[i]
+
+    def __iter__(self):
+        for start, stop in zip(self.starts, self.stops):
+            yield from range(start, stop)
+
+    def __eq__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.starts == other.starts and self.stops == other.stops
+
+    def __repr__(self):
+        return f"RangeSet({self.ranges()!r})"
+
+    def ranges(self):
+        return list(zip(self.starts, self.stops))
+
+    def first(self):
+        """Smallest index, or None when empty."""
+        return self.starts[0] if self.starts else None
+
+    def copy(self):
+        copy = RangeSet()
+        copy.starts, copy.stops, copy.size = self.starts[:], self.stops[:], self.size
+        return copy
+
+    def window(self, start, stop):
+        """The ranges clipped to [start, stop)."""
+        for i in range(bisect_right(self.stops, start), len(self.starts)):
+            if self.starts[i] >= stop:
+                break
+            yield max(self.starts[i], start), min(self.stops[i], stop)
+
+    def add(self, start, stop):
+        """Add the indices in [start, stop)."""
+        if start >= stop:
+            return
+        # Ranges lo..hi-1 overlap or touch the new one and are merged into it
+        lo = bisect_left(self.stops, start)
+        hi = bisect_right(self.starts, stop)
+        if lo < hi:
+            self.size -= sum(self.stops[i] - self.starts[i] for i in range(lo, hi))
+            start, stop = min(start, self.starts[lo]), max(stop, self.stops[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.stops[lo:hi] = [stop]
+        self.size += stop - start
+
+    def remove(self, start, stop):
+        """Remove the indices in [start, stop); absent ones are ignored."""
+        if start >= stop:
+            return
+        # Ranges lo..hi-1 overlap [start, stop); what sticks out on either side is kept
+        lo = bisect_right(self.stops, start)
+        hi = bisect_left(self.starts, stop)
+        if lo >= hi:
+            return
+        starts, stops = [], []
+        if self.starts[lo] < start:
+            starts.append(self.starts[lo])
+            stops.append(start)
+        if self.stops[hi - 1] > stop:
+            starts.append(stop)
+            stops.append(self.stops[hi - 1])
+        self.size -= sum(self.stops[i] - self.starts[i] for i in range(lo, hi))
+        self.size += sum(b - a for a, b in zip(starts, stops))
+        self.starts[lo:hi] = starts
+        self.stops[lo:hi] = stops
+
+    def clear(self):
+        self.starts.clear()
+        self.stops.clear()
+        self.size = 0
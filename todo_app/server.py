@@ -0,0 +1,351 @@
+"""Local JSON-RPC server that lets other programs work on the open list.
+
+The server speaks JSON-RPC 2.0 with one JSON message per line, over a Unix
+socket where there is one and on 127.0.0.1 otherwise. Batches (JSON arrays)
+are accepted, so a client can send many calls at once:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "add", "params": {"texts": ["Buy milk"]}}
+    {"jsonrpc": "2.0", "id": 2, "method": "update", "params": {"index": 0, "done": true}}
+
+Methods: add, list, update, move, remove and counts, see METHODS.
+
+The Unix socket is only open to the user running the server. Any local user
+can connect to 127.0.0.1, so there the first line a client sends must be the
+token the server writes to a file only that user can read.
+
+The asyncio loop runs on its own thread and never touches the list. Calls
+are queued for the thread that owns the TodoList (the Tk thread in the
+app), which runs everything queued so far in one TodoList.batch(). A burst
+of requests is therefore saved once and redrawn once.
+"""
+import asyncio
+import errno
+import hmac
+import inspect
+import json
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+UNAUTHORIZED = -32001
+
+DEFAULT_PORT = 8765
+# Size of sun_path in struct sockaddr_un, terminating NUL included
+UNIX_PATH_MAX = 108 if sys.platform.startswith('linux') else 104
+
+
+def check_index(todo, index, end=False):
+    """Reject indices outside the list; end allows the position after the last task."""
+    if not isinstance(index, int) or not 0 <= index < len(todo) + end:
+        raise IndexError(f"No task at index {index}")
+    return index
+
+
+def rpc_add(todo, text=None, texts=None, index=None):
+    """Add one task or several; returns the indices they were added at."""
+    todo.finish_loading()
+    texts = [text] if texts is None else texts
+    if index is not None:
+        check_index(todo, index, end=True)
+    added = []
+    for text in texts:
+        position = todo.add(text, index if index is None else index + len(added))
+        if position is not None:
+            added.append(position)
+    return added
+
+
+def rpc_list(todo, query=None, open_only=False):
+    """Tasks with their index, optionally only those matching query or still open."""
+    todo.finish_loading()
+    indices = todo.find(query) if query else range(len(todo))
+    return [{'index': index, **todo[index].to_dict()} for index in indices
+            if not (open_only and (todo[index].done or todo[index].cancelled))]
+
+
+def rpc_update(todo, index, name=None, done=None, cancelled=None, urgent=None):
+    """Set the name and/or status of a task; returns the updated task."""
+    todo.finish_loading()
+    task = todo[check_index(todo, index)]
+    if done is not None and done != task.done:
+        todo.toggle_done([index])
+    if cancelled is not None and cancelled != todo[index].cancelled:
+        todo.toggle_cancelled([index])
+    if urgent is not None and urgent != todo[index].urgent:
+        todo.toggle_urgent([index])
+    if name is not None:
+        todo.rename(index, name)
+    return {'index': index, **todo[index].to_dict()}
+
+
+def rpc_move(todo, index, to):
+    todo.finish_loading()
+    todo.move(check_index(todo, index), check_index(todo, to))
+
+
+def rpc_remove(todo, indices):
+    """Remove the tasks at indices; returns how many were removed."""
+    todo.finish_loading()
+    indices = {check_index(todo, index) for index in indices}
+    todo.remove(indices)
+    return len(indices)
+
+
+def rpc_counts(todo):
+    return todo.counts()
+
+
+METHODS = {
+    'add': rpc_add,
+    'list': rpc_list,
+    'update': rpc_update,
+    'move': rpc_move,
+    'remove': rpc_remove,
+    'counts': rpc_counts,
+}
+SIGNATURES = {name: inspect.signature(function) for name, function in METHODS.items()}
+
+
+def socket_in_use(path):
+    """Whether a server is listening on the Unix socket at path, rather than it being left over."""
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def error_reply(code, message, id=None):
+    return {'jsonrpc': '2.0', 'error': {'code': code, 'message': message}, 'id': id}
+
+
+def write_private(path, text):
+    """Write text to a new file at path that only the current user can read."""
+    try:
+        os.unlink(path)  # an existing file would keep its permissions
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with open(fd, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+class TaskServer:
+    """Serves METHODS for the list get_todo() returns.
+
+    Listens on the Unix socket at path or, with path None or where there
+    are no Unix sockets, on 127.0.0.1:port. There, clients must send token
+    as their first line; it is written to token_path, when given, before
+    the port is opened. notify() is called from the server thread whenever
+    calls are queued; the owner of the list then calls process_requests()
+    on its own thread.
+    """
+
+    def __init__(self, get_todo, path=None, port=DEFAULT_PORT, notify=None, token_path=None):
+        self.get_todo = get_todo
+        self.path = path if path is not None and hasattr(asyncio, 'start_unix_server') else None
+        self.port = port
+        self.token = secrets.token_hex(16) if self.path is None else None
+        self.token_path = token_path if self.path is None else None
+        self.notify = notify or (lambda: None)
+        self.requests = queue.SimpleQueue()
+        self.loop = None
+        self.stopped = None
+        self.error = None
+        self.started = threading.Event()
+        self.thread = None
+
+    @property
+    def address(self):
+        return str(self.path) if self.path is not None else f"127.0.0.1:{self.port}"
+
+    def start(self):
+        """Start serving; raises OSError if the socket cannot be opened."""
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), name='TaskServer', daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        try:
+            if self.path is not None:
+                server = await asyncio.start_unix_server(self.handle, sock=self.bind_unix())
+            else:
+                server = await asyncio.start_server(self.handle, sock=self.bind_tcp())
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            return
+        self.started.set()
+        async with server:
+            await self.stopped.wait()
+        for path in (self.path, self.token_path):
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+
+    def bind_unix(self):
+        if len(os.fsencode(self.path)) >= UNIX_PATH_MAX:
+            raise OSError(errno.ENAMETOOLONG, "Path too long for a Unix socket, set rpc_port to use a port instead",
+                          str(self.path))
+        if os.path.exists(self.path):
+            if socket_in_use(self.path):
+                raise OSError(errno.EADDRINUSE, "Another instance is serving this list", str(self.path))
+            os.unlink(self.path)  # left behind by an instance that did not exit cleanly
+        sock = socket.socket(socket.AF_UNIX)
+        # The socket file gets its permissions when it is created, so it is never open to other users
+        umask = os.umask(0o177)
+        try:
+            sock.bind(str(self.path))
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(umask)
+        return sock
+
+    def bind_tcp(self):
+        """A socket bound to the port; nobody can connect before the token is written and it listens."""
+        sock = socket.socket()
+        try:
+            if os.name == 'posix':
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('127.0.0.1', self.port))
+            self.port = sock.getsockname()[1]
+            if self.token_path is not None:
+                write_private(self.token_path, self.token + '\n')
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def stop(self):
+        if self.thread is None:
+            return
+        if self.error is None:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join()
+        self.thread = None
+
+    # Server thread
+
+    async def handle(self, reader, writer):
+        """Answer the requests of one connection; they are answered as they complete, not in order."""
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            if self.token is not None:
+                token = await reader.readline()
+                if not hmac.compare_digest(token.strip(), self.token.encode()):
+                    writer.write(json.dumps(error_reply(UNAUTHORIZED, "Send the token as the first line")).encode()
+                                 + b'\n')
+                    await writer.drain()
+                    return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(self.answer(line, writer, lock))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, line, writer, lock):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            reply = error_reply(PARSE_ERROR, "Parse error")
+        else:
+            if isinstance(message, list) and message:
+                reply = [reply for reply in await asyncio.gather(*map(self.call, message)) if reply is not None]
+            else:
+                reply = await self.call(message)
+        if reply:
+            async with lock:
+                writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+                await writer.drain()
+
+    async def call(self, message):
+        if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' or \
+                not isinstance(message.get('method'), str):
+            return error_reply(INVALID_REQUEST, "Invalid request", message.get('id') if isinstance(message, dict) else None)
+        id = message.get('id')
+        function = METHODS.get(message['method'])
+        if function is None:
+            return error_reply(METHOD_NOT_FOUND, f"Method not found: {message['method']}", id)
+        params = message.get('params', {})
+        try:
+            if isinstance(params, list):
+                bound = SIGNATURES[message['method']].bind(None, *params)
+            else:
+                bound = SIGNATURES[message['method']].bind(None, **params)
+        except TypeError as e:
+            return error_reply(INVALID_PARAMS, f"Invalid params: {e}", id)
+
+        future = self.loop.create_future()
+        self.requests.put((function, bound.args[1:], bound.kwargs, future))
+        self.notify()
+        try:
+            result = await future
+        except Exception as e:
+            return error_reply(SERVER_ERROR, str(e) or type(e).__name__, id)
+        if 'id' not in message:
+            return None  # a notification
+        return {'jsonrpc': '2.0', 'result': result, 'id': id}
+
+    # Owner thread
+
+    def process_requests(self):
+        """Run every queued call against the list in one batch; returns how many ran.
+
+        Must be called on the thread that owns the list.
+        """
+        pending = []
+        while True:
+            try:
+                pending.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+        if not pending:
+            return 0
+        todo = self.get_todo()
+        outcomes = []
+        with todo.batch():
+            for function, args, kwargs, future in pending:
+                try:
+                    outcomes.append((future, function(todo, *args, **kwargs), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+        try:
+            # One wake-up of the server loop for the whole batch
+            self.loop.call_soon_threadsafe(self.resolve, outcomes)
+        except RuntimeError:  # the server has stopped
+            pass
+        return len(pending)
+
+    @staticmethod
+    def resolve(outcomes):
+        for future, result, error in outcomes:
+            if future.cancelled():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
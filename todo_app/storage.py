@@ -0,0 +1,698 @@
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+try:
+    from .binfile import BinaryTaskFile, dump_binary
+    from .model import Task, dump_tasks, status_counts
+except ImportError:
+    from binfile import BinaryTaskFile, dump_binary
+    from model import Task, dump_tasks, status_counts
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on <path>.lock while the block runs.
+
+    Other instances and scripts that lock the same path wait for it; nothing
+    stops a program that does not lock from writing anyway.
+    """
+    path = Path(path)
+    with open(path.with_name(path.name + '.lock'), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ten seconds
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_stamp(path):
+    """Inode, modification time and size of path, or None if it does not exist.
+
+    Every atomic rewrite creates a new inode, so the stamp changes even when
+    two writes fall into the same mtime tick and have the same size.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def replace_file(path, text):
+    """Write text (or bytes) to path through a temporary file and an atomic rename."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') if isinstance(text, bytes) else open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_atomic(path, text):
+    """replace_file() while holding the file's lock."""
+    with file_lock(path):
+        replace_file(path, text)
+
+
+class TaskWriter:
+    """Writes task snapshots from a background thread, coalescing bursts.
+
+    submit() only hands over the newest snapshot. The worker waits until no
+    new snapshot arrived for `delay` seconds and then writes the latest one,
+    so a burst of edits results in a single write.
+
+    synced is the (file_stamp, tasks) pair of the file as this process last
+    read or wrote it. While guarded is set, a write that finds the file
+    changed by someone else is skipped instead of overwriting their edit;
+    the caller merges the change (see sync.py) and saves again.
+    """
+
+    def __init__(self, path, delay=0.5, dump=dump_tasks):
+        self.path = Path(path)
+        self.delay = delay
+        self.dump = dump
+        self.synced = (None, [])
+        self.guarded = False
+        self.conflicts = 0
+        self.pending = None
+        self.last_submit = 0.0
+        self.submitted = 0
+        self.writes = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='TaskWriter', daemon=True)
+        self.thread.start()
+
+    @property
+    def writes_avoided(self):
+        """Number of submitted snapshots that were superseded before being written."""
+        with self.condition:
+            return self.submitted - self.writes - (self.pending is not None)
+
+    def submit(self, tasks):
+        with self.condition:
+            self.pending = tasks
+            self.submitted += 1
+            self.last_submit = time.monotonic()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                remaining = self.last_submit + self.delay - time.monotonic()
+                if remaining > 0 and not self.closed:
+                    self.condition.wait(remaining)
+                    continue
+                tasks, self.pending = self.pending, None
+                # Taken while still holding the condition so flush() waits for this write.
+                self.write_lock.acquire()
+            try:
+                self.write(tasks)
+            finally:
+                self.write_lock.release()
+
+    def write(self, tasks):
+        try:
+            with file_lock(self.path):
+                if self.guarded and file_stamp(self.path) != self.synced[0]:
+                    self.conflicts += 1
+                    return
+                replace_file(self.path, self.dump(tasks))
+                self.synced = (file_stamp(self.path), tasks)
+            self.writes += 1
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+
+    def adopt(self, stamp, tasks):
+        """Take tasks read from the file as the synced state and drop the pending snapshot.
+
+        Returns the previously synced tasks, the base for merging.
+        """
+        with self.condition, self.write_lock:
+            self.pending = None
+            base, self.synced = self.synced[1], (stamp, tasks)
+        return base
+
+    def flush(self):
+        """Write the pending snapshot, if any, before returning."""
+        with self.condition:
+            tasks, self.pending = self.pending, None
+        with self.write_lock:
+            if tasks is not None:
+                self.write(tasks)
+
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yield the items of a JSON array from a text file, reading it chunk by chunk."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def skip(chars):
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+
+    skip(' \t\r\n')
+    if buffer[pos:pos + 1] != '[':
+        raise json.JSONDecodeError("Expecting '['", buffer, pos)
+    pos += 1
+    while True:
+        skip(' \t\r\n,')
+        if eof or buffer[pos] == ']':
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        yield item
+
+
+def apply_record(tasks, record):
+    """Replay one mutation record onto a list of task dicts (see TaskStore.notify)."""
+    op = record['op']
+    if op == 'add':
+        tasks.insert(record['index'], record['task'])
+    elif op == 'remove':
+        for index in sorted(record['indices'], reverse=True):
+            del tasks[index]
+    elif op == 'update':
+        tasks[record['index']].update(record['set'])
+    elif op == 'move':
+        tasks.insert(record['to'], tasks.pop(record['index']))
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+class JsonStorage:
+    """Stores the whole list as a JSON array in tasks.json."""
+
+    def __init__(self, path, delay=0.5):
+        self.path = Path(path)
+        self.writer = TaskWriter(self.path, delay)
+
+    def load(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stamp = file_stamp(self.path)
+        try:
+            tasks = [Task.from_dict(data) for data in json.loads(self.path.read_text(encoding='utf-8'))]
+        except (json.JSONDecodeError, FileNotFoundError):
+            tasks = []
+        self.writer.synced = (stamp, tasks)
+        return tasks
+
+    def iter_tasks(self):
+        """Yield the tasks one by one while the file is still being parsed."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stamp, tasks = file_stamp(self.path), []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for data in iter_json_array(f):
+                    task = Task.from_dict(data)
+                    tasks.append(task)
+                    yield task
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            print(f"Error loading tasks: {e}")
+        self.writer.synced = (stamp, tasks)
+
+    def read_snapshot(self):
+        """What another process saved since this one last read or wrote the file, as (stamp, tasks), or None."""
+        with file_lock(self.path):
+            stamp = file_stamp(self.path)
+            if stamp is None or stamp == self.writer.synced[0]:
+                return None
+            try:
+                return stamp, [Task.from_dict(data) for data in json.loads(self.path.read_text(encoding='utf-8'))]
+            except json.JSONDecodeError as e:
+                print(f"Error reading external changes: {e}")
+                return None
+
+    def record(self, op, **fields):
+        """Note a single mutation; the JSON file is always rewritten whole."""
+
+    def save(self, tasks):
+        self.writer.submit(tasks)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class JournalStorage:
+    """Appends one small record per mutation to tasks.journal.
+
+    tasks.json stays a plain JSON array and acts as the snapshot. The first
+    line of the journal holds the hash of the snapshot it continues, so a
+    journal left behind by an interrupted compaction, or by another backend
+    rewriting tasks.json, is recognized as stale and ignored. Once the
+    journal has more than `compact_after` records it is folded into a new
+    snapshot.
+    """
+
+    def __init__(self, path, compact_after=1000):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix('.journal')
+        self.compact_after = compact_after
+        self.pending = []
+        self.journal_size = 0
+        self.journal = None
+        self.tasks = None
+
+    @staticmethod
+    def snapshot_hash(text):
+        import hashlib
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def load(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            text = self.path.read_text(encoding='utf-8')
+            tasks = json.loads(text)
+        except (json.JSONDecodeError, FileNotFoundError):
+            text, tasks = '', []
+
+        snapshot = self.snapshot_hash(text)
+        try:
+            lines = self.journal_path.read_text(encoding='utf-8').splitlines()
+        except FileNotFoundError:
+            lines = []
+
+        try:
+            current = bool(lines) and json.loads(lines[0]).get('snapshot') == snapshot
+        except (json.JSONDecodeError, AttributeError):
+            current = False  # torn or corrupt header: the journal cannot be trusted
+        if current:
+            for line in lines[1:]:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn write at the end of the journal
+                apply_record(tasks, record)
+                self.journal_size += 1
+        else:
+            write_atomic(self.journal_path, json.dumps({'snapshot': snapshot}) + '\n')
+
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        return [Task.from_dict(data) for data in tasks]
+
+    def iter_tasks(self):
+        # The journal can touch any position, so it has to be replayed in full first.
+        yield from self.load()
+
+    def record(self, op, **fields):
+        self.pending.append({'op': op, **fields})
+
+    def save(self, tasks):
+        self.tasks = tasks
+        if not self.pending:
+            return
+        if self.journal_size + len(self.pending) > self.compact_after:
+            self.compact()
+            return
+        self.journal.write(''.join(json.dumps(record) + '\n' for record in self.pending))
+        self.journal.flush()
+        self.journal_size += len(self.pending)
+        self.pending = []
+
+    def rewrite(self, tasks):
+        self.tasks = tasks
+        self.compact()
+
+    def compact(self):
+        """Fold the journal into a fresh tasks.json snapshot."""
+        if self.tasks is None:
+            return
+        try:
+            text = dump_tasks(self.tasks)
+            write_atomic(self.path, text)
+            self.journal.close()
+            write_atomic(self.journal_path, json.dumps({'snapshot': self.snapshot_hash(text)}) + '\n')
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+            self.journal_size = 0
+            self.pending = []
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+
+    def flush(self):
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def close(self):
+        if self.journal_size:
+            self.compact()
+        self.journal.close()
+
+
+class SqliteStorage:
+    """Stores tasks in tasks.db, ordered by a sparse integer rank.
+
+    A new or moved task gets a rank between its neighbours', so adding,
+    removing, updating or moving a task writes that task's row and no
+    other. Only when two neighbours' ranks leave no room are all ranks
+    spread out again (see rebalance). The ranks of the loaded rows are kept
+    in list order, which maps the indices of the recorded mutations to rows.
+
+    Everything recorded between two saves is committed in one transaction.
+    On first use the existing tasks.json is imported once.
+    """
+
+    FIELDS = ('name', 'done', 'cancelled', 'urgent', 'separator', 'title', 'closed_at')
+    FLAG_FIELDS = FIELDS[1:6]
+    # Gap between the ranks of adjacent rows after a rebalance; 32 tasks can
+    # be put between the same two neighbours before the next one.
+    RANK_STEP = 1 << 32
+
+    TABLE = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            rank INTEGER NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            urgent INTEGER NOT NULL DEFAULT 0,
+            separator INTEGER NOT NULL DEFAULT 0,
+            title INTEGER NOT NULL DEFAULT 0,
+            closed_at INTEGER
+        )
+    """
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS tasks_status ON tasks (separator, cancelled, done);
+        CREATE INDEX IF NOT EXISTS tasks_urgent ON tasks (urgent);
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.db_path = self.path.with_suffix('.db')
+        self.pending = []
+        self.ranks = []
+        self.rebalances = 0
+        self.conn = None
+
+    def load(self):
+        self.load_schema()
+        return list(self.iter_rows())
+
+    def iter_tasks(self):
+        self.load_schema()
+        yield from self.iter_rows()
+
+    def iter_rows(self):
+        self.ranks = []
+        rows = self.conn.execute(
+            "SELECT rank, name, done | (cancelled << 1) | (urgent << 2) | (separator << 3) | (title << 4), closed_at "
+            "FROM tasks ORDER BY rank")
+        for rank, name, flags, closed_at in rows:
+            self.ranks.append(rank)
+            yield Task(name, flags, closed_at)
+
+    def load_schema(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        migrate = not self.db_path.exists()
+        import sqlite3
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(self.TABLE)
+        self.conn.executescript(self.INDEXES)
+        if migrate:
+            self.migrate()
+
+    def migrate(self):
+        """Import tasks.json into the empty database."""
+        try:
+            tasks = json.loads(self.path.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, FileNotFoundError):
+            return
+        with self.conn:
+            self.insert_all(Task.from_dict(data) for data in tasks)
+
+    def insert_all(self, tasks):
+        self.ranks = []
+
+        def rows():
+            for task in tasks:
+                self.ranks.append((len(self.ranks) + 1) * self.RANK_STEP)
+                yield (self.ranks[-1], task.name, task.done, task.cancelled, task.urgent, task.separator, task.title,
+                       task.closed_at)
+        self.conn.executemany(
+            f"INSERT INTO tasks (rank, {', '.join(self.FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows())
+
+    def rank_at(self, index, moving=None):
+        """A rank between the rows around index, or None if theirs are adjacent.
+
+        With moving, the neighbours are those once the row at that index is
+        taken out, as for TaskStore.move.
+        """
+        def rank(position):
+            return self.ranks[position if moving is None or position < moving else position + 1]
+
+        size = len(self.ranks) - (moving is not None)
+        before = rank(index - 1) if index > 0 else 0
+        after = rank(index) if index < size else before + 2 * self.RANK_STEP
+        return (before + after) // 2 if after - before > 1 else None
+
+    def free_rank_at(self, index, moving=None):
+        rank = self.rank_at(index, moving)
+        if rank is None:
+            self.rebalance()
+            rank = self.rank_at(index, moving)
+        return rank
+
+    def rebalance(self):
+        """Spread the ranks RANK_STEP apart again, the one write that touches every row."""
+        ranks = [(position + 1) * self.RANK_STEP for position in range(len(self.ranks))]
+        # Ranks are unique, so the rows step aside to negative ranks first.
+        self.conn.execute("UPDATE tasks SET rank = -rank")
+        self.conn.executemany("UPDATE tasks SET rank = ? WHERE rank = ?",
+                              zip(ranks, (-rank for rank in self.ranks)))
+        self.ranks = ranks
+        self.rebalances += 1
+
+    def record(self, op, **fields):
+        self.pending.append({'op': op, **fields})
+
+    def save(self, tasks):
+        if self.pending:
+            self.write(self.pending)
+
+    def rewrite(self, tasks):
+        """Replace every row with tasks; the recorded changes are already in them."""
+        self.write([], tasks)
+
+    def write(self, records, tasks=None):
+        try:
+            with self.conn:
+                if tasks is not None:
+                    self.conn.execute("DELETE FROM tasks")
+                    self.insert_all(tasks)
+                for record in records:
+                    self.apply(record)
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+            # The transaction was rolled back, and with it any ranks handed out.
+            self.ranks = [rank for (rank,) in self.conn.execute("SELECT rank FROM tasks ORDER BY rank")]
+        self.pending = []
+
+    def apply(self, record):
+        op, execute = record['op'], self.conn.execute
+        if op == 'add':
+            task, index = record['task'], record['index']
+            rank = self.free_rank_at(index)
+            execute(f"INSERT INTO tasks (rank, {', '.join(self.FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (rank, task['name'], *(bool(task.get(field, False)) for field in self.FLAG_FIELDS),
+                     task.get('closed_at')))
+            self.ranks.insert(index, rank)
+        elif op == 'remove':
+            indices = set(record['indices'])
+            self.conn.executemany("DELETE FROM tasks WHERE rank = ?", ((self.ranks[index],) for index in indices))
+            self.ranks = [rank for index, rank in enumerate(self.ranks) if index not in indices]
+        elif op == 'update':
+            fields = [field for field in self.FIELDS if field in record['set']]
+            values = [record['set'][field] for field in fields]
+            execute(f"UPDATE tasks SET {', '.join(f'{field} = ?' for field in fields)} WHERE rank = ?",
+                    (*values, self.ranks[record['index']]))
+        elif op == 'move':
+            start, end = record['index'], record['to']
+            rank = self.free_rank_at(end, moving=start)
+            execute("UPDATE tasks SET rank = ? WHERE rank = ?", (rank, self.ranks[start]))
+            del self.ranks[start]
+            self.ranks.insert(end, rank)
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+
+    def counts(self):
+        """Same counts as TaskStore.counts, answered by the status indexes without loading any task."""
+        if self.conn is None:
+            self.load_schema()
+        execute = self.conn.execute
+        total, done = execute(
+            "SELECT COUNT(*), COALESCE(SUM(done), 0) FROM tasks WHERE separator = 0 AND cancelled = 0").fetchone()
+        (cancelled,) = execute("SELECT COUNT(*) FROM tasks WHERE separator = 0 AND cancelled = 1").fetchone()
+        (urgent,) = execute("SELECT COUNT(*) FROM tasks WHERE urgent = 1").fetchone()
+        (separator,) = execute("SELECT COUNT(*) FROM tasks WHERE separator = 1").fetchone()
+        return {'total': total, 'done': done, 'cancelled': cancelled, 'urgent': urgent, 'separator': separator}
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class BinaryStorage:
+    """Stores tasks in tasks.bin, the compact layout described in binfile.py.
+
+    The file is mapped rather than parsed: loading only reads the flags and
+    closed_at arrays, and each name is decoded when it is first used. Before
+    the first save the remaining names are decoded and the map is closed,
+    since a mapped file cannot be replaced on Windows. Saves rewrite the
+    file from the background writer, like the JSON backend. On first use
+    the existing tasks.json is imported once; export_json() writes it back.
+    """
+
+    def __init__(self, path, delay=0.5):
+        self.path = Path(path)
+        self.bin_path = self.path.with_suffix('.bin')
+        self.source = None
+        self.tasks = []
+        self.writer = TaskWriter(self.bin_path, delay, dump_binary)
+
+    def load(self):
+        return list(self.iter_tasks())
+
+    def iter_tasks(self):
+        self.open_source()
+        if self.source is not None:
+            for task in self.source.tasks():
+                self.tasks.append(task)
+                yield task
+        self.writer.synced = (self.writer.synced[0], list(self.tasks))
+
+    def open_source(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.bin_path.exists():
+            self.migrate()
+        self.writer.synced = (file_stamp(self.bin_path), [])
+        try:
+            self.source = BinaryTaskFile(self.bin_path)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            print(f"Error loading tasks: {e}")
+
+    def migrate(self):
+        """Import tasks.json, if there is one, into a new tasks.bin."""
+        try:
+            tasks = json.loads(self.path.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, FileNotFoundError):
+            return
+        write_atomic(self.bin_path, dump_binary([Task.from_dict(data) for data in tasks]))
+
+    def read_snapshot(self):
+        """What another process saved since this one last read or wrote the file, as (stamp, tasks), or None."""
+        with file_lock(self.bin_path):
+            stamp = file_stamp(self.bin_path)
+            if stamp is None or stamp == self.writer.synced[0]:
+                return None
+            try:
+                source = BinaryTaskFile(self.bin_path)
+            except ValueError as e:
+                print(f"Error reading external changes: {e}")
+                return None
+            try:
+                return stamp, [Task(task.name, task.flags, task.closed_at) for task in source.tasks()]
+            finally:
+                source.close()
+
+    def export_json(self, tasks, path=None):
+        """Write tasks to tasks.json (or path) in the JSON backend's format."""
+        write_atomic(self.path if path is None else path, dump_tasks(tasks))
+
+    def counts(self):
+        """Same counts as TaskStore.counts, from the flags array alone."""
+        if self.source is None:
+            self.open_source()
+        return status_counts(self.source.flag_counts() if self.source is not None else [])
+
+    def release(self):
+        """Decode the names still in the file and unmap it."""
+        if self.source is None:
+            return
+        for task in self.tasks:
+            task.name
+        self.tasks = []
+        self.source.close()
+        self.source = None
+
+    def record(self, op, **fields):
+        """Note a single mutation; the file is always rewritten whole."""
+
+    def save(self, tasks):
+        self.release()
+        self.writer.submit(tasks)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+        self.release()
+
+
+STORAGE_BACKENDS = {
+    'json': JsonStorage,
+    'journal': JournalStorage,
+    'sqlite': SqliteStorage,
+    'binary': BinaryStorage,
+}
+
+
+def open_storage(path, backend='json'):
+    return STORAGE_BACKENDS.get(backend, JsonStorage)(path)
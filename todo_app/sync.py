@@ -0,0 +1,166 @@
+"""Merging changes that other instances save to the same list.
+
+A ChangeWatcher thread stats the list's file and reads it when its stamp
+no longer matches what this process last read or wrote. The Tk thread only
+drains the watcher's queue, so it never waits for the disk. Merging is a
+three-way merge against the last synced state, and the result is applied
+to the TaskStore as a handful of inserts, removals and updates, so the
+search index and the visible rows follow incrementally.
+"""
+from difflib import SequenceMatcher
+import queue
+import threading
+
+try:
+    from .model import FLAGS
+    from .storage import file_stamp
+except ImportError:
+    from model import FLAGS
+    from storage import file_stamp
+
+
+def task_key(task):
+    return task.name, task.flags, task.closed_at
+
+
+def diff(old, new):
+    """Non-equal opcodes, as from SequenceMatcher, turning old into new.
+
+    The common head and tail are skipped first, which is all of it for the
+    usual case of a few edits to a long list.
+    """
+    start, old_end, new_end = 0, len(old), len(new)
+    limit = min(old_end, new_end)
+    while start < limit and old[start] == new[start]:
+        start += 1
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    matcher = SequenceMatcher(None, [task_key(task) for task in old[start:old_end]],
+                              [task_key(task) for task in new[start:new_end]], autojunk=False)
+    return [(tag, i1 + start, i2 + start, j1 + start, j2 + start)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_hunks(base, start, end, hunks):
+    merged, pos = [], start
+    for hunk_start, hunk_end, replacement in hunks:
+        merged.extend(base[pos:hunk_start])
+        merged.extend(replacement)
+        pos = hunk_end
+    merged.extend(base[pos:end])
+    return merged
+
+
+def merge_tasks(base, ours, theirs):
+    """Three-way merge of two edited copies of base.
+
+    Edits to different parts of the list are both kept. Where both sides
+    changed the same tasks, our version is kept and the tasks only they
+    added or changed are put after it, so nobody's edit is lost.
+    """
+    hunks = sorted([(i1, i2, ours[j1:j2], 0) for _, i1, i2, j1, j2 in diff(base, ours)] +
+                   [(i1, i2, theirs[j1:j2], 1) for _, i1, i2, j1, j2 in diff(base, theirs)],
+                   key=lambda hunk: hunk[:2])
+    if all(hunk[3] for hunk in hunks):
+        return list(theirs)
+    if not any(hunk[3] for hunk in hunks):
+        return list(ours)
+
+    merged, pos, i = [], 0, 0
+    while i < len(hunks):
+        start, end = hunks[i][:2]
+        group = [hunks[i]]
+        i += 1
+        while i < len(hunks) and (hunks[i][0] < end or hunks[i][0] == start):
+            end = max(end, hunks[i][1])
+            group.append(hunks[i])
+            i += 1
+        merged.extend(base[pos:start])
+        mine = apply_hunks(base, start, end, [hunk[:3] for hunk in group if hunk[3] == 0])
+        other = apply_hunks(base, start, end, [hunk[:3] for hunk in group if hunk[3] == 1])
+        if all(hunk[3] == 1 for hunk in group):
+            merged.extend(other)
+        else:
+            merged.extend(mine)
+            if other != mine:
+                seen = {task_key(task) for task in base[start:end]} | {task_key(task) for task in mine}
+                merged.extend(task for task in other if task_key(task) not in seen)
+        pos = end
+    merged.extend(base[pos:])
+    return merged
+
+
+def task_changes(old, new):
+    """The TaskStore.update() arguments that turn old into new."""
+    changes = {field: bool(new.flags & bit) for field, bit in FLAGS.items() if (old.flags ^ new.flags) & bit}
+    if old.name != new.name:
+        changes['name'] = new.name
+    if old.closed_at != new.closed_at:
+        changes['closed_at'] = new.closed_at
+    return changes
+
+
+def apply_changes(store, tasks):
+    """Edit store until it holds tasks, touching only what differs; returns whether anything changed."""
+    ops = diff(store.tasks, tasks)
+    for _, i1, i2, j1, j2 in reversed(ops):
+        # Replaced tasks are updated in place as far as they pair up.
+        common = min(i2 - i1, j2 - j1)
+        for index, task in zip(range(i1, i1 + common), tasks[j1:j1 + common]):
+            store.update(index, **task_changes(store[index], task))
+        if i2 > i1 + common:
+            store.remove(range(i1 + common, i2))
+        for offset, task in enumerate(tasks[j1 + common:j2]):
+            store.insert(i1 + common + offset, task)
+    return bool(ops)
+
+
+class ChangeWatcher:
+    """Notices when another process rewrites the file of a storage backend.
+
+    A daemon thread compares the file's stamp with the writer's synced
+    stamp every `interval` seconds, which costs one stat() call. When they
+    differ the file is read on that thread and (stamp, tasks) is put on
+    `changes`. Only backends that rewrite a whole snapshot (read_snapshot())
+    can be watched.
+    """
+
+    def __init__(self, storage, interval=1.0):
+        self.storage = storage
+        self.interval = interval
+        self.changes = queue.SimpleQueue()
+        self.seen = None
+        self.stopped = threading.Event()
+        storage.writer.guarded = True
+        self.thread = threading.Thread(target=self.run, name='ChangeWatcher', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        writer = self.storage.writer
+        while not self.stopped.wait(self.interval):
+            stamp = file_stamp(writer.path)
+            if stamp == writer.synced[0] or stamp == self.seen:
+                continue
+            self.seen = stamp
+            try:
+                found = self.storage.read_snapshot()
+            except Exception as e:
+                print(f"Error reading external changes: {e}")
+                continue
+            if found is not None:
+                self.changes.put(found)
+
+    def latest(self):
+        """The newest change found since the last call, or None; never blocks."""
+        found = None
+        while True:
+            try:
+                found = self.changes.get_nowait()
+            except queue.Empty:
+                return found
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.storage.writer.guarded = False
@@ -1,22 +1,429 @@
 import tkinter as tk
 from tkinter import ttk
+from tkinter import font as tkfont
 from pathlib import Path
+import os
 import sys
+import time
+
+try:
+    from . import core, formats, lists, profiling
+    from .model import CANCELLED, SEPARATOR, TaskStore, count_matching
+    from .selection import RangeSet
+except ImportError:
+    import core
+    import formats
+    import lists
+    import profiling
+    from model import CANCELLED, SEPARATOR, TaskStore, count_matching
+    from selection import RangeSet
+
+# Colours of each theme, keyed by dark mode; built once, never modified.
+THEMES = {
+    False: {
+        'bg': 'white',
+        'fg': 'black',
+        'entry_bg': '#f0f0f0',
+        'entry_border_focus': '#333333',
+        'caret_color': 'black',
+        'caret_color_focus': '#333333',
+        'button_bg': '#e0e0e0',
+        'button_fg': '#1E90FF',
+        'listbox_bg': 'white',
+        'select_bg': '#d3d3d3',
+        'done_bg': '#29C458',
+        'done_fg': '#1A7B37',
+        'urgent_bg': '#de3f4d',
+        'separator_fg': '#cccccc',
+    },
+    True: {
+        'bg': '#15131e',
+        'fg': 'white',
+        'entry_bg': '#444444',
+        'entry_border_focus': '#cccccc',
+        'caret_color': 'white',
+        'caret_color_focus': '#cccccc',
+        'button_bg': '#444444',
+        'button_fg': '#00BFFF',
+        'listbox_bg': '#15131e',
+        'select_bg': '#555555',
+        'done_bg': '#29C458',
+        'done_fg': '#1A7B37',
+        'urgent_bg': '#de3f4d',
+        'separator_fg': '#cccccc',
+    },
+}
+
+
+def row_styles(colors):
+    """The named styles listbox rows refer to, as (bg, fg); '' takes the listbox's own colour."""
+    return {
+        'normal': ('', ''),
+        'done': (colors['done_bg'], colors['done_fg']),
+        'urgent': (colors['urgent_bg'], 'white'),
+        'cancelled': ('', '#a9a9a9'),
+        'separator': ('', colors['separator_fg']),
+    }
+
+
+ROW_STYLES = {dark: row_styles(colors) for dark, colors in THEMES.items()}
+
+class VirtualListbox(tk.Listbox):
+    """Listbox that only materializes the rows around the visible window.
+
+    Rows are pulled from get_row(index) -> (text, style) when they scroll
+    into view. A style names a (bg, fg) pair in styles, so set_styles()
+    recolours a theme by restyling only the rendered rows whose style
+    changed. Indices taken and returned by the selection methods, activate,
+    nearest, see and size refer to the whole list rather than to the Tk-side
+    rows. The selection is a RangeSet and reaches Tk one range at a time.
+    The arrow and page keys are handled here, since Tk's own bindings stop
+    at the edge of the rendered rows.
+    """
+
+    OVERSCAN = 5
+
+    def __init__(self, master, get_row, **kwargs):
+        super().__init__(master, **kwargs)
+        self.get_row = get_row
+        self.row_count = 0
+        self.top = 0
+        self.window_start = 0
+        self.rendered_rows = []
+        self.styles = {}
+        self.selected = RangeSet()
+        self.active = 0
+        # Tk's active row as last set or seen here; a click moves it behind our back
+        self.tk_active = None
+        self.visible_rows = int(kwargs.get('height', 10))
+
+        self.bind('<Configure>', self.on_configure, add='+')
+        self.bind('<MouseWheel>', self.on_mousewheel)
+        self.bind('<Button-4>', self.on_mousewheel)
+        self.bind('<Button-5>', self.on_mousewheel)
+        for key in ('<Up>', '<Down>', '<Prior>', '<Next>'):
+            self.bind(key, self.on_move_key)
+
+    # Rendering
+
+    def refresh(self, row_count=None):
+        """Re-read the visible window from get_row and apply the differences."""
+        self.sync_selection()
+        if row_count is not None:
+            if row_count < self.row_count:
+                self.selected.remove(row_count, self.row_count)
+            self.row_count = row_count
+        self.top = max(0, min(self.top, self.row_count - self.visible_rows))
+
+        start = max(0, self.top - self.OVERSCAN)
+        end = min(self.row_count, self.top + self.visible_rows + self.OVERSCAN)
+        self.render_rows([self.get_row(index) for index in range(start, end)])
+        self.window_start = start
+
+        self.show_selection()
+        if start <= self.active < end:
+            super().activate(self.active - start)
+        self.tk_active = super().index(tk.ACTIVE)
+        self.tk.call(self._w, 'yview', self.top - start)
+
+    def render_rows(self, rows):
+        """Bring the Tk rows in line with rows, touching only the rows that differ."""
+        old_rows = self.rendered_rows
+        start, old_end, new_end = self.diff_rows(old_rows, rows)
+        moved = self.find_move(old_rows[start:old_end], rows[start:new_end])
+
+        if moved is not None:
+            # A single moved row is deleted and inserted again; the rows in between are left alone.
+            source, target = moved
+            super().delete(start + source)
+            super().insert(start + target, rows[start + target][0])
+        else:
+            if old_end > start:
+                super().delete(start, old_end - 1)
+            if new_end > start:
+                super().insert(start, *(text for text, _ in rows[start:new_end]))
+
+        shift = old_end - new_end
+        for index, (text, style) in enumerate(rows):
+            if moved is not None and start <= index < new_end:
+                if index == start + moved[1]:
+                    self.apply_style(index, style)
+            elif start <= index < new_end:
+                self.apply_style(index, style)
+            else:
+                old_index = index if index < start else index + shift
+                if old_rows[old_index][1] != style:
+                    self.apply_style(index, style)
+
+        self.rendered_rows = rows
+
+    def apply_style(self, index, style):
+        bg, fg = self.styles.get(style, ('', ''))
+        super().itemconfig(index, {'bg': bg, 'fg': fg})
+
+    def set_styles(self, styles):
+        """Switch the colours of the named styles; only rendered rows whose style looks different are touched."""
+        changed = {name for name, colors in styles.items() if colors != self.styles.get(name, ('', ''))}
+        self.styles = styles
+        for index, (_, style) in enumerate(self.rendered_rows):
+            if style in changed:
+                self.apply_style(index, style)
+
+    @staticmethod
+    def find_move(old_block, new_block):
+        """(source, target) if new_block is old_block with its first or last row moved to the other end."""
+        if len(old_block) != len(new_block) or len(old_block) < 2:
+            return None
+        if old_block[1:] == new_block[:-1] and old_block[0] == new_block[-1]:
+            return 0, len(old_block) - 1
+        if old_block[:-1] == new_block[1:] and old_block[-1] == new_block[0]:
+            return len(old_block) - 1, 0
+        return None
+
+    @staticmethod
+    def diff_rows(old_rows, new_rows):
+        """Find the block of rows whose text changed.
+
+        Returns (start, old_end, new_end): old_rows[start:old_end] has to be
+        replaced with new_rows[start:new_end], everything around it only
+        needs restyling.
+        """
+        start = 0
+        limit = min(len(old_rows), len(new_rows))
+        while start < limit and old_rows[start][0] == new_rows[start][0]:
+            start += 1
+
+        old_end, new_end = len(old_rows), len(new_rows)
+        while old_end > start and new_end > start and old_rows[old_end - 1][0] == new_rows[new_end - 1][0]:
+            old_end -= 1
+            new_end -= 1
+
+        return start, old_end, new_end
+
+    # Scrolling
+
+    def scroll_to(self, top):
+        top = max(0, min(top, self.row_count - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def see(self, index):
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.visible_rows:
+            self.scroll_to(index - self.visible_rows + 1)
+
+    def autoscroll(self, y):
+        """Scroll one row when y is above or below the widget, e.g. while dragging."""
+        if y < 0:
+            self.scroll_to(self.top - 1)
+        elif y > self.winfo_height():
+            self.scroll_to(self.top + 1)
+
+    def yview(self, *args):
+        count = max(self.row_count, 1)
+        if not args:
+            return self.top / count, min(1.0, (self.top + self.visible_rows) / count)
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * count))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll_to(self.top + amount)
+        else:
+            self.scroll_to(int(args[0]))
+
+    def on_mousewheel(self, event):
+        if event.num == 4:
+            rows = -5
+        elif event.num == 5:
+            rows = 5
+        elif sys.platform == 'darwin':
+            rows = -event.delta
+        else:
+            rows = int(-event.delta / 120 * 4)
+        self.scroll_to(self.top + rows)
+        return 'break'
+
+    def on_move_key(self, event):
+        """Move the active row, and the selection with it, by a row or a page."""
+        if super().index(tk.ACTIVE) != self.tk_active:
+            self.active = self.window_start + super().index(tk.ACTIVE)
+        step = {'Up': -1, 'Down': 1, 'Prior': -self.visible_rows, 'Next': self.visible_rows}[event.keysym]
+        self.activate(self.active + step)
+        self.selection_clear(0, tk.END)
+        self.selection_set(self.active)
+        self.event_generate('<<ListboxSelect>>')
+        return 'break'
+
+    def activate(self, index):
+        self.active = max(0, min(int(index), self.row_count - 1))
+        self.see(self.active)
+        if 0 <= self.active - self.window_start < len(self.rendered_rows):
+            super().activate(self.active - self.window_start)
+        self.tk_active = super().index(tk.ACTIVE)
+
+    def on_configure(self, event):
+        font = tkfont.Font(font=self.cget('font'))
+        row_height = font.metrics('linespace') + 1 + 2 * int(self.cget('selectborderwidth'))
+        visible_rows = max(1, -(-event.height // row_height))
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
+
+    # Selection, in whole-list indices
+
+    def sync_selection(self):
+        """Pick up selection changes Tk's own bindings made inside the window."""
+        start, end = self.window_start, self.window_start + len(self.rendered_rows)
+        shown = RangeSet.from_indices(start + index for index in super().curselection())
+        if shown.ranges() != list(self.selected.window(start, end)):
+            self.selected.remove(start, end)
+            for first, stop in shown.ranges():
+                self.selected.add(first, stop)
+
+    def show_selection(self):
+        """Mark the selected rows of the window in Tk, one call per range."""
+        start, end = self.window_start, self.window_start + len(self.rendered_rows)
+        super().selection_clear(0, tk.END)
+        for first, stop in self.selected.window(start, end):
+            super().selection_set(first - start, stop - 1 - start)
+
+    def curselection(self):
+        self.sync_selection()
+        return tuple(self.selected)
+
+    def selection_ranges(self):
+        """The selection as sorted (start, stop) ranges."""
+        self.sync_selection()
+        return self.selected.ranges()
+
+    def selection_count(self):
+        self.sync_selection()
+        return len(self.selected)
+
+    def selection_replace(self, ranges):
+        """Make the RangeSet ranges the whole selection."""
+        self.selected = ranges.copy()
+        self.show_selection()
+
+    def selection_includes(self, index):
+        self.sync_selection()
+        return index in self.selected
+
+    def selection_set(self, first, last=None):
+        self.sync_selection()
+        first, last = self.to_range(first, last)
+        self.selected.add(first, last + 1)
+        self.apply_selection(first, last, super().selection_set)
+
+    def selection_clear(self, first, last=None):
+        self.sync_selection()
+        first, last = self.to_range(first, last)
+        self.selected.remove(first, last + 1)
+        self.apply_selection(first, last, super().selection_clear)
+
+    select_set = selection_set
+    select_clear = selection_clear
+    select_includes = selection_includes
+
+    def apply_selection(self, first, last, method):
+        start, end = self.window_start, self.window_start + len(self.rendered_rows) - 1
+        first, last = max(first, start), min(last, end)
+        if first <= last:
+            method(first - start, last - start)
+
+    def to_range(self, first, last):
+        first = self.row_count - 1 if first == tk.END else int(first)
+        if last is None:
+            last = first
+        last = self.row_count - 1 if last == tk.END else int(last)
+        if first > last:
+            first, last = last, first
+        return max(first, 0), min(last, self.row_count - 1)
+
+    def nearest(self, y):
+        index = super().nearest(y)
+        return index + self.window_start if index >= 0 else index
+
+    def size(self):
+        return self.row_count
+
 
 class TodoApp:
+    """Tk view over a core.TodoList."""
+
+    FIRST_LOAD_BATCH = 500
+    EXTERNAL_CHANGES_POLL_MS = 500
+    RPC_POLL_MS = 20
+    # Timed when profiling is enabled, see profiling.py
+    PROFILED_METHODS = [
+        'populate_listbox', 'update_listbox_task_backgrounds', 'save_tasks', 'update_title', 'update_buttons_state',
+        'apply_theme', 'on_tasks_changed', 'apply_filter', 'load_more_tasks', 'switch_list',
+        'poll_external_changes', 'on_rpc_wake', 'poll_rpc_requests', 'archive_old_tasks',
+    ]
+    # Event handlers, which are also what a cProfile capture picks from
+    PROFILED_HANDLERS = [
+        'add_task', 'remove_selected_tasks', 'mark_selected_tasks_done', 'mark_selected_tasks_cancelled',
+        'toggle_urgent_task', 'undo', 'redo', 'edit_task', 'edit_task_shortcut', 'save_edit_dialog',
+        'add_separator_below', 'add_separator_title', 'select_all_or_text', 'on_listbox_click', 'on_ctrl_click',
+        'on_shift_click', 'on_entry_click', 'show_context_menu', 'start_drag', 'do_drag', 'end_drag',
+        'on_filter_changed', 'toggle_dark_mode', 'show_archive_dialog', 'search_archive', 'restore_archived_tasks',
+        'import_tasks', 'export_tasks', 'show_about_dialog',
+    ]
+    FILE_TYPES = [("todo.txt", "*.txt"), ("Markdown", "*.md"), ("CSV", "*.csv")]
+
     def __init__(self, root: tk.Tk):
         self.root = root
+        self.startup_timings = []
+        self.startup_mark = time.perf_counter()
         self.is_dark_mode = False
-        self.tasks = self.load_tasks()
         self.shift_pressed = False
         self.bulk_selection_mode = False
         self.key_event_processing = False
-        self.selected_indices = set()
+        self.selected_indices = RangeSet()
+        # (key, flag counts) of the last selection_flag_counts() call
+        self.selection_cache = None
+        # (rows_version, flag counts) of all the rows shown while a filter is active
+        self.view_counts_cache = None
+        # Bumped whenever the rows may show different tasks
+        self.rows_version = 0
+        # Task indices of the listbox rows while a filter is active, None otherwise
+        self.view = None
+        # Built on first use, see show_context_menu, open_edit_dialog and show_about_dialog
+        self.context_menu = None
+        self.separator_context_menu = None
+        self.edit_window = None
+        self.about_window = None
+        self.archive_window = None
+        # Set by start_rpc_server
+        self.rpc_server = None
+        self.rpc_wake_fds = None
 
         self.root.withdraw()
 
+        config = self.load_config()
+        self.profiler = profiling.Profiler.from_config(config, self.get_config_file().parent)
+        if self.profiler is not None:
+            # Before anything binds the methods
+            self.profiler.instrument(self, self.PROFILED_METHODS)
+            self.profiler.instrument(self, self.PROFILED_HANDLERS, capture=True)
+            self.root.bind_all('<Control-P>', self.show_profile_window)
+        self.profile_window = None
+        self.mark_startup('load_config')
+        self.lists = lists.TaskLists.from_config(config)
+        self.list_name = config.get('list', lists.DEFAULT_LIST)
+        self.todo = self.lists.open(self.list_name, progressive=True)
+        self.profile_list(self.todo)
+        self.todo.load_next(self.FIRST_LOAD_BATCH)
+        self.todo.change_listeners.append(self.on_tasks_changed)
+        self.todo.watch()
+        self.mark_startup('load_tasks')
+
         self.setup_ui()
-        self.load_config()
+        self.mark_startup('setup_ui')
         self.setup_bindings()
 
         self.listbox.bind('<Button-1>', self.start_drag)
@@ -24,13 +431,20 @@ class TodoApp:
         self.listbox.bind('<ButtonRelease-1>', self.end_drag)
 
         self.drag_start_index = None
+        self.mark_startup('setup_bindings')
 
         self.root.after(10, self.show_window)
+        if self.todo.loading:
+            self.root.after(20, self.load_more_tasks)
+        self.root.after(1000, self.archive_old_tasks)
+        self.root.after(self.EXTERNAL_CHANGES_POLL_MS, self.poll_external_changes)
+        if self.rpc_enabled:
+            self.root.after(100, self.start_rpc_server)
 
     # Setup methods
 
     def setup_ui(self):
-        self.root.title("To-Do")
+        self.root.title(self.list_name)
         self.root.minsize(300, 100)
         self.set_window_icon()
 
@@ -39,10 +453,12 @@ class TodoApp:
         self.create_input_frame()
         self.create_buttons()
 
-        self.populate_listbox()
+        # The configured theme is already known, so the rows are rendered once, in their final colours
         self.apply_theme()
+        self.update_listbox_task_backgrounds()
+        self.adjust_window_size()
+        self.update_title()
         self.update_buttons_state()
-        self.create_context_menu()
 
     def create_main_frame(self):
         self.main_frame = tk.Frame(self.root)
@@ -51,8 +467,9 @@ class TodoApp:
         self.root.grid_columnconfigure(0, weight=1)
 
     def create_listbox(self):
-        self.listbox = tk.Listbox(self.main_frame, selectmode=tk.EXTENDED, bd=0, highlightthickness=0,
-                                  activestyle='none', font=self.get_system_font(), width=40, height=10)
+        self.listbox = VirtualListbox(self.main_frame, get_row=self.get_listbox_row, selectmode=tk.EXTENDED, bd=0,
+                                      highlightthickness=0, activestyle='none', font=self.get_system_font(),
+                                      width=40, height=10)
         self.listbox.grid(row=0, column=0, columnspan=4, sticky="nsew", padx=10, pady=(8, 5))
         self.main_frame.grid_rowconfigure(0, weight=1)
         self.main_frame.grid_columnconfigure(0, weight=1)
@@ -65,12 +482,18 @@ class TodoApp:
         self.entry = tk.Text(self.input_frame, height=1, wrap='none', bd=0, font=self.get_system_font(), insertbackground='black')
         self.entry.grid(row=0, column=0, sticky="ew")
 
+        self.filter_var = tk.StringVar()
+        self.filter_entry = tk.Entry(self.input_frame, textvariable=self.filter_var, bd=0, font=self.get_system_font())
+        self.filter_entry.grid(row=1, column=0, columnspan=4, sticky="ew", pady=(5, 0))
+
         self.setup_entry_bindings()
 
     def setup_entry_bindings(self):
         self.entry.bind('<FocusIn>', self.on_entry_focus_in)
         self.entry.bind('<FocusOut>', self.on_entry_focus_out)
         self.entry.bind('<Button-1>', self.on_entry_click)
+        self.filter_var.trace_add('write', self.on_filter_changed)
+        self.filter_entry.bind('<Escape>', lambda event: self.filter_var.set(''))
 
     def create_buttons(self):
         button_style = {'width': 3, 'padding': (0, 0)}
@@ -89,6 +512,9 @@ class TodoApp:
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.bind_all('<Control-r>', self.toggle_dark_mode)
         self.root.bind_all('<Control-h>', self.show_about_dialog)
+        self.root.bind_all('<Control-z>', self.undo)
+        self.root.bind_all('<Control-y>', self.redo)
+        self.root.bind_all('<Control-Z>', self.redo)
 
         self.listbox.bind('<Control-u>', self.toggle_urgent_task)
         self.listbox.bind('<Control-d>', self.mark_selected_tasks_done)
@@ -109,6 +535,7 @@ class TodoApp:
         self.entry.bind('<KeyRelease>', self.update_buttons_state)
 
     def create_context_menu(self):
+        self.list_var = tk.StringVar(value=self.list_name)
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="Edit Task", command=self.edit_task_shortcut)
         self.context_menu.add_command(label="Un/Mark as Done", command=self.mark_selected_tasks_done)
@@ -119,8 +546,12 @@ class TodoApp:
         self.context_menu.add_separator()
         self.context_menu.add_command(label="Add Separator", command=self.add_separator_below)
         self.context_menu.add_separator()
+        self.context_menu.add_cascade(label="Lists", menu=self.create_lists_menu(self.context_menu))
         self.context_menu.add_command(label="Toggle Dark Mode", command=self.toggle_dark_mode)
         self.context_menu.add_separator()
+        self.context_menu.add_command(label="Archive…", command=self.show_archive_dialog)
+        self.context_menu.add_command(label="Import…", command=self.import_tasks)
+        self.context_menu.add_command(label="Export…", command=self.export_tasks)
         self.context_menu.add_command(label="About", command=self.show_about_dialog)
 
         self.separator_context_menu = tk.Menu(self.root, tearoff=0)
@@ -131,12 +562,29 @@ class TodoApp:
         self.separator_context_menu.add_separator()
         self.separator_context_menu.add_command(label="Add Separator", command=self.add_separator_below)
         self.separator_context_menu.add_separator()
+        self.separator_context_menu.add_cascade(label="Lists", menu=self.create_lists_menu(self.separator_context_menu))
         self.separator_context_menu.add_command(label="Toggle Dark Mode", command=self.toggle_dark_mode)
         self.separator_context_menu.add_separator()
+        self.separator_context_menu.add_command(label="Archive…", command=self.show_archive_dialog)
+        self.separator_context_menu.add_command(label="Import…", command=self.import_tasks)
+        self.separator_context_menu.add_command(label="Export…", command=self.export_tasks)
         self.separator_context_menu.add_command(label="About", command=self.show_about_dialog)
 
-
-
+    def create_lists_menu(self, parent):
+        menu = tk.Menu(parent, tearoff=0)
+        menu.configure(postcommand=lambda: self.update_lists_menu(menu))
+        return menu
+
+    def update_lists_menu(self, menu):
+        """Fill the lists menu when it opens, with the done/total counts of every list."""
+        menu.delete(0, tk.END)
+        for name in self.lists.names():
+            counts = self.lists.counts(name)
+            menu.add_radiobutton(label=f"{name} ({counts['done']}/{counts['total']})",
+                                 value=name, variable=self.list_var, command=lambda name=name: self.switch_list(name))
+        self.list_var.set(self.list_name)
+        menu.add_separator()
+        menu.add_command(label="New List…", command=self.new_list)
 
     def set_window_icon(self, window=None):
         from tkinter import PhotoImage
@@ -148,287 +596,158 @@ class TodoApp:
 
     # Core functionality
 
+    @property
+    def tasks(self):
+        return self.todo.tasks
+
     def add_task(self, event=None):
-        task_name = self.entry.get("1.0", "end-1c").strip()
-        if task_name:
-            if task_name.startswith('---'):
-                title_text = task_name[3:].strip()
-                if title_text:
-                    title_text = title_text.upper()
-
-                    separator_line_before = '─' * 2
-                    separator_line_after = '─' * 30 
-
-                    display_text = f"{separator_line_before} {title_text} {separator_line_after}"
-                    self.tasks.append({'name': display_text, 'separator': True, 'title': True})
-                else:
-                    self.tasks.append({'name': '─' * 40, 'separator': True, 'title': False})
-            else:
-                self.tasks.append({'name': task_name})
-            self.populate_listbox()
-            self.save_tasks()
+        if self.todo.add(self.entry.get("1.0", "end-1c")) is not None:
             self.entry.delete("1.0", tk.END)
             self.update_buttons_state()
-            self.update_title()
             self.entry.focus_set()
 
+    # The handlers below only change self.todo; on_tasks_changed redraws once
+    # the change is saved.
+
     def remove_selected_tasks(self, event=None):
-        selected_indices = list(self.listbox.curselection())
-        for index in reversed(selected_indices):
-            if self.tasks[index].get('separator', False):
-                del self.tasks[index]
-            else:
-                del self.tasks[index]
-        self.populate_listbox()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
+        self.todo.remove(self.selected_tasks())
 
     def mark_selected_tasks_done(self, event=None):
-        selected_indices = self.listbox.curselection()
-        for index in selected_indices:
-            task = self.tasks[index]
-            task['done'] = not task.get('done', False)
-            if task.get('urgent', False) and task['done']:
-                task['urgent'] = False
-        self.populate_listbox()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
+        self.todo.toggle_done(self.selected_tasks())
 
     def mark_selected_tasks_cancelled(self, event=None):
-        selected_indices = self.listbox.curselection()
-        for index in selected_indices:
-            task = self.tasks[index]
-            task['cancelled'] = not task.get('cancelled', False)
-            if task['cancelled']:
-                task['urgent'] = False
-        self.populate_listbox()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
-
+        self.todo.toggle_cancelled(self.selected_tasks())
 
     def toggle_urgent_task(self, event=None):
-        selected_indices = self.listbox.curselection()
-        for index in selected_indices:
-            task = self.tasks[index]
-            task['urgent'] = not task.get('urgent', False)
+        self.todo.toggle_urgent(self.selected_tasks())
+
+    def on_tasks_changed(self):
+        self.apply_filter()
         self.populate_listbox()
-        self.save_tasks()
         self.update_buttons_state()
-        self.update_title()
+
+    def undo(self, event=None):
+        # Text fields, the edit dialog and archive search included, keep Ctrl+Z for their own text
+        if not isinstance(self.root.focus_get(), (tk.Entry, tk.Text)):
+            self.todo.undo()
+
+    def redo(self, event=None):
+        if not isinstance(self.root.focus_get(), (tk.Entry, tk.Text)):
+            self.todo.redo()
 
     def edit_task(self):
-        selected_indices = self.listbox.curselection()
-        if not selected_indices:
+        index = self.first_selected_task()
+        if index is None:
             return
 
-        index = selected_indices[0]
         current_task = self.tasks[index]
+        # Rows can move while the dialog is open (server requests, external
+        # changes), so the task is looked up again by uid when saving.
+        uid = current_task.uid
 
-        if current_task.get('separator', False):
-            title_text = ''
-            if current_task.get('title', False):
-                title_text = current_task['name'][2:-30].strip()
-
-            edit_window = tk.Toplevel(self.root)
-            edit_window.title("Edit Separator Title")
-            edit_window.geometry("200x120")
-            edit_window.transient(self.root)
-            edit_window.grab_set()
-
-            self.set_window_icon(edit_window)
-
-            frame = tk.Frame(edit_window, padx=20, pady=20)
-            frame.pack(fill="both", expand=True)
-
-            text_entry = tk.Text(frame, wrap='word', height=2, width=28)
-            text_entry.insert(tk.END, title_text)
-            text_entry.pack(fill="both", expand=True)
-
-            text_entry.focus_set()
-
-            def on_save(event=None):
-                new_title = text_entry.get("1.0", "end-1c").strip()
-
-                if new_title:
-                    separator_line_before = '─' * 2
-                    separator_line_after = '─' * 30
-                    display_text = f"{separator_line_before} {new_title.upper()} {separator_line_after}"
-                    self.tasks[index]['name'] = display_text
-                    self.tasks[index]['title'] = True
-                else:
-                    self.tasks[index]['name'] = '─' * 40
-                    self.tasks[index]['title'] = False
-
-                self.populate_listbox()
-                self.save_tasks()
-                self.update_buttons_state()
-                edit_window.destroy()
-
-            def on_cancel():
-                edit_window.destroy()
-
-            text_entry.bind("<Return>", on_save)
-
-            button_frame = tk.Frame(frame)
-            button_frame.pack(fill="x", pady=(10, 0))
-
-            save_button = ttk.Button(button_frame, text="Save", command=on_save)
-            save_button.pack(side="left", padx=0)
-
-            cancel_button = ttk.Button(button_frame, text="Cancel", command=on_cancel)
-            cancel_button.pack(side="left", padx=5)
-
-            edit_window.protocol("WM_DELETE_WINDOW", on_cancel)
-            self.center_window_over_window(edit_window)
+        if current_task.separator:
+            def on_save(text):
+                index = self.todo.index_of(uid)
+                if index is not None:
+                    self.todo.set_separator_title(index, text)
 
+            self.open_edit_dialog("Edit Separator Title", core.separator_title(current_task), on_save)
         else:
-            current_task_name = current_task['name']
-
-            edit_window = tk.Toplevel(self.root)
-            edit_window.title("Edit Task")
-            edit_window.geometry("200x120")
-            edit_window.transient(self.root)
-            edit_window.grab_set()
-
-            self.set_window_icon(edit_window)
-
-            frame = tk.Frame(edit_window, padx=20, pady=20)
-            frame.pack(fill="both", expand=True)
-
-            text_entry = tk.Text(frame, wrap='word', height=2, width=28)
-            text_entry.insert(tk.END, current_task_name)
-            text_entry.pack(fill="both", expand=True)
-
-            text_entry.focus_set()
-
-            def on_save(event=None):
-                new_name = text_entry.get("1.0", "end-1c").strip()
-                if new_name:
-                    self.tasks[index]['name'] = new_name
-                    self.populate_listbox()
-                    self.save_tasks()
-                    self.update_buttons_state()
-                edit_window.destroy()
-
-            def on_cancel():
-                edit_window.destroy()
-
-            text_entry.bind("<Return>", on_save)
-
-            button_frame = tk.Frame(frame)
-            button_frame.pack(fill="x", pady=(10, 0))
-
-            save_button = ttk.Button(button_frame, text="Save", command=on_save)
-            save_button.pack(side="left", padx=0)
-
-            cancel_button = ttk.Button(button_frame, text="Cancel", command=on_cancel)
-            cancel_button.pack(side="left", padx=5)
-
-            edit_window.protocol("WM_DELETE_WINDOW", on_cancel)
-            self.center_window_over_window(edit_window)
+            def on_save(text):
+                index = self.todo.index_of(uid)
+                if index is not None:
+                    self.todo.rename(index, text)
 
+            self.open_edit_dialog("Edit Task", current_task.name, on_save)
 
     def add_separator_title(self):
-        selected_indices = self.listbox.curselection()
-        if not selected_indices:
+        index = self.first_selected_task()
+        if index is None:
             return
 
-        index = selected_indices[0]
         current_task = self.tasks[index]
+        uid = current_task.uid
+
+        if current_task.separator and not current_task.title:
+            def on_save(text):
+                index = self.todo.index_of(uid)
+                if text.strip() and index is not None:
+                    self.todo.set_separator_title(index, text)
+
+            self.open_edit_dialog("Add Separator Title", '', on_save)
+
+    def open_edit_dialog(self, title, text, on_save):
+        """Show the edit dialog; on_save(text) is called with the entered text."""
+        if self.edit_window is None:
+            self.create_edit_dialog()
+        self.edit_on_save = on_save
+        self.edit_window.title(title)
+        self.edit_entry.delete("1.0", tk.END)
+        self.edit_entry.insert(tk.END, text)
+        self.edit_window.deiconify()
+        self.edit_window.grab_set()
+        self.edit_entry.focus_set()
+        self.center_window_over_window(self.edit_window)
+
+    def create_edit_dialog(self):
+        """Build the edit dialog on first use; it is hidden and reused afterwards."""
+        self.edit_window = tk.Toplevel(self.root)
+        self.edit_window.withdraw()
+        self.edit_window.geometry("200x120")
+        self.edit_window.transient(self.root)
+
+        self.set_window_icon(self.edit_window)
+
+        frame = tk.Frame(self.edit_window, padx=20, pady=20)
+        frame.pack(fill="both", expand=True)
+
+        self.edit_entry = tk.Text(frame, wrap='word', height=2, width=28)
+        self.edit_entry.pack(fill="both", expand=True)
+        self.edit_entry.bind("<Return>", self.save_edit_dialog)
+
+        button_frame = tk.Frame(frame)
+        button_frame.pack(fill="x", pady=(10, 0))
+
+        save_button = ttk.Button(button_frame, text="Save", command=self.save_edit_dialog)
+        save_button.pack(side="left", padx=0)
+
+        cancel_button = ttk.Button(button_frame, text="Cancel", command=self.close_edit_dialog)
+        cancel_button.pack(side="left", padx=5)
+
+        self.edit_window.protocol("WM_DELETE_WINDOW", self.close_edit_dialog)
+
+    def save_edit_dialog(self, event=None):
+        on_save, self.edit_on_save = self.edit_on_save, None
+        self.close_edit_dialog()
+        if on_save is not None:
+            on_save(self.edit_entry.get("1.0", "end-1c"))
+        return 'break'
 
-        if current_task.get('separator', False) and not current_task.get('title', False):
-            edit_window = tk.Toplevel(self.root)
-            edit_window.title("Add Separator Title")
-            edit_window.geometry("200x120")
-            edit_window.transient(self.root)
-            edit_window.grab_set()
-
-            self.set_window_icon(edit_window)
-
-            frame = tk.Frame(edit_window, padx=20, pady=20)
-            frame.pack(fill="both", expand=True)
-
-            text_entry = tk.Text(frame, wrap='word', height=2, width=28)
-            text_entry.pack(fill="both", expand=True)
-
-            def on_save(event=None):
-                title_text = text_entry.get("1.0", "end-1c").strip().upper()
-                if title_text:
-                    separator_line_before = '─' * 2
-                    separator_line_after = '─' * 30
-                    display_text = f"{separator_line_before} {title_text} {separator_line_after}"
-                    self.tasks[index]['name'] = display_text
-                    self.tasks[index]['title'] = True
-                    self.populate_listbox()
-                    self.save_tasks()
-                    self.update_buttons_state()
-                edit_window.destroy()
-
-            def on_cancel():
-                edit_window.destroy()
-
-            text_entry.bind("<Return>", on_save)
-
-            button_frame = tk.Frame(frame)
-            button_frame.pack(fill="x", pady=(10, 0))
-
-            save_button = ttk.Button(button_frame, text="Save", command=on_save)
-            save_button.pack(side="left", padx=0)
-
-            cancel_button = ttk.Button(button_frame, text="Cancel", command=on_cancel)
-            cancel_button.pack(side="left", padx=5)
-
-            edit_window.protocol("WM_DELETE_WINDOW", on_cancel)
-            self.center_window_over_window(edit_window)
+    def close_edit_dialog(self):
+        self.edit_window.grab_release()
+        self.edit_window.withdraw()
 
     def add_separator_below(self):
-        selected_indices = self.listbox.curselection()
-        if not selected_indices:
+        index = self.first_selected_task()
+        if index is None:
             return
 
-        index = selected_indices[0]
-        separator = {'name': '─' * 40, 'separator': True, 'title': False}
-        self.tasks.insert(index + 1, separator)
-
-        self.populate_listbox()
-        self.save_tasks()
-        self.update_buttons_state()
+        self.todo.insert_separator(index + 1)
 
     # UI update methods
 
     def populate_listbox(self):
-        self.listbox.delete(0, tk.END)
-        colors = self.get_theme_colors()
-        for index, task in enumerate(self.tasks):
-            if task.get('separator', False):
-                display_text = task['name']
-                self.listbox.insert(tk.END, display_text)
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['separator_fg']})
-            else:
-                if task.get('cancelled', False):
-                    display_text = f"✖ {task['name']}" 
-                    self.listbox.insert(tk.END, display_text)
-                    self.listbox.itemconfig(index, {'bg': '', 'fg': '#a9a9a9'})
-                elif task.get('done', False):
-                    display_text = f"✔ {task['name']}"
-                    self.listbox.insert(tk.END, display_text)
-                    self.listbox.itemconfig(index, {'bg': colors['done_bg'], 'fg': colors['done_fg']})
-                else:
-                    display_text = f"⬜ {task['name']}"
-                    self.listbox.insert(tk.END, display_text)
+        self.listbox.selection_clear(0, tk.END)
         self.update_listbox_task_backgrounds()
         self.adjust_window_size()
         self.update_title()
 
     def update_buttons_state(self, event=None):
-        selected_indices = self.listbox.curselection()
-        has_selection = bool(selected_indices) or self.bulk_selection_mode
-        
-        only_separators_selected = all(self.tasks[index].get('separator', False) for index in selected_indices)
-        all_cancelled = all(self.tasks[index].get('cancelled', False) for index in selected_indices)
+        flag_counts = self.selection_flag_counts()
+        has_selection = any(flag_counts) or self.bulk_selection_mode
+
+        only_separators_selected = not count_matching(flag_counts, exclude=SEPARATOR)
+        all_cancelled = not count_matching(flag_counts, exclude=CANCELLED)
 
         self.buttons["➕"]['state'] = 'normal' if self.entry.get("1.0", "end-1c").strip() else 'disabled'
         self.buttons["➖"]['state'] = 'normal' if has_selection else 'disabled'
@@ -443,37 +762,41 @@ class TodoApp:
                 foreground=[('active', fg), ('disabled', 'grey')])
 
     def update_listbox_task_backgrounds(self):
-        colors = self.get_theme_colors()
-        for index, task in enumerate(self.tasks):
-            if task.get('separator', False):
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['separator_fg']})
-            elif task.get('cancelled', False):
-                self.listbox.itemconfig(index, {'bg': '', 'fg': '#a9a9a9'})
-            elif task.get('done', False):
-                self.listbox.itemconfig(index, {'bg': colors['done_bg'], 'fg': colors['done_fg']})
-            elif task.get('urgent', False):
-                self.listbox.itemconfig(index, {'bg': colors['urgent_bg'], 'fg': 'white'})
-            else:
-                self.listbox.itemconfig(index, {'bg': colors['listbox_bg'], 'fg': colors['fg']})
+        self.listbox.refresh(self.row_count())
+
+    def get_listbox_row(self, row):
+        return self.get_task_row(self.tasks[self.task_index(row)])
+
+    @staticmethod
+    def get_task_row(task):
+        """Return the (text, style) a task is displayed with, see ROW_STYLES."""
+        if task.separator:
+            return task.name, 'separator'
+        if task.cancelled:
+            return f"✖ {task.name}", 'cancelled'
+        if task.done:
+            return f"✔ {task.name}", 'done'
+        if task.urgent:
+            return f"⬜ {task.name}", 'urgent'
+        return f"⬜ {task.name}", 'normal'
 
     def adjust_window_size(self):
         num_tasks = len(self.tasks)
-        new_height = max(100, min(800, 100 + (num_tasks * 18)))
+        new_height = max(125, min(800, 125 + (num_tasks * 18)))
         self.root.geometry(f"300x{new_height}")
 
     def update_title(self):
-        total_tasks = sum(1 for task in self.tasks if not task.get('separator', False) and not task.get('cancelled', False))
-        done_tasks = sum(task.get('done', False) for task in self.tasks if not task.get('separator', False) and not task.get('cancelled', False))
-        urgent_tasks = self.count_urgent_tasks()
+        counts = self.tasks.counts()
+        total_tasks, done_tasks, urgent_tasks = counts['total'], counts['done'], counts['urgent']
 
         urgent_text = f"[{urgent_tasks} urgent]" if urgent_tasks > 0 else ""
 
         if total_tasks == 0:
-            self.root.title("To-Do")
+            self.root.title(self.list_name)
         elif done_tasks == total_tasks:
-            self.root.title(f"To-Do ({done_tasks}/{total_tasks}) — All done! {urgent_text}")
+            self.root.title(f"{self.list_name} ({done_tasks}/{total_tasks}) — All done! {urgent_text}")
         else:
-            self.root.title(f"To-Do ({done_tasks}/{total_tasks}) {urgent_text}")
+            self.root.title(f"{self.list_name} ({done_tasks}/{total_tasks}) {urgent_text}")
 
     def apply_theme(self):
         colors = self.get_theme_colors()
@@ -483,8 +806,10 @@ class TodoApp:
         self.listbox.configure(bg=colors['listbox_bg'], fg=colors['fg'],
                                selectbackground=colors['select_bg'], selectforeground=colors['fg'])
         self.entry.configure(bg=colors['entry_bg'], fg=colors['fg'])
+        self.filter_entry.configure(bg=colors['entry_bg'], fg=colors['fg'], insertbackground=colors['caret_color'])
         self.update_buttons_style(colors['button_bg'], colors['button_fg'])
-        self.update_listbox_task_backgrounds()
+        # Rows take their colours from the named styles, so only rows whose style looks different change
+        self.listbox.set_styles(ROW_STYLES[self.is_dark_mode])
 
         self.entry.config(insertbackground=colors['caret_color'])
 
@@ -503,7 +828,7 @@ class TodoApp:
     def on_ctrl_click(self, event):
         """Handle robust Ctrl-click to toggle selection of individual tasks."""
         index = self.listbox.nearest(event.y)
-        if index in self.listbox.curselection():
+        if self.listbox.selection_includes(index):
             self.listbox.selection_clear(index)
         else:
             self.listbox.selection_set(index)
@@ -515,13 +840,16 @@ class TodoApp:
     def on_shift_click(self, event):
         """Handle Shift-click to select a range of tasks."""
         index = self.listbox.nearest(event.y)
-        cur_selection = self.listbox.curselection()
-        if cur_selection:
-            start_index = cur_selection[0]
+        ranges = self.listbox.selection_ranges()
+        if ranges:
+            start_index = ranges[0][0]
             self.listbox.selection_clear(0, tk.END)
             self.listbox.selection_set(start_index, index)
         else:
             self.listbox.selection_set(index)
+        self.update_buttons_state()
+
+        return 'break'
 
     def on_entry_focus_in(self, event=None):
         colors = self.get_theme_colors()
@@ -553,7 +881,14 @@ class TodoApp:
         self.listbox.unbind('<Button-1>')
         self.listbox.unbind('<Button-3>')
         self.root.unbind_all('<Control-h>')
-
+        self.root.unbind_all('<Control-z>')
+        self.root.unbind_all('<Control-y>')
+        self.root.unbind_all('<Control-Z>')
+
+        self.stop_rpc_server()
+        self.lists.close()
+        if self.profiler is not None:
+            self.profiler.write_report()
         self.save_config()
         self.root.destroy()
         self.root.quit()
@@ -570,19 +905,19 @@ class TodoApp:
     
     def handle_single_selection(self, index):
         if index in self.selected_indices:
-            self.selected_indices.remove(index)
+            self.selected_indices.remove(index, index + 1)
             self.listbox.selection_clear(index)
         else:
-            self.selected_indices.add(index)
+            self.selected_indices.add(index, index + 1)
             self.listbox.selection_set(index)
         self.update_buttons_state()
 
     def handle_bulk_selection(self, index):
         if index in self.selected_indices:
-            self.selected_indices.remove(index)
+            self.selected_indices.remove(index, index + 1)
         else:
-            self.selected_indices.add(index)
-        
+            self.selected_indices.add(index, index + 1)
+
         self.update_listbox_selections()
 
     def update_bulk_selection_mode(self):
@@ -593,13 +928,11 @@ class TodoApp:
         self.update_buttons_state()
 
     def update_listbox_selections(self):
-        self.listbox.selection_clear(0, tk.END)
-        for idx in self.selected_indices:
-            self.listbox.selection_set(idx)
+        self.listbox.selection_replace(self.selected_indices)
         self.update_buttons_state()
 
     def select_all_tasks(self, event=None):
-        self.selected_indices = set(range(len(self.tasks)))
+        self.selected_indices = RangeSet([(0, self.row_count())])
         self.update_listbox_selections()
 
     def select_all_or_text(self, event=None):
@@ -617,11 +950,12 @@ class TodoApp:
         self.drag_start_index = self.listbox.nearest(event.y)
         self.listbox.selection_clear(0, tk.END)
         self.listbox.selection_set(self.drag_start_index)
-        self.selected_indices = {self.drag_start_index}
+        self.selected_indices = RangeSet([(self.drag_start_index, self.drag_start_index + 1)])
         self.update_buttons_state()
 
     def do_drag(self, event):
         """Handle the dragging motion and visually highlight the item being dragged over."""
+        self.listbox.autoscroll(event.y)
         drag_over_index = self.listbox.nearest(event.y)
         if drag_over_index != self.drag_start_index:
             self.listbox.selection_clear(0, tk.END)
@@ -635,68 +969,341 @@ class TodoApp:
         self.drag_start_index = None
 
     def reorder_tasks(self, start_index, end_index):
-        """Move the task from start_index to end_index in the tasks list."""
-        task = self.tasks.pop(start_index)
-        self.tasks.insert(end_index, task)
+        """Move the task shown in row start_index to the place of the one in row end_index."""
+        self.todo.move(self.task_index(start_index), self.task_index(end_index))
+
+    # Filtering
+
+    def row_count(self):
+        return len(self.tasks) if self.view is None else len(self.view)
+
+    def task_index(self, row):
+        """Index in self.tasks of the task shown in a listbox row."""
+        return row if self.view is None else self.view[row]
+
+    def selected_tasks(self):
+        """Task indices of the selected rows."""
+        rows = self.listbox.curselection()
+        return rows if self.view is None else tuple(self.view[row] for row in rows)
+
+    def first_selected_task(self):
+        """Task index of the first selected row, or None, without listing the whole selection."""
+        ranges = self.listbox.selection_ranges()
+        return self.task_index(ranges[0][0]) if ranges else None
+
+    def selection_flag_counts(self):
+        """Number of selected tasks per flag combination, for model.count_matching.
+
+        Cached until the selection or the rows change. Otherwise the selected
+        rows are counted or, when more than half the rows are selected, the
+        unselected ones, which are taken off the counts of all the rows. Those
+        are the store's flag_counts or, with a filter, counted once until the
+        rows change.
+        """
+        ranges = self.listbox.selection_ranges()
+        key = (self.rows_version, tuple(ranges))
+        if self.selection_cache is None or self.selection_cache[0] != key:
+            row_count = self.row_count()
+            if 2 * sum(stop - start for start, stop in ranges) <= row_count:
+                flag_counts = self.count_rows(ranges)
+            else:
+                unselected = RangeSet([(0, row_count)])
+                for start, stop in ranges:
+                    unselected.remove(start, stop)
+                flag_counts = list(self.all_rows_flag_counts())
+                for flags, count in enumerate(self.count_rows(unselected.ranges())):
+                    flag_counts[flags] -= count
+            self.selection_cache = (key, flag_counts)
+        return self.selection_cache[1]
+
+    def all_rows_flag_counts(self):
+        if self.view is None:
+            return self.tasks.flag_counts
+        if self.view_counts_cache is None or self.view_counts_cache[0] != self.rows_version:
+            self.view_counts_cache = (self.rows_version, self.count_rows([(0, len(self.view))]))
+        return self.view_counts_cache[1]
+
+    def count_rows(self, ranges):
+        return TaskStore.count_flags(self.tasks[self.task_index(row)]
+                                     for start, stop in ranges for row in range(start, stop))
+
+    def apply_filter(self):
+        query = self.filter_var.get().strip()
+        self.view = self.todo.find(query) if query else None
+        self.rows_version += 1
+
+    def on_filter_changed(self, *args):
+        self.apply_filter()
         self.populate_listbox()
-        self.save_tasks()
         self.update_buttons_state()
 
-    # File I/O and configuration
+    # Lists
 
-    @classmethod
-    def load_tasks(cls):
-        import json
-        tasks_file = cls.get_tasks_file()
-        tasks_file.parent.mkdir(parents=True, exist_ok=True)
+    def switch_list(self, name):
+        if name == self.list_name:
+            return
         try:
-            tasks = json.loads(tasks_file.read_text(encoding='utf-8'))
-            for task in tasks:
-                if task.get('separator', False):
-                    task['title'] = task.get('title', False)
-            return tasks
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+            todo = self.lists.open(name, progressive=True)
+        except ValueError as e:
+            print(f"Error opening list: {e}")
+            return
+        self.todo.change_listeners.remove(self.on_tasks_changed)
+        self.todo, self.list_name = todo, name
+        self.todo.change_listeners.append(self.on_tasks_changed)
+        self.profile_list(self.todo)
+        self.todo.watch()
+        if self.todo.loading:
+            self.todo.load_next(self.FIRST_LOAD_BATCH)
+            self.root.after(1, self.load_more_tasks)
+        self.on_tasks_changed()
+        self.root.after(1000, self.archive_old_tasks)
+
+    def new_list(self):
+        def on_save(text):
+            if text.strip():
+                self.switch_list(text.strip())
+
+        self.open_edit_dialog("New List", '', on_save)
+
+    # Archive
+
+    def archive_old_tasks(self):
+        """Move tasks closed longer than archive_after_days ago out of the list, once it is loaded."""
+        if not self.archive_after_days:
+            return
+        if self.todo.loading:
+            self.root.after(500, self.archive_old_tasks)
+            return
+        self.todo.archive_closed(self.archive_after_days * 86400)
+
+    def show_archive_dialog(self, event=None):
+        if self.archive_window is None:
+            self.create_archive_dialog()
+        self.archive_window.deiconify()
+        self.archive_window.lift()
+        self.center_window_over_window(self.archive_window)
+        self.archive_query.focus_set()
+        self.search_archive()
+
+    def create_archive_dialog(self):
+        """Build the archive browser on first use; closing it only hides it."""
+        window = self.archive_window = tk.Toplevel(self.root)
+        window.withdraw()
+        window.title("Archive")
+        window.transient(self.root)
+        window.protocol("WM_DELETE_WINDOW", window.withdraw)
+        self.set_window_icon(window)
+
+        frame = tk.Frame(window, padx=10, pady=10)
+        frame.pack(fill="both", expand=True)
+
+        self.archive_query = tk.Entry(frame, font=self.get_system_font())
+        self.archive_query.pack(fill="x")
+        self.archive_query.bind("<Return>", self.search_archive)
+
+        self.archive_listbox = tk.Listbox(frame, selectmode=tk.EXTENDED, activestyle='none', bd=0,
+                                          font=self.get_system_font(), width=40, height=12)
+        self.archive_listbox.pack(fill="both", expand=True, pady=(5, 5))
+        self.archive_entries = []
+
+        button_frame = tk.Frame(frame)
+        button_frame.pack(fill="x")
+        ttk.Button(button_frame, text="Restore", command=self.restore_archived_tasks).pack(side="left")
+        ttk.Button(button_frame, text="Close", command=window.withdraw).pack(side="left", padx=5)
+
+    def search_archive(self, event=None):
+        """List the newest archived tasks matching the query; the archive is only read here."""
+        self.archive_entries = self.todo.search_archive(self.archive_query.get().strip())
+        self.archive_listbox.delete(0, tk.END)
+        for _, task, archived_at in reversed(self.archive_entries):
+            date = time.strftime('%Y-%m-%d', time.localtime(archived_at)) if archived_at else ''
+            self.archive_listbox.insert(tk.END, f"{'✖' if task.cancelled else '✔'} {task.name}  ({date})")
+
+    def restore_archived_tasks(self):
+        newest_first = list(reversed(self.archive_entries))
+        self.todo.restore_archived([newest_first[row] for row in sorted(self.archive_listbox.curselection())])
+        self.search_archive()
+
+    # File I/O and configuration
 
+    def import_tasks(self):
+        """Append the tasks of a todo.txt, Markdown or CSV file to the list."""
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(parent=self.root, title="Import Tasks", filetypes=self.FILE_TYPES)
+        if path:
+            try:
+                formats.import_file(self.todo, path)
+            except (OSError, ValueError) as e:
+                print(f"Error importing tasks: {e}")
+
+    def export_tasks(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(parent=self.root, title="Export Tasks", filetypes=self.FILE_TYPES,
+                                            defaultextension='.txt', initialfile=self.list_name)
+        if path:
+            try:
+                formats.export_file(self.todo, path)
+            except (OSError, ValueError) as e:
+                print(f"Error exporting tasks: {e}")
 
     def save_tasks(self):
-        import json
+        self.todo.save(full=True)
+
+    def poll_external_changes(self):
+        """Merge what other instances saved; the watcher thread has already read it from disk."""
+        self.todo.merge_external_changes()
+        self.root.after(self.EXTERNAL_CHANGES_POLL_MS, self.poll_external_changes)
+
+    # Local server
+
+    def start_rpc_server(self):
+        """Let local programs work on the open list, see server.py; enabled by the rpc_server setting.
+
+        Requests are run here on the Tk thread, as soon as Tk is woken
+        through a pipe, or on a short timer where Tk cannot watch one.
+        """
         try:
-            tasks_to_save = [{'name': task['name'], 
-                            'done': task.get('done', False), 
-                            'cancelled': task.get('cancelled', False), 
-                            'urgent': task.get('urgent', False), 
-                            'separator': task.get('separator', False), 
-                            'title': task.get('title', False)}
-                            for task in self.tasks]
-
-            self.get_tasks_file().write_text(json.dumps(tasks_to_save, indent=4), encoding='utf-8')
-        except Exception as e:
-            print(f"Error saving tasks: {e}")
+            from . import server
+        except ImportError:
+            import server
+        if self.rpc_port is None and os.name == 'posix':
+            path = core.get_base_dir() / 'todo_app' / 'todo.sock'
+        else:
+            path = None
+        token_path = core.get_base_dir() / 'todo_app' / 'todo.token'
+        watch_pipe = hasattr(self.root.tk, 'createfilehandler')
+        if watch_pipe:
+            self.rpc_wake_fds = os.pipe()
+            for fd in self.rpc_wake_fds:
+                os.set_blocking(fd, False)
+            self.root.tk.createfilehandler(self.rpc_wake_fds[0], tk.READABLE, self.on_rpc_wake)
+        self.rpc_server = server.TaskServer(lambda: self.todo, path, self.rpc_port or server.DEFAULT_PORT,
+                                            self.wake_for_rpc if watch_pipe else None, token_path)
+        try:
+            self.rpc_server.start()
+        except OSError as e:
+            print(f"Error starting the local server on {self.rpc_server.address}: {e}")
+            self.stop_rpc_server()
+            return
+        if not watch_pipe:
+            self.root.after(self.RPC_POLL_MS, self.poll_rpc_requests)
 
+    def wake_for_rpc(self):
+        """Called by the server thread when requests are queued."""
+        try:
+            os.write(self.rpc_wake_fds[1], b'\0')
+        except BlockingIOError:
+            pass  # the pipe is full, so a wake-up is pending anyway
 
+    def on_rpc_wake(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
+        # A burst of requests is one batch: one save, one refresh
+        self.rpc_server.process_requests()
+
+    def poll_rpc_requests(self):
+        if self.rpc_server is not None:
+            self.rpc_server.process_requests()
+            self.root.after(self.RPC_POLL_MS, self.poll_rpc_requests)
+
+    def stop_rpc_server(self):
+        if self.rpc_server is not None:
+            self.rpc_server.stop()
+            self.rpc_server = None
+        if self.rpc_wake_fds is not None:
+            self.root.tk.deletefilehandler(self.rpc_wake_fds[0])
+            for fd in self.rpc_wake_fds:
+                os.close(fd)
+            self.rpc_wake_fds = None
+
+    # Profiling
+
+    def profile_list(self, todo):
+        """Time the list's saves and loading as well, when profiling."""
+        if self.profiler is not None:
+            self.profiler.instrument(todo, ['save', 'load_next'], prefix='TodoList.')
+
+    def show_profile_window(self, event=None):
+        """The timings so far; Ctrl+Shift+P, only bound when profiling is enabled."""
+        if self.profile_window is None:
+            self.create_profile_window()
+        self.profile_window.deiconify()
+        self.profile_window.lift()
+        self.refresh_profile_window()
+
+    def create_profile_window(self):
+        window = self.profile_window = tk.Toplevel(self.root)
+        window.withdraw()
+        window.title("Profile")
+        window.protocol("WM_DELETE_WINDOW", window.withdraw)
+        self.set_window_icon(window)
+
+        frame = tk.Frame(window, padx=10, pady=10)
+        frame.pack(fill="both", expand=True)
+        self.profile_text = tk.Text(frame, width=80, height=24, font=('Courier', 9), wrap='none')
+        self.profile_text.pack(fill="both", expand=True)
+
+        def capture():
+            self.profiler.capture_next()
+            self.refresh_profile_window()
+
+        def reset():
+            self.profiler.reset()
+            self.refresh_profile_window()
+
+        button_frame = tk.Frame(frame)
+        button_frame.pack(fill="x", pady=(5, 0))
+        for text, command in (("Refresh", self.refresh_profile_window), ("Capture Next", capture),
+                              ("Write to Log", self.profiler.write_report), ("Reset", reset)):
+            ttk.Button(button_frame, text=text, command=command).pack(side="left", padx=(0, 5))
+
+    def refresh_profile_window(self):
+        text = self.profiler.report()
+        if self.profiler.capture_ms is not None:
+            text += f"\n\nCapturing the next interaction taking at least {self.profiler.capture_ms} ms"
+        if self.profiler.captures:
+            text += "\n\nCaptured: " + ", ".join(str(path) for path in self.profiler.captures)
+        self.profile_text.configure(state='normal')
+        self.profile_text.delete('1.0', tk.END)
+        self.profile_text.insert('1.0', text)
+        self.profile_text.configure(state='disabled')
+
+    def load_more_tasks(self):
+        """Load the next batch of a large list between UI events until it is complete."""
+        if not self.todo.loading:
+            return
+        if self.todo.load_next():
+            self.root.after(1, self.load_more_tasks)
+        self.listbox.refresh(self.row_count())
+        self.update_title()
 
     def load_config(self):
-        import json
-        config_file = self.get_config_file()
-        if config_file.is_file():
-            config = json.loads(config_file.read_text(encoding='utf-8'))
-            self.is_dark_mode = config.get('dark_mode', False)
-            self.apply_theme()
-            
-            self.initial_geometry = config.get('geometry', '')
-        else:
-            self.initial_geometry = ''
+        """Read the settings the first frame depends on; called before the UI is built."""
+        config = self.read_config()
+        self.is_dark_mode = config.get('dark_mode', False)
+        self.initial_geometry = config.get('geometry', '')
+        self.archive_after_days = config.get('archive_after_days')
+        self.rpc_enabled = config.get('rpc_server', False)
+        self.rpc_port = config.get('rpc_port')
+        return config
+
+    @staticmethod
+    def read_config():
+        return core.read_config()
 
     def save_config(self):
         import json
         try:
             config_file = self.get_config_file()
             config_file.parent.mkdir(parents=True, exist_ok=True)
-            config = {
+            config = self.read_config()
+            config.update({
                 'geometry': self.root.geometry(),
-                'dark_mode': self.is_dark_mode
-            }
+                'dark_mode': self.is_dark_mode,
+                'list': self.list_name
+            })
             config_file.write_text(json.dumps(config, indent=4), encoding='utf-8')
         except Exception as e:
             print(f"Error saving config: {e}")
@@ -705,40 +1312,26 @@ class TodoApp:
 
     @staticmethod
     def get_base_dir():
-        return Path(sys.executable).parent if getattr(sys, 'frozen', False) else Path(__file__).parent
+        return core.get_base_dir()
 
-    @classmethod
-    def get_tasks_file(cls):
-        return cls.get_base_dir() / 'todo_app' / 'tasks.json'
+    @staticmethod
+    def get_tasks_file():
+        return core.get_tasks_file()
 
-    @classmethod
-    def get_config_file(cls):
-        return cls.get_base_dir() / 'todo_app' / 'config.json'
+    @staticmethod
+    def get_config_file():
+        return core.get_config_file()
 
     def get_theme_colors(self):
-        return {
-            'bg': '#15131e' if self.is_dark_mode else 'white',
-            'fg': 'white' if self.is_dark_mode else 'black',
-            'entry_bg': '#444444' if self.is_dark_mode else '#f0f0f0',
-            'entry_border_focus': '#cccccc' if self.is_dark_mode else '#333333',
-            'caret_color': 'white' if self.is_dark_mode else 'black',
-            'caret_color_focus': '#cccccc' if self.is_dark_mode else '#333333',
-            'button_bg': '#444444' if self.is_dark_mode else '#e0e0e0',
-            'button_fg': '#00BFFF' if self.is_dark_mode else '#1E90FF',
-            'listbox_bg': '#15131e' if self.is_dark_mode else 'white',
-            'select_bg': '#555555' if self.is_dark_mode else '#d3d3d3',
-            'done_bg': '#29C458' if self.is_dark_mode else '#29C458',
-            'done_fg': '#1A7B37' if self.is_dark_mode else '#1A7B37',
-            'urgent_bg': '#de3f4d' if self.is_dark_mode else '#de3f4d',
-            'separator_fg': '#cccccc'
-        }
+        """The colours of the current theme; shared, so not to be modified."""
+        return THEMES[self.is_dark_mode]
 
     @staticmethod
     def get_system_font():
         return ('Segoe UI', 10) if sys.platform == 'win32' else ('San Francisco', 11) if sys.platform == 'darwin' else ('Arial', 10)
 
     def count_urgent_tasks(self):
-        return sum(1 for task in self.tasks if task.get('urgent', False))
+        return self.todo.counts()['urgent']
 
     # Window management
 
@@ -758,6 +1351,39 @@ class TodoApp:
             self.root.update()
             self.root.attributes('-topmost', False)
 
+        self.root.update_idletasks()
+        self.mark_startup('first_frame')
+        self.log_startup_timings()
+
+    def mark_startup(self, phase):
+        """Record how long the startup phase that just ended took."""
+        now = time.perf_counter()
+        self.startup_timings.append((phase, now - self.startup_mark))
+        if self.profiler is not None:
+            self.profiler.record(f'startup:{phase}', now - self.startup_mark)
+        self.startup_mark = now
+
+    def log_startup_timings(self):
+        """Write the startup breakdown when TODO_APP_STARTUP_LOG is set.
+
+        A value of 1 logs to stderr, anything else is taken as a file to append to
+        (the frozen build has no console).
+        """
+        target = os.environ.get('TODO_APP_STARTUP_LOG')
+        if not target:
+            return
+        total = sum(seconds for _, seconds in self.startup_timings)
+        line = "startup: " + ", ".join(
+            f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in self.startup_timings) + f", total {total * 1000:.1f} ms"
+        try:
+            if target == '1':
+                print(line, file=sys.stderr)
+            else:
+                with open(target, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+        except Exception as e:
+            print(f"Error writing startup timings: {e}")
+
     def center_window(self, default_size=None):
         self.root.update_idletasks()
         if default_size:
@@ -791,10 +1417,20 @@ class TodoApp:
         self.apply_theme()
         
     def show_about_dialog(self, event=None):
+        if self.about_window is None:
+            self.create_about_dialog()
+        self.about_window.deiconify()
+        self.about_window.lift()
+        self.center_window_over_window(self.about_window)
+
+    def create_about_dialog(self):
+        """Build the about dialog on first use; closing it only hides it."""
         from tkinter import PhotoImage
-        about_window = tk.Toplevel(self.root)
+        about_window = self.about_window = tk.Toplevel(self.root)
+        about_window.withdraw()
         about_window.title("About")
         about_window.resizable(False, False)
+        about_window.protocol("WM_DELETE_WINDOW", about_window.withdraw)
 
         self.set_window_icon(about_window)
 
@@ -828,29 +1464,28 @@ class TodoApp:
         license_label.bind("<Button-1>", lambda e: self.open_link("https://github.com/jltk/todo-app/blob/main/LICENSE"))
 
         about_window.update_idletasks()
-        min_width = max(text.winfo_width(), github_label.winfo_width(), license_label.winfo_width()) + 20
-        min_height = text.winfo_height() + github_label.winfo_height() + license_label.winfo_height() + 40
+        min_width = max(text.winfo_reqwidth(), github_label.winfo_reqwidth(), license_label.winfo_reqwidth()) + 20
+        min_height = text.winfo_reqheight() + github_label.winfo_reqheight() + license_label.winfo_reqheight() + 40
         about_window.geometry(f"{min_width}x{min_height}")
 
-        self.center_window_over_window(about_window)
-
     def open_link(self, url):
         import webbrowser
         webbrowser.open(url)
 
     def show_context_menu(self, event):
+        if self.context_menu is None:
+            self.create_context_menu()
         try:
             index = self.listbox.nearest(event.y)
-            current_selection = self.listbox.curselection()
-
-            if not current_selection or len(current_selection) == 1:
+            if self.listbox.selection_count() <= 1:
                 self.listbox.selection_clear(0, tk.END)
                 self.listbox.selection_set(index)
             
-            selected_indices = self.listbox.curselection()
-            
-            if len(selected_indices) == 1 and self.tasks[selected_indices[0]].get('separator', False):
-                if self.tasks[selected_indices[0]].get('title', False):
+            single = self.listbox.selection_count() == 1
+            task = self.tasks[self.task_index(self.listbox.selection_ranges()[0][0])] if single else None
+
+            if task is not None and task.separator:
+                if task.title:
                     self.separator_context_menu.entryconfig("Edit Separator", state='normal')
                     self.separator_context_menu.entryconfig("Add Separator Title", state='disabled')
                 else:
@@ -859,7 +1494,7 @@ class TodoApp:
 
                 self.separator_context_menu.tk_popup(event.x_root, event.y_root)
             else:
-                only_separators_selected = all(self.tasks[idx].get('separator', False) for idx in selected_indices)
+                only_separators_selected = not count_matching(self.selection_flag_counts(), exclude=SEPARATOR)
                 self.context_menu.entryconfig("Un/Mark as Done", state='disabled' if only_separators_selected else 'normal')
                 self.context_menu.tk_popup(event.x_root, event.y_root)
         finally:
@@ -868,15 +1503,15 @@ class TodoApp:
     # Shortcut methods
 
     def remove_task_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.listbox.selection_count():
             self.remove_selected_tasks()
 
     def mark_as_done_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.listbox.selection_count():
             self.mark_selected_tasks_done()
 
     def edit_task_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.listbox.selection_count():
             self.edit_task()
 
 def main():